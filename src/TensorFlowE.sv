@@ -1,17 +1,45 @@
+// Datapath del multiplicador (ver matrix_multiply_unit): 0 serie, 1 paralelo,
+// 2 segmentado.
+// Se elige al compilar, p. ej. make MULT=parallel en test/.
+`ifndef MULT_MODE
+`define MULT_MODE 0
+`endif
+
+// Resultados y pares de operandos que guardan las colas (make FIFO_DEPTH=n
+// OPERAND_FIFO_DEPTH=n en test/).
+`ifndef RESULT_FIFO_DEPTH
+`define RESULT_FIFO_DEPTH 4
+`endif
+`ifndef OPERAND_FIFO_DEPTH
+`define OPERAND_FIFO_DEPTH 2
+`endif
+
 module TensorFlowE (
     input logic [7:0]Datos_in,
     input logic Ena_write,rst,clk,Ena_read,clear,enable_accu,
+    input logic weight_hold,
     output logic [7:0] Datos_out,
-    output logic Ena_out
+    output logic Ena_out,
+    output logic Dato_listo,
+    output logic Cola_llena
     );
 
+// Bits de una matriz y bytes que ocupa en Datos_in y Datos_out (mmac_pkg).
+// Acumulador, cola de resultados y uart llevan el resultado ancho.
+localparam int DATA_WIDTH = mmac_pkg::DATA_WIDTH;
+localparam int WIDE_WIDTH = 2*DATA_WIDTH;
+localparam int BYTES_WORD = mmac_pkg::BYTES_WORD;
+localparam int BYTES_WIDE = mmac_pkg::BYTES_WIDE;
+localparam int UART_W = 8*BYTES_WIDE;
+
 logic ena_TPU;
-logic [15:0] dato_in_64_bits_A;
+logic [DATA_WIDTH-1:0] dato_in_64_bits_A;
 //logic [63:0] dato_in_32_bits_B;
-logic [15:0] dato_in_64_bits;
+logic [DATA_WIDTH-1:0] dato_in_64_bits;
 
-logic [15:0] dato_in_64_bits_resultado;
-logic [15:0] dato_in_64_bits_output;
+logic [DATA_WIDTH-1:0] dato_in_64_bits_resultado;
+logic [WIDE_WIDTH-1:0] dato_in_64_bits_resultado_ancho;
+logic [WIDE_WIDTH-1:0] dato_in_64_bits_output;
 logic flat_64_comple;
 
 logic Ena_write_retradado;
@@ -32,9 +60,62 @@ logic Ena_clear_Ena;
 logic Ena_clear_retradado;
 logic Ena_clear_retradado_re;
 
+// Pesos fijos: con weight_hold en alto A queda en dato_in_64_bits_A y cada
+// palabra que sigue es una B nueva. Al bajar, la siguiente palabra es A.
+logic Ena_hold_retradado;
+logic Ena_hold_retradado_re;
+logic Ena_hold_baja;
+
+// Configuracion: clear y enable_accu juntos copian ui_in en los bits de
+// modo (sin borrar ni acumular). Bit 0: escritura en rafaga, con
+// Ena_write en alto four_palabras toma un byte de Datos_in por ciclo.
+// Bit 1: lectura en rafaga, un flanco de Ena_read saca todos los bytes
+// en ciclos seguidos y Ena_out marca cada uno.
+// Bit 2: cola de resultados, cada producto entra en result_fifo_u y cada
+// lectura saca el mas viejo.
+// Bit 3: cola de operandos, cada par A, B entra en operand_fifo_u y pasa al
+// multiplicador cuando esta libre y hay lugar para su resultado.
+// Bit 4: resultado ancho, se acumulan y se leen los 2*VAR_WIDTH bits de
+// cada elemento (BYTES_WIDE bytes por lectura en lugar de BYTES_WORD).
+// Cada elemento es exacto modulo 2**(2*VAR_WIDTH), y accumulate_unit_u
+// suma la palabra entera, con acarreo de un elemento al siguiente.
+logic Ena_config_Ena;
+logic Ena_accu_solo;
+logic Ena_clear_solo;
+logic rafaga_write;
+logic rafaga_read;
+logic cola_resultados;
+logic cola_operandos;
+logic resultado_ancho;
+logic Ena_out_contador;
+logic [7:0] Datos_in_retradado;
+
 logic flat_out_tx;
 logic dato_disponible;
 logic listo;
+// out de matrix_accumulate_unit cambia dos ciclos despues de listo
+logic listo_retradado;
+logic listo_retradado_re;
+logic [WIDE_WIDTH-1:0] dato_cola;
+logic [WIDE_WIDTH-1:0] dato_salida;
+logic [$clog2(`RESULT_FIFO_DEPTH+1)-1:0] ocupacion_resultados;
+logic cola_vacia;
+logic hay_dato;
+logic uart_ocupada;
+// Cola de operandos: {A, B} de cada par. reservas cuenta los productos
+// emitidos desde la cola que todavia no se leyeron, para no emitir uno
+// sin lugar en la cola de resultados.
+logic [2*DATA_WIDTH-1:0] par_cola;
+logic [$clog2(`OPERAND_FIFO_DEPTH+1)-1:0] ocupacion_operandos;
+logic [$clog2(`RESULT_FIFO_DEPTH+1)-1:0] reservas;
+logic par_completo;
+logic emite;
+logic saca_par;
+logic lee_resultado;
+logic mult_libre;
+logic mult_enable;
+logic [DATA_WIDTH-1:0] mult_A;
+logic [DATA_WIDTH-1:0] mult_B;
 logic flat_Ena_accu_Ena;
 //  logic flat_listo;
 assign Ena_write_Ena=(!Ena_write_retradado_re )&Ena_write_retradado;
@@ -43,22 +124,37 @@ assign Ena_accu_Ena=(!Ena_accu_retradado_re )&Ena_accu_retradado;
 assign Ena_read_Ena=(!Ena_read_retradado_re)&Ena_read_retradado;
 
 assign Ena_clear_Ena=(!Ena_clear_retradado_re)&Ena_clear_retradado;
+assign Ena_hold_baja=(!Ena_hold_retradado)&Ena_hold_retradado_re;
+assign Ena_config_Ena=Ena_accu_Ena&Ena_clear_Ena;
+assign Ena_accu_solo=Ena_accu_Ena&(!Ena_clear_Ena);
+assign Ena_clear_solo=Ena_clear_Ena&(!Ena_accu_Ena);
 
 initial
 begin
-            dato_disponible<=1'b0;
-            conta_palabras<=1'b0;
-            ena_TPU<=1'b0;
-            dato_in_64_bits_A<=16'h0;
-            Ena_write_retradado<=1'h0;
-            Ena_accu_retradado<=1'h0;
-            Ena_read_retradado<=1'h0;
-            Ena_write_retradado_re<=1'h0;
-            Ena_accu_retradado_re<=1'h0;
-            Ena_read_retradado_re<=1'h0;
-            Ena_clear_retradado<=1'h0;
-            Ena_clear_retradado_re<=1'h0;
-            flat_Ena_accu_Ena<=1'h0;
+            dato_disponible=1'b0;
+            conta_palabras=1'b0;
+            ena_TPU=1'b0;
+            dato_in_64_bits_A='0;
+            Ena_write_retradado=1'h0;
+            Ena_accu_retradado=1'h0;
+            Ena_read_retradado=1'h0;
+            Ena_write_retradado_re=1'h0;
+            Ena_accu_retradado_re=1'h0;
+            Ena_read_retradado_re=1'h0;
+            Ena_clear_retradado=1'h0;
+            Ena_clear_retradado_re=1'h0;
+            Ena_hold_retradado=1'h0;
+            Ena_hold_retradado_re=1'h0;
+            rafaga_write=1'h0;
+            rafaga_read=1'h0;
+            cola_resultados=1'h0;
+            cola_operandos=1'h0;
+            resultado_ancho=1'h0;
+            reservas='0;
+            listo_retradado=1'h0;
+            listo_retradado_re=1'h0;
+            Datos_in_retradado=8'h0;
+            flat_Ena_accu_Ena=1'h0;
             //flat_listo<=1'h0;
 end
 
@@ -69,7 +165,7 @@ end
             dato_disponible<=1'b0;
             conta_palabras<=1'b0;
             ena_TPU<=1'b0;
-            dato_in_64_bits_A<=16'h0;
+            dato_in_64_bits_A<='0;
             Ena_write_retradado<=1'h0;
             Ena_accu_retradado<=1'h0;
             Ena_read_retradado<=1'h0;
@@ -78,6 +174,17 @@ end
             Ena_read_retradado_re<=1'h0;
             Ena_clear_retradado<=1'h0;
             Ena_clear_retradado_re<=1'h0;
+            Ena_hold_retradado<=1'h0;
+            Ena_hold_retradado_re<=1'h0;
+            rafaga_write<=1'h0;
+            rafaga_read<=1'h0;
+            cola_resultados<=1'h0;
+            cola_operandos<=1'h0;
+            resultado_ancho<=1'h0;
+            reservas<='0;
+            listo_retradado<=1'h0;
+            listo_retradado_re<=1'h0;
+            Datos_in_retradado<=8'h0;
             flat_Ena_accu_Ena<=1'h0;
             //flat_listo<=1'h0;
 
@@ -98,10 +205,30 @@ end
 
             Ena_clear_retradado<=clear;
             Ena_clear_retradado_re<=Ena_clear_retradado;
+            Ena_hold_retradado<=weight_hold;
+            Ena_hold_retradado_re<=Ena_hold_retradado;
+            listo_retradado<=listo;
+            listo_retradado_re<=listo_retradado;
+            // el dato va con el mismo retardo que Ena_write_retradado
+            Datos_in_retradado<=Datos_in;
+
+            if (Ena_config_Ena)
+            begin
+                rafaga_write<=Datos_in[0];
+                rafaga_read<=Datos_in[1];
+                cola_resultados<=Datos_in[2];
+                cola_operandos<=Datos_in[3];
+                resultado_ancho<=Datos_in[4];
+            end
 	    
-            if (Ena_accu_Ena & (!listo))
+            if (Ena_clear_solo)
+                reservas<='0;
+            else
+                reservas<=reservas+($bits(reservas))'(emite & cola_resultados)
+                                  -($bits(reservas))'(lee_resultado & (reservas!='0));
+            if (Ena_accu_solo & (!listo))
                 flat_Ena_accu_Ena<=1'h1;
-            else if ((!Ena_accu_Ena )& Ena_clear_Ena)
+            else if (Ena_clear_solo)
                 flat_Ena_accu_Ena<=1'h0;
 
             /*
@@ -119,34 +246,65 @@ end
 
             else if (conta_palabras & flat_64_comple)
             begin
-                conta_palabras<=1'b0;
+                // con weight_hold la palabra siguiente tambien es B
+                conta_palabras<=Ena_hold_retradado;
                 ena_TPU<=1'b1;
             end
-            else if(!conta_palabras)
+            else
+            begin
+                if (Ena_hold_baja)
+                    conta_palabras<=1'b0;
                 ena_TPU<=1'b0;
+            end
         end
 
     end
 
-matrix_multiply_unit multiply_unit_u ( //#(.DATA_WIDTH(64), .VAR_WIDTH (8), .M_SIZE(4)) 
+// Con la cola de operandos el par completo entra en la cola en lugar de
+// dar ena_TPU. El datapath serie lee A y B hasta listo, asi que el par
+// sale de la cola con listo; los otros los usan al emitir.
+assign par_completo = conta_palabras & flat_64_comple;
+assign emite = cola_operandos & (ocupacion_operandos!='0) & mult_libre
+             & ((!cola_resultados) | (reservas < ($bits(reservas))'(`RESULT_FIFO_DEPTH)));
+assign saca_par = (`MULT_MODE == 0) ? (cola_operandos & listo) : emite;
+assign mult_enable = cola_operandos ? emite : ena_TPU;
+assign mult_A = cola_operandos ? par_cola[2*DATA_WIDTH-1:DATA_WIDTH] : dato_in_64_bits_A;
+assign mult_B = cola_operandos ? par_cola[DATA_WIDTH-1:0] : dato_in_64_bits;
+
+fifo_palabras #(.DEPTH(`OPERAND_FIFO_DEPTH), .WIDTH(2*DATA_WIDTH)) operand_fifo_u (
+    .clk(clk),
+    .rst(rst),
+    .clear(Ena_clear_solo),
+    .push(cola_operandos & par_completo),
+    .pop(saca_par),
+    .dato_in({dato_in_64_bits_A, dato_in_64_bits}),
+    .dato_out(par_cola),
+    .ocupacion(ocupacion_operandos)
+);
+
+matrix_multiply_unit #(.MODE(`MULT_MODE)) multiply_unit_u ( //#(.DATA_WIDTH(64), .VAR_WIDTH (8), .M_SIZE(4)) 
     .clk(clk),.rst(rst),
-    .enable(ena_TPU),
-    .matrixA(dato_in_64_bits_A), //|<i
-    .matrixB(dato_in_64_bits), //|<i
+    .enable(mult_enable),
+    .matrixA(mult_A), //|<i
+    .matrixB(mult_B), //|<i
     .result(dato_in_64_bits_resultado),   //|>o
-    .listo(listo)
+    .result_ancho(dato_in_64_bits_resultado_ancho),
+    .listo(listo),
+    .libre(mult_libre)
 );
 
 
 
-matrix_accumulate_unit  accumulate_unit_u (
+// Sin resultado ancho se acumula result con ceros arriba: los DATA_WIDTH
+// bits bajos de out son la suma de siempre.
+matrix_accumulate_unit #(.DATA_WIDTH(WIDE_WIDTH)) accumulate_unit_u (
 
     .clock(clk),
     .reset(rst),
-    .clear(Ena_clear_Ena),
+    .clear(Ena_clear_solo),
     .listo(listo),
     .enable(flat_Ena_accu_Ena),//ena_TPU////&flat_listo
-    .result(dato_in_64_bits_resultado),
+    .result(resultado_ancho ? dato_in_64_bits_resultado_ancho : WIDE_WIDTH'(dato_in_64_bits_resultado)),
     .out(dato_in_64_bits_output)
 ); 
 
@@ -154,41 +312,75 @@ matrix_accumulate_unit  accumulate_unit_u (
 
 
 four_palabras four_palabras_Unit(
-    .dato(Datos_in),
-    .rx_flat(Ena_write_Ena),
+    .dato(rafaga_write ? Datos_in_retradado : Datos_in),
+    .rx_flat(rafaga_write ? Ena_write_retradado : Ena_write_Ena),
     .rst(rst),
     .clk(clk),
 
     .data_comple(dato_in_64_bits),
     .flat_comple(flat_64_comple)
 );
-uart_tx_4in4 uart_tx_u(
+assign lee_resultado = cola_resultados & hay_dato & Ena_read_Ena;
+
+fifo_palabras #(.DEPTH(`RESULT_FIFO_DEPTH), .WIDTH(WIDE_WIDTH)) result_fifo_u (
     .clk(clk),
-    .start(dato_disponible & Ena_read_Ena),
+    .rst(rst),
+    .clear(Ena_clear_solo),
+    .push(cola_resultados & listo_retradado_re),
+    .pop(lee_resultado),
+    .dato_in(dato_in_64_bits_output),
+    .dato_out(dato_cola),
+    .ocupacion(ocupacion_resultados)
+);
+
+// La lectura arranca si hay dato: dato_disponible, o la cola no vacia y la
+// uart libre (los pulsos siguientes de Ena_read son next_uart)
+assign hay_dato = cola_resultados ? ((!cola_vacia) & (!uart_ocupada)) : dato_disponible;
+assign cola_vacia = (ocupacion_resultados == '0);
+assign Dato_listo = hay_dato;
+// Contrapresion: el proximo par o producto se perderia. Con la cola de
+// operandos los productos esperan lugar en la de resultados, asi que solo
+// cuenta la de operandos.
+assign Cola_llena = cola_operandos
+                  ? (ocupacion_operandos == ($bits(ocupacion_operandos))'(`OPERAND_FIFO_DEPTH))
+                  : (cola_resultados & (ocupacion_resultados == ($bits(ocupacion_resultados))'(`RESULT_FIFO_DEPTH)));
+
+// Sin resultado ancho salen BYTES_WORD bytes de los DATA_WIDTH bits bajos
+assign dato_salida = cola_resultados ? dato_cola : dato_in_64_bits_output;
+
+uart_tx_4in4 #(.BYTES(BYTES_WIDE), .BYTES_CORTO(BYTES_WORD)) uart_tx_u(
+    .clk(clk),
+    .start(hay_dato & Ena_read_Ena),
     .next_uart(Ena_read_Ena),
+    .rafaga(rafaga_read),
+    .largo(resultado_ancho),
     .rst(rst),
-    .input_dato(dato_in_64_bits_output),
+    .input_dato(resultado_ancho ? UART_W'(dato_salida) : UART_W'(dato_salida[DATA_WIDTH-1:0])),
     .Output_dato(Datos_out),
-    .flat_out(flat_out_tx)
+    .flat_out(flat_out_tx),
+    .ocupado(uart_ocupada)
 );
 
 
 reg [2:0] estado_actual;
 
+// En rafaga Ena_out es flat_out: un ciclo por byte, junto con Datos_out
+assign Ena_out = rafaga_read ? flat_out_tx : Ena_out_contador;
+
     // Lógica para la transición de estados (Contador Síncrono)
     always @(posedge clk or negedge rst) begin
         if (!rst) begin
             estado_actual <= 3'b000; // Reset a 0
-            Ena_out<=1'b0;
+            Ena_out_contador<=1'b0;
         end else if (estado_actual == 3'b000) begin
             if (flat_out_tx)begin
                 estado_actual <= 3'b001; // Reinicia a 0 después del estado 5
-                Ena_out<=1'b1;
+                Ena_out_contador<=1'b1;
             end
         end else if (estado_actual == 3'b101) begin
             
                 estado_actual <= 3'b000; // Reinicia a 0 después del estado 5
-                Ena_out<=1'b0;
+                Ena_out_contador<=1'b0;
             
         end else begin
             estado_actual <= estado_actual + 3'h1; // Incrementa el contador
@@ -0,0 +1,66 @@
+// Cola de DEPTH palabras de WIDTH bits (resultados y pares de operandos de
+// TensorFlowE). dato_out es la cabeza de la cola y ocupacion las palabras
+// guardadas. Un push con la cola llena se descarta (salvo que haya pop en
+// el mismo ciclo) y un pop con la cola vacia no hace nada. clear vacia la
+// cola.
+module fifo_palabras #(
+    parameter int DEPTH = 4,
+    parameter int WIDTH = 16
+)(
+    input  logic clk,
+    input  logic rst,
+    input  logic clear,
+    input  logic push,
+    input  logic pop,
+    input  logic [WIDTH-1:0] dato_in,
+    output logic [WIDTH-1:0] dato_out,
+    output logic [$clog2(DEPTH+1)-1:0] ocupacion
+);
+
+    localparam PTR_W = (DEPTH > 1) ? $clog2(DEPTH) : 1;
+    localparam CNT_W = $clog2(DEPTH+1);
+
+    logic [WIDTH-1:0] mem [DEPTH];
+    logic [PTR_W-1:0] rd;
+    logic [PTR_W-1:0] wr;
+    logic vacia;
+    logic llena;
+    logic escribe;
+    logic lee;
+
+    assign vacia = (ocupacion == '0);
+    assign llena = (ocupacion == CNT_W'(DEPTH));
+    assign lee = pop & (!vacia);
+    assign escribe = push & ((!llena) | lee);
+    assign dato_out = mem[rd];
+
+    always_ff @(posedge clk or negedge rst)
+    begin
+        if (!rst)
+        begin
+            rd<='0;
+            wr<='0;
+            ocupacion<='0;
+            for (int n = 0; n < DEPTH; n++)
+                mem[n]<='0;
+        end
+        else if (clear)
+        begin
+            rd<='0;
+            wr<='0;
+            ocupacion<='0;
+        end
+        else
+        begin
+            if (escribe)
+            begin
+                mem[wr]<=dato_in;
+                wr<=(wr == PTR_W'(DEPTH-1)) ? '0 : wr+1'b1;
+            end
+            if (lee)
+                rd<=(rd == PTR_W'(DEPTH-1)) ? '0 : rd+1'b1;
+            ocupacion<=ocupacion+CNT_W'(escribe)-CNT_W'(lee);
+        end
+    end
+
+endmodule
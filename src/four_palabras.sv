@@ -1,55 +1,72 @@
-module four_palabras (
+// Junta BYTES palabras de 8 bits de dato (la primera en el byte bajo) y
+// da la matriz de DATA_WIDTH bits en data_comple, con flat_comple un ciclo.
+module four_palabras #(
+    parameter int DATA_WIDTH = mmac_pkg::DATA_WIDTH,
+    localparam int BYTES = (DATA_WIDTH+7)/8
+) (
     input  logic [7:0] dato,
     input  logic       rx_flat,
     input  logic       rst,
     input  logic       clk,
 
-    output logic [15:0] data_comple,
+    output logic [DATA_WIDTH-1:0] data_comple,
     output logic        flat_comple
 );
-    parameter palabras_escale = 2;//cantidad de palabras de 8 bits
-    parameter bits_escale = 2;
-    logic [bits_escale:0]  con;
-    logic [7:0]  mem; 
+    localparam palabras_escale = BYTES;//cantidad de palabras de 8 bits
+    localparam bits_escale = $clog2(BYTES+1);
+    // bytes anteriores al ultimo, el primero en los bits bajos
+    localparam MEM_W = (BYTES > 1) ? 8*(BYTES-1) : 8;
+    logic [bits_escale-1:0]  con;
+    logic [MEM_W-1:0]  mem; 
+    logic [8*BYTES-1:0] palabra;
 //    logic [palabras_escale*8-1:0] var_data_comple;
 
+    generate
+        if (BYTES > 1) begin : g_varios
+            assign palabra = {dato, mem};
+        end else begin : g_uno
+            assign palabra = dato;
+            logic _unused_mem = &{1'b0, mem};
+        end
+    endgenerate
+
     // Inicialización
     initial begin
-        con          <= 3'h0;
-        data_comple  <= 16'h0;
-        flat_comple  <= 1'b0;
+        con          = '0;
+        data_comple  = '0;
+        flat_comple  = 1'b0;
         
-        mem<= 8'h0;
+        mem= '0;
         //var_data_comple=16'h0;
     end
 
     // Lógica secuencial con reset asíncrono
     always_ff @(posedge clk or negedge rst) begin
         if (!rst) begin
-            con          <= 3'h0;
-            data_comple  <= 16'h0;
+            con          <= '0;
+            data_comple  <= '0;
             flat_comple  <= 1'b0;
-            mem<= 8'h0;
+            mem<= '0;
             //var_data_comple=16'h0;
         end
         else begin
             if (rx_flat) begin
-                if (con==3'h0)
-                    mem <= dato;
+                // registro de desplazamiento: el byte nuevo entra arriba
+                mem <= MEM_W'(palabra >> 8);
                 
 
-                if (con == palabras_escale-1) begin
+                if (con == bits_escale'(palabras_escale-1)) begin
                     flat_comple<=1'b1;
                     //var_data_comple=({dato,8'h0});
                     //EL 4 ES POR (2**5)/8, DATA SERIA 5 DATA=5.
-                    data_comple<=({dato,mem});
+                    data_comple<=palabra[DATA_WIDTH-1:0];
                     //data_comple<=var_data_comple;
                     
-                    con             <= 3'h0;
+                    con             <= '0;
                 end
                 else begin
                     flat_comple <= 1'b0;
-                    con      <= con + 3'h1;
+                    con      <= con + bits_escale'(1);
                 end
             end
             else
@@ -125,4 +142,4 @@ module four_palabras (
 endmodule
 
 
-*/
\ No newline at end of file
+*/
@@ -1,5 +1,5 @@
 
-module matrix_accumulate_unit #( localparam DATA_WIDTH = 16//, //data width of the module
+module matrix_accumulate_unit #( parameter int DATA_WIDTH = mmac_pkg::DATA_WIDTH//, //data width of the module
   
 // localparam VAR_WIDTH = 8,  //data width of internal variables
  
@@ -20,10 +20,10 @@ logic [DATA_WIDTH-1:0] accumulator;
 
     always_ff @(posedge clock or negedge reset) begin
         if (!reset) begin
-          accumulator <= 16'h0;
+          accumulator <= '0;
         end
         else if (clear) begin
-          accumulator <= 16'h0;
+          accumulator <= '0;
         end
         else if (enable& listo)begin
           accumulator<=result + accumulator ;
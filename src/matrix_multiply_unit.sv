@@ -1,32 +1,79 @@
 
 
-module matrix_multiply_unit (
+// MODE selecciona el datapath:
+//   0 (serie): recorre i, j, k en S_CALC con un solo acumulador de
+//     2*VAR_WIDTH bits, M_SIZE+1 ciclos por elemento;
+//   1 (paralelo): M_SIZE**3 multiplicadores de VAR_WIDTH bits y un sumador
+//     por elemento calculan la matriz en el ciclo en que llega enable;
+//   2 (segmentado): captura A y B con enable y calcula en dos etapas
+//     (productos, sumas). Acepta un enable por ciclo aunque haya
+//     productos en vuelo y el resultado sale tres ciclos despues.
+// En todos, listo sube un ciclo junto con cada result nuevo y libre indica
+// que un enable en este ciclo empieza un producto. M_SIZE y VAR_WIDTH
+// salen de mmac_pkg; el elemento [fila][col] va en los bits
+// VAR_WIDTH*(fila*M_SIZE+col) +: VAR_WIDTH. result_ancho tiene los
+// 2*VAR_WIDTH bits del acumulador de cada elemento en la misma posicion
+// (2*VAR_WIDTH*(fila*M_SIZE+col)); result son sus VAR_WIDTH bits bajos.
+// El acumulador no tiene precision completa: el producto escalar llega a
+// M_SIZE*(2**VAR_WIDTH-1)**2 (450 en 2x2 de 4 bits), que necesita
+// 2*VAR_WIDTH+$clog2(M_SIZE) bits, asi que cada elemento es exacto
+// modulo 2**(2*VAR_WIDTH).
+module matrix_multiply_unit #(
+    parameter int MODE = 0,
+    parameter int M_SIZE = mmac_pkg::M_SIZE,
+    parameter int VAR_WIDTH = mmac_pkg::VAR_WIDTH,
+    localparam int DATA_WIDTH = M_SIZE*M_SIZE*VAR_WIDTH
+) (
     input logic clk,
     input logic rst,
     input logic enable,
-    input  logic [15:0] matrixA, //|<i
-    input  logic [15:0] matrixB, //|<i
-    output logic [15:0] result,   //|>o
-    output logic listo
+    input  logic [DATA_WIDTH-1:0] matrixA, //|<i
+    input  logic [DATA_WIDTH-1:0] matrixB, //|<i
+    output logic [DATA_WIDTH-1:0] result,   //|>o
+    output logic [2*DATA_WIDTH-1:0] result_ancho,
+    output logic listo,
+    output logic libre
 );
 
-    localparam VAR_WIDTH = 4;
-    localparam M_SIZE = 2;
+    // Los contadores llegan a M_SIZE (k), los indices a M_SIZE-1
+    localparam int CNT_W = $clog2(M_SIZE+1);
+    localparam int IDX_W = $clog2(M_SIZE);
+    localparam int ACC_W = 2*VAR_WIDTH;
 
     logic [VAR_WIDTH-1:0] A1 [0:M_SIZE-1][0:M_SIZE-1];
     logic [VAR_WIDTH-1:0] B1 [0:M_SIZE-1][0:M_SIZE-1];
-    logic [VAR_WIDTH-1:0] Res1 [0:M_SIZE-1][0:M_SIZE-1];
+    logic [ACC_W-1:0] Res1 [0:M_SIZE-1][0:M_SIZE-1];
 
     // Contadores para iterar a través de las matrices
-    reg [1:0] i, j, k;
+    reg [CNT_W-1:0] i, j, k;
 
     // Acumulador para la suma de productos
-    reg [7:0] accumulator; // VAR_WIDTH*2 (4*2=8) para evitar desbordamiento
+    reg [ACC_W-1:0] accumulator; // VAR_WIDTH*2 para evitar desbordamiento
 
     // Variable de estado para controlar el flujo de datos
     reg [2:0] state;
     localparam S_IDLE = 3'd0, S_LOAD = 3'd1, S_CALC = 3'd2, S_STORE = 3'd3, S_DONE = 3'd4;
     
+    localparam MODE_SERIAL = 0, MODE_PARALLEL = 1, MODE_PIPELINED = 2;
+
+    assign libre = (MODE == MODE_PIPELINED) | (state == S_IDLE);
+
+    // Datapath paralelo: cada elemento es la suma de A[i][k]*B[k][j] en
+    // 2*VAR_WIDTH bits, como el acumulador de S_CALC
+    logic [2*DATA_WIDTH-1:0] result_par;
+    logic [ACC_W-1:0] suma_par [0:M_SIZE-1][0:M_SIZE-1];
+
+    // Datapath segmentado. Etapa 1: operandos capturados con enable;
+    // etapa 2: los M_SIZE**3 productos en 2*VAR_WIDTH bits; salida: la
+    // suma de los productos de cada elemento va a result con listo.
+    logic [DATA_WIDTH-1:0] A_q, B_q;
+    logic valido_q, valido_p;
+    logic [VAR_WIDTH-1:0] Aq1 [0:M_SIZE-1][0:M_SIZE-1];
+    logic [VAR_WIDTH-1:0] Bq1 [0:M_SIZE-1][0:M_SIZE-1];
+    logic [ACC_W-1:0] prod_p [0:M_SIZE-1][0:M_SIZE-1][0:M_SIZE-1];
+    logic [ACC_W-1:0] suma_pipe [0:M_SIZE-1][0:M_SIZE-1];
+    logic [2*DATA_WIDTH-1:0] result_pipe;
+
     // Convertir de 1D a 2D y viceversa
     always_comb begin
         for(int row = 0; row < M_SIZE; row = row + 1) begin
@@ -34,7 +81,56 @@ module matrix_multiply_unit (
                 
                 A1[row][col] = matrixA[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH];
                 B1[row][col] = matrixB[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH];
-                // result[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH] = Res1[row][col];
+                result[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH]
+                    = result_ancho[ACC_W*(row*M_SIZE+col) +: VAR_WIDTH];
+            end
+        end
+        for(int row = 0; row < M_SIZE; row = row + 1) begin
+            for(int col = 0; col < M_SIZE; col = col + 1) begin
+                suma_par[row][col] = '0;
+                suma_pipe[row][col] = '0;
+                for(int kk = 0; kk < M_SIZE; kk = kk + 1) begin
+                    suma_par[row][col] = suma_par[row][col]
+                                       + ACC_W'(A1[row][kk]) * ACC_W'(B1[kk][col]);
+                    suma_pipe[row][col] = suma_pipe[row][col] + prod_p[row][col][kk];
+                end
+                result_par[ACC_W*(row*M_SIZE+col) +: ACC_W] = suma_par[row][col];
+                Aq1[row][col] = A_q[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH];
+                Bq1[row][col] = B_q[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH];
+                result_pipe[ACC_W*(row*M_SIZE+col) +: ACC_W] = suma_pipe[row][col];
+            end
+        end
+    end
+
+    // Etapas del datapath segmentado; en los otros modos quedan en reset
+    always @(posedge clk or negedge rst) begin
+        if (!rst) begin
+            A_q <= '0;
+            B_q <= '0;
+            valido_q <= 1'b0;
+            valido_p <= 1'b0;
+            for(int row = 0; row < M_SIZE; row = row + 1) begin
+                for(int col = 0; col < M_SIZE; col = col + 1) begin
+                    for(int kk = 0; kk < M_SIZE; kk = kk + 1) begin
+                        prod_p[row][col][kk] <= '0;
+                    end
+                end
+            end
+        end else if (MODE == MODE_PIPELINED) begin
+            valido_q <= enable;
+            if (enable) begin
+                A_q <= matrixA;
+                B_q <= matrixB;
+            end
+            valido_p <= valido_q;
+            if (valido_q) begin
+                for(int row = 0; row < M_SIZE; row = row + 1) begin
+                    for(int col = 0; col < M_SIZE; col = col + 1) begin
+                        for(int kk = 0; kk < M_SIZE; kk = kk + 1) begin
+                            prod_p[row][col][kk] <= ACC_W'(Aq1[row][kk]) * ACC_W'(Bq1[kk][col]);
+                        end
+                    end
+                end
             end
         end
     end
@@ -42,16 +138,16 @@ module matrix_multiply_unit (
     // MÁQUINA DE ESTADOS
     always @(posedge clk or negedge rst) begin
         if (!rst) begin
-            i <= 2'd0;
-            j <= 2'd0;
-            k <= 2'd0;
+            i <= '0;
+            j <= '0;
+            k <= '0;
             state <= S_IDLE;
-            accumulator <= 8'd0;
-            result <= 16'd0;
+            accumulator <= '0;
+            result_ancho <= '0;
             listo<= 1'b0;
             for(int row = 0; row < M_SIZE; row = row + 1) begin
                 for(int col = 0; col < M_SIZE; col = col + 1) begin
-                    Res1[row][col] <= 4'd0;
+                    Res1[row][col] <= '0;
                 end
             end
         end else begin
@@ -60,36 +156,57 @@ module matrix_multiply_unit (
                     // Espera una señal para iniciar la operación
                     // Por ejemplo, un pulso en la entrada `start`
                     // Por ahora, pasamos directamente a la carga
-                    if (enable)
+                    if (MODE == MODE_PIPELINED)
                     begin
-                        state <= S_LOAD;
+                        // la maquina no sale de S_IDLE: result y listo
+                        // vienen de la ultima etapa
+                        if (valido_p)
+                            result_ancho <= result_pipe;
+                        listo<= valido_p;
+                    end
+                    else if (enable && MODE == MODE_PARALLEL)
+                    begin
+                        // un solo ciclo: result y listo salen juntos
+                        result_ancho <= result_par;
+                        state <= S_DONE;
+                        listo<= 1'b1;
+                    end
+                    else
+                    begin
+                        if (enable)
+                            state <= S_LOAD;
+                        listo<= 1'b0;
                     end
-                    listo<= 1'b0;
                 end
                 S_LOAD: begin
                     // Carga las matrices en los registros internos
                     state <= S_CALC;
                 end
                 S_CALC: begin
-                    // Realiza una operación por ciclo de reloj
-                    if (k < M_SIZE) begin
-                        accumulator <= accumulator + (A1[i[0]][k[0]] * B1[k[0]][j[0]]);
-                        k <= k + 2'h1;
+                    // Realiza una operación por ciclo de reloj. En modo
+                    // paralelo o segmentado no se llega aca; la condicion
+                    // constante deja que la sintesis quite el datapath serie.
+                    if (MODE != MODE_SERIAL) begin
+                        state <= S_IDLE;
+                    end else if (k < CNT_W'(M_SIZE)) begin
+                        accumulator <= accumulator + ACC_W'(A1[i[IDX_W-1:0]][k[IDX_W-1:0]])
+                                                   * ACC_W'(B1[k[IDX_W-1:0]][j[IDX_W-1:0]]);
+                        k <= k + CNT_W'(1);
                     end else begin
-                        Res1[i[0]][j[0]] <= accumulator[VAR_WIDTH-1:0]; // Almacena el resultado (saturando si es necesario)
+                        Res1[i[IDX_W-1:0]][j[IDX_W-1:0]] <= accumulator; // Almacena el resultado completo
                         
                         // Resetea el acumulador y avanza a la siguiente posición
-                        accumulator <= 8'd0;
-                        k <= 2'd0;
+                        accumulator <= '0;
+                        k <= '0;
                         
-                        if (j < M_SIZE-1) begin
-                            j <= j + 2'h1;
+                        if (j < CNT_W'(M_SIZE-1)) begin
+                            j <= j + CNT_W'(1);
                         end else begin
-                            j <= 2'd0;
-                            if (i < M_SIZE-1) begin
-                                i <= i + 2'h1;
+                            j <= '0;
+                            if (i < CNT_W'(M_SIZE-1)) begin
+                                i <= i + CNT_W'(1);
                             end else begin
-                                i <= 2'd0;
+                                i <= '0;
                                 state <= S_STORE; // Pasa a la fase de almacenamiento
                             end
                         end
@@ -102,7 +219,7 @@ module matrix_multiply_unit (
                         for(int col = 0; col < M_SIZE; col = col + 1) begin
 
                             
-                            result[VAR_WIDTH*(row*M_SIZE+col) +: VAR_WIDTH] <= Res1[row][col];
+                            result_ancho[ACC_W*(row*M_SIZE+col) +: ACC_W] <= Res1[row][col];
                         end
                     end
                     state <= S_DONE;
@@ -3,12 +3,27 @@
 //          Matrix MAC unit package          //
 //===========================================//
 
+// Tamano de la matriz y bits por elemento (make M_SIZE=n VAR_WIDTH=n en
+// test/). Los modulos toman de aca sus parametros por defecto.
+`ifndef MMAC_M_SIZE
+`define MMAC_M_SIZE 2
+`endif
+`ifndef MMAC_VAR_WIDTH
+`define MMAC_VAR_WIDTH 4
+`endif
+
 package mmac_pkg; //matrix-mac-package
-  
- localparam DATA_WIDTH = 16; //data width of the module
-  
- localparam VAR_WIDTH = 4;  //data width of internal variables
- 
- localparam M_SIZE = 4; //matrix size
-  
+
+ localparam int M_SIZE = `MMAC_M_SIZE; //matrix size
+
+ localparam int VAR_WIDTH = `MMAC_VAR_WIDTH;  //data width of internal variables
+
+ localparam int DATA_WIDTH = M_SIZE*M_SIZE*VAR_WIDTH; //data width of the module
+
+ // bytes por matriz en Datos_in y Datos_out, el ultimo con relleno en cero
+ localparam int BYTES_WORD = (DATA_WIDTH+7)/8;
+
+ // resultado ancho: los 2*VAR_WIDTH bits del acumulador de cada elemento
+ localparam int BYTES_WIDE = (2*DATA_WIDTH+7)/8;
+
 endpackage
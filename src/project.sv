@@ -15,12 +15,12 @@ module tt_um_TensorFlowE (
     input  logic       clk,      // clock
     input  logic       rst_n     // reset_n - low to reset
 );
-  assign uio_oe  = 8'b0001_0000;
-    assign uio_out[7:5] = 3'h0;
+  assign uio_oe  = 8'b1101_0000;
+    assign uio_out[5] = 1'h0;
     assign uio_out[3:0] = 4'h0;
     
   // List all unused inputs to prevent warnings
-logic _unused = &{ena, uio_in[7:4], 1'b0 };
+logic _unused = &{ena, uio_in[7:6], uio_in[4], 1'b0 };
   //,uio_out[7:5],uio_out[3:0]
     
 TensorFlowE core(
@@ -31,8 +31,11 @@ TensorFlowE core(
     .Ena_read(uio_in[1]),
     .clear(uio_in[2]),
     .enable_accu(uio_in[3]),
+    .weight_hold(uio_in[5]),
     .Datos_out(uo_out),
-    .Ena_out(uio_out[4])
+    .Ena_out(uio_out[4]),
+    .Dato_listo(uio_out[6]),
+    .Cola_llena(uio_out[7])
     //.dato_disponible(uio_out[5])
 
 );
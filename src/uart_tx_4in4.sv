@@ -1,21 +1,38 @@
-module uart_tx_4in4(
+// Serializa input_dato en BYTES bytes por Output_dato (BYTES_CORTO con largo
+// en bajo), empezando por el byte bajo. Cada byte sale con un next_uart, o
+// con rafaga en alto uno por ciclo desde start; flat_out marca cada byte
+// nuevo y ocupado queda en alto mientras quedan bytes por sacar.
+module uart_tx_4in4 #(
+	parameter int BYTES = 2,
+	parameter int BYTES_CORTO = BYTES
+)(
 input logic clk,start,next_uart,rst,
-input logic [15:0] input_dato,
+input logic rafaga,
+input logic largo,
+input logic [8*BYTES-1:0] input_dato,
 output logic [7:0] Output_dato,
-output logic flat_out
+output logic flat_out,
+output logic ocupado
 );
 
+	localparam CON_W = $clog2(BYTES+1);
+
 	logic Flat,First;
-	logic [15:0] Dato;
-	logic [1:0]Con;
+	logic [8*BYTES-1:0] Dato;
+	logic [CON_W-1:0]Con;
+	logic [CON_W-1:0]Total;
+
+	assign Total = largo ? CON_W'(BYTES) : CON_W'(BYTES_CORTO);
+
+	assign ocupado = Flat;
 	initial
 	begin
-		Flat<=1'b0;
-			Con<=2'h0;
-			First<=1'b0;
-			flat_out<=1'b0;
-			Output_dato<=8'h0;
-			Dato<=16'h0;
+		Flat=1'b0;
+			Con='0;
+			First=1'b0;
+			flat_out=1'b0;
+			Output_dato=8'h0;
+			Dato='0;
 	end
 
 	always @(posedge clk,negedge rst)
@@ -23,11 +40,11 @@ output logic flat_out
 		if(!rst)
 		begin
 			Flat<=1'b0;
-			Con<=2'h0;
+			Con<='0;
 			First<=1'b0;
 			flat_out<=1'b0;
 			Output_dato<=8'h0;
-			Dato<=16'h0;
+			Dato<='0;
 		end
 		else
 		begin
@@ -38,7 +55,7 @@ output logic flat_out
 				Dato<=input_dato;
 				//Output_dato<=input_dato[7:0];
 				First<=1'b1;
-				Con<=2'h0;
+				Con<='0;
 			end
 			/*
 			if(First)
@@ -48,17 +65,17 @@ output logic flat_out
 			end
 			*/
 			
-			if (Flat&(First|next_uart))
+			if (Flat&(First|next_uart|rafaga))
 			begin
 				
 				
 				First<=1'b0;
 				
-				if (Con<2'd2)
+				if (Con<Total)
 				begin
 					
 					Dato<=Dato>>4'd8;
-					Con<=Con+2'b01;
+					Con<=Con+1'b1;
 
 					flat_out<=1'b1;
 					Output_dato<=Dato[7:0];
@@ -68,7 +85,7 @@ output logic flat_out
 				begin
 					Flat<=1'b0;
 					
-					Con<=2'h0;
+					Con<='0;
 					flat_out<=1'b0;
 
 					//flat_out<=0;
@@ -76,10 +93,10 @@ output logic flat_out
 				end
 			end
 			
-			else if (Con==2'd2) begin
+			else if (Con==Total) begin
 				Flat<=1'b0;
 
-					Con<=2'h0;
+					Con<='0;
 					flat_out<=1'b0;
 			end
 			else
@@ -0,0 +1,212 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Area y latencia de cada datapath de matrix_multiply_unit.
+
+Sintetiza con yosys (``yosys`` o ``yowasp-yosys``) el multiplicador solo
+y el diseno completo para cada ``MODE`` y cuenta celdas genericas y
+flip-flops. La latencia sale del modelo ciclo a ciclo: ciclos desde que
+``matrix_multiply_unit`` ve ``enable`` hasta ``listo``, ciclos minimos
+entre dos ``enable`` que dan dos resultados y ciclos de una
+multiplicacion en modo handshake (escritura de A y B incluida).
+
+Las celdas genericas sirven para comparar los modos entre si; el area
+real en la tile sale del flujo de GDS (``gds.yaml``). Sin ABC (lo que
+pasa con ``yowasp-yosys``) la logica queda sin optimizar y los numeros
+son una cota superior.
+
+``--sizes`` repite el diseno completo para otros ``M_SIZE`` y
+``VAR_WIDTH`` (``-DMMAC_M_SIZE``/``-DMMAC_VAR_WIDTH``, ver ``mmac_pkg.sv``)
+y agrega los MAC/s al reloj de ``info.yaml`` por cada mil celdas, con
+productos seguidos (``entre enable``) y con una multiplicacion en
+handshake por vez. La latencia de cada tamano sale de correr este script
+con ``M_SIZE`` y ``VAR_WIDTH`` en el entorno, que es lo que lee ``codec``.
+
+Uso::
+
+    python area.py [--yosys yowasp-yosys] [--json area.json]
+    python area.py --sizes 2x4 3x4 4x4 2x8
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(AQUI, "..", "src")
+sys.path.insert(0, AQUI)
+
+from tensorflowe import MIN_TIMING, CycleDriver  # noqa: E402
+from tensorflowe.codec import M_SIZE, MASK_VAR  # noqa: E402
+from tensorflowe.cycle import MULT_MODES, TensorFlowECycleModel  # noqa: E402
+from tensorflowe.driver import SERIAL_CALC_CYCLES  # noqa: E402
+from tensorflowe.gemm import CLOCK_HZ  # noqa: E402
+
+FUENTES = ["mmac_pkg.sv", "project.sv", "four_palabras.sv", "matrix_multiply_unit.sv", "matrix_accumulate_unit.sv",
+           "TensorFlowE.sv", "uart_tx_4in4.sv", "fifo_palabras.sv"]
+
+
+def _yosys_por_defecto() -> Optional[str]:
+    return shutil.which("yosys") or shutil.which("yowasp-yosys")
+
+
+def synth(yosys: str, script: str) -> Dict[str, int]:
+    """Corre ``script`` y devuelve las celdas del ultimo ``stat`` por tipo"""
+    # yowasp-yosys solo ve el directorio actual, asi que se corre desde src/
+    salida = subprocess.run([yosys, "-p", script + "; stat"], cwd=SRC,
+                            capture_output=True, text=True, check=True).stdout
+    celdas: Dict[str, int] = {}
+    for linea in salida[salida.rfind("==="):].splitlines():
+        m = re.match(r"\s*(\d+)\s+(\$\S+)", linea)
+        if m:
+            celdas[m.group(2)] = int(m.group(1))
+    return celdas
+
+
+def resumen(celdas: Dict[str, int]) -> Dict[str, int]:
+    flops = sum(n for c, n in celdas.items() if "DFF" in c or "LATCH" in c)
+    total = sum(n for c, n in celdas.items() if c != "$scopeinfo")
+    return {"cells": total, "flops": flops, "logic": total - flops}
+
+
+def latencia(mode: int) -> Dict[str, int]:
+    """Ciclos de enable a listo y de una multiplicacion en handshake"""
+    drv = CycleDriver(timing=MIN_TIMING, handshake=True, mult_mode=mode)
+    drv.start()
+    matriz = [[(M_SIZE * i + j + 1) & MASK_VAR for j in range(M_SIZE)] for i in range(M_SIZE)]
+    tr = drv.multiply(matriz, matriz)
+
+    hw = TensorFlowECycleModel(mode)
+    hw.ena_tpu = 1
+    hw.step(0, 0)
+    ciclos = 1
+    while not hw.listo:
+        hw.step(0, 0)
+        ciclos += 1
+    return {"enable_to_listo": ciclos, "enable_interval": intervalo(mode), "multiply_handshake": tr.cycles}
+
+
+def intervalo(mode: int, limite: Optional[int] = None) -> int:
+    """Ciclos minimos entre dos ``enable`` para que los dos den ``listo``"""
+    if limite is None:
+        limite = 4 * (SERIAL_CALC_CYCLES + 4)
+    for separacion in range(1, limite):
+        hw = TensorFlowECycleModel(mode)
+        resultados = 0
+        for ciclo in range(limite):
+            hw.ena_tpu = int(ciclo in (0, separacion))
+            hw.step(0, 0)
+            resultados += hw.listo
+        if resultados == 2:
+            return separacion
+    raise RuntimeError(f"MODE {mode} no acepta dos enable en {limite} ciclos")
+
+
+def modos(yosys: str, opciones: str) -> Dict[str, Dict]:
+    """Multiplicador solo y diseno completo para cada ``MODE``, con el tamano de ``mmac_pkg``"""
+    resultados = {}
+    for nombre, mode in MULT_MODES.items():
+        unidad = synth(yosys, f"read_verilog -sv mmac_pkg.sv matrix_multiply_unit.sv; "
+                              f"chparam -set MODE {mode} matrix_multiply_unit; "
+                              f"synth -flatten{opciones} -top matrix_multiply_unit")
+        diseno = synth(yosys, f"read_verilog -sv -DMULT_MODE={mode} {' '.join(FUENTES)}; "
+                              f"synth -flatten{opciones} -top tt_um_TensorFlowE")
+        resultados[nombre] = {"multiply_unit": resumen(unidad), "design": resumen(diseno),
+                              **latencia(mode)}
+    return resultados
+
+
+def imprimir_modos(resultados: Dict[str, Dict]):
+    print(f"{'MULT':10s} {'celdas mult':>12s} {'FF mult':>8s} {'celdas total':>13s} {'FF total':>9s} "
+          f"{'enable->listo':>14s} {'entre enable':>13s} {'multiply':>9s}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:10s} {r['multiply_unit']['cells']:12d} {r['multiply_unit']['flops']:8d} "
+              f"{r['design']['cells']:13d} {r['design']['flops']:9d} "
+              f"{r['enable_to_listo']:14d} {r['enable_interval']:13d} {r['multiply_handshake']:9d}")
+
+
+def tamano(texto: str) -> Tuple[int, int]:
+    """``"3x8"`` -> ``(3, 8)``: lado de la matriz y bits por elemento"""
+    m = re.fullmatch(r"(\d+)x(\d+)", texto)
+    if not m or int(m.group(1)) < 2 or not 1 <= int(m.group(2)) <= 8:
+        raise argparse.ArgumentTypeError(f"tamano invalido {texto!r}; se espera MxW con M >= 2 y W <= 8")
+    return int(m.group(1)), int(m.group(2))
+
+
+def latencia_en(m_size: int, var_width: int, mode: int) -> Dict[str, int]:
+    """``latencia(mode)`` en otro proceso con ``M_SIZE`` y ``VAR_WIDTH`` en el entorno"""
+    entorno = dict(os.environ, M_SIZE=str(m_size), VAR_WIDTH=str(var_width))
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--latency", str(mode)],
+                            env=entorno, capture_output=True, text=True, check=True).stdout
+    return json.loads(salida)
+
+
+def barrido(yosys: str, opciones: str, tamanos: List[Tuple[int, int]]) -> Dict[str, Dict]:
+    """Area del diseno completo y MAC/s por mil celdas para cada tamano y ``MODE``"""
+    resultados = {}
+    for m_size, var_width in tamanos:
+        for nombre, mode in MULT_MODES.items():
+            diseno = resumen(synth(yosys, f"read_verilog -sv -DMULT_MODE={mode} -DMMAC_M_SIZE={m_size} "
+                                          f"-DMMAC_VAR_WIDTH={var_width} {' '.join(FUENTES)}; "
+                                          f"synth -flatten{opciones} -top tt_um_TensorFlowE"))
+            ciclos = latencia_en(m_size, var_width, mode)
+            macs = m_size ** 3
+            resultados[f"{m_size}x{var_width}/{nombre}"] = {
+                "m_size": m_size, "var_width": var_width, "mode": nombre, "design": diseno, **ciclos,
+                "macs_per_product": macs,
+                "macs_per_second_per_kcell": 1e3 * macs * CLOCK_HZ / ciclos["enable_interval"] / diseno["cells"],
+                "handshake_macs_per_second_per_kcell":
+                    1e3 * macs * CLOCK_HZ / ciclos["multiply_handshake"] / diseno["cells"],
+            }
+    return resultados
+
+
+def imprimir_barrido(resultados: Dict[str, Dict]):
+    print(f"{'tamano':7s} {'MULT':10s} {'celdas':>8s} {'FF':>6s} {'entre enable':>13s} {'multiply':>9s} "
+          f"{'MMAC/s/kcelda':>14s} {'handshake':>10s}")
+    for r in resultados.values():
+        print(f"{r['m_size']}x{r['var_width']:<5d} {r['mode']:10s} {r['design']['cells']:8d} "
+              f"{r['design']['flops']:6d} {r['enable_interval']:13d} {r['multiply_handshake']:9d} "
+              f"{r['macs_per_second_per_kcell'] / 1e6:14.2f} {r['handshake_macs_per_second_per_kcell'] / 1e6:10.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--yosys", default=_yosys_por_defecto())
+    parser.add_argument("--abc", action="store_true",
+                        help="optimizar con ABC (por defecto solo con yosys nativo)")
+    parser.add_argument("--sizes", nargs="+", type=tamano, metavar="MxW",
+                        help="barrido de M_SIZE x VAR_WIDTH sobre el diseno completo")
+    parser.add_argument("--latency", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="guarda los resultados")
+    args = parser.parse_args(argv)
+    if args.latency is not None:
+        # usado por latencia_en, con M_SIZE y VAR_WIDTH del entorno
+        print(json.dumps(latencia(args.latency)))
+        return 0
+    if not args.yosys:
+        parser.error("no se encontro yosys ni yowasp-yosys")
+    abc = args.abc or os.path.basename(args.yosys) == "yosys"
+    opciones = "" if abc else " -noabc"
+
+    if args.sizes:
+        resultados = barrido(args.yosys, opciones, args.sizes)
+        imprimir_barrido(resultados)
+    else:
+        resultados = modos(args.yosys, opciones)
+        imprimir_modos(resultados)
+    if not abc:
+        print("(sin ABC: celdas genericas sin optimizar)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks de rendimiento de la simulacion de tt_um_TensorFlowE.
+
+Se corren con ``make bench`` (RTL) o ``make bench GATES=yes``, con
+``SIM=icarus`` o ``SIM=verilator``. Cada carga reporta ciclos simulados
+por operacion de matriz, segundos de reloj de pared por ciclo simulado y
+operaciones por segundo, y escribe todo en
+``bench_results_<configuracion>_<sim>.json``. Los ciclos no dependen del
+simulador; la velocidad de referencia se guarda por simulador.
+
+La configuracion es el build (``rtl`` o ``gl``) con los mismos sufijos que
+el directorio de ``make``: ``_<MULT>`` fuera de ``serial`` y
+``_m<M_SIZE>x<VAR_WIDTH>`` fuera de 2x4, p. ej. ``rtl_parallel_m3x4``.
+Cada una tiene su propia entrada en la referencia, porque los ciclos
+cambian con el datapath y el tamano.
+
+``python bench.py --compare`` muestra la aceleracion de Verilator sobre
+Icarus a partir de los dos archivos de resultados (``make bench-compare``
+corre ambos). ``--markdown`` la imprime como la tabla del README, y
+``make bench-compare BENCH_UPDATE=1`` guarda ademas la velocidad de los dos
+simuladores en la referencia.
+
+Variables de entorno:
+
+- ``BENCH_BASELINE``: archivo de referencia (``bench_baseline.json``).
+- ``BENCH_TOLERANCE``: aumento relativo permitido de ciclos por operacion
+  (0.0 por defecto; el protocolo es determinista).
+- ``BENCH_SPEED_CHECK=1``: revisa tambien las operaciones por segundo.
+  Dependen de la maquina, asi que por defecto solo se revisan los ciclos.
+- ``BENCH_SPEED_TOLERANCE``: caida relativa permitida de operaciones por
+  segundo (0.5 por defecto). Solo se revisa si la referencia la tiene.
+- ``BENCH_UPDATE=1``: guarda los resultados como nueva referencia.
+- ``BENCH_OPS``: operaciones por carga (100 por defecto).
+- ``BENCH_CHAIN``: largo de las cadenas de acumulacion (8 por defecto).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import cocotb
+
+from tensorflowe import MIN_TIMING, TensorFlowEDriver, TensorFlowEModel
+from tensorflowe.codec import M_SIZE, MASK_VAR, VAR_WIDTH
+
+BASELINE = os.environ.get("BENCH_BASELINE", "bench_baseline.json")
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "0.0"))
+SPEED_TOLERANCE = float(os.environ.get("BENCH_SPEED_TOLERANCE", "0.5"))
+SPEED_CHECK = os.environ.get("BENCH_SPEED_CHECK", "0") == "1"
+UPDATE = os.environ.get("BENCH_UPDATE", "0") == "1"
+OPS = int(os.environ.get("BENCH_OPS", "100"))
+CHAIN = int(os.environ.get("BENCH_CHAIN", "8"))
+
+resultados = {}
+
+
+def matriz_aleatoria():
+    return [[random.randrange(MASK_VAR + 1) for _ in range(M_SIZE)] for _ in range(M_SIZE)]
+
+
+def build(dut):
+    # en la netlist de compuertas no queda la jerarquia interna
+    try:
+        dut.user_project.core
+    except AttributeError:
+        return "gl"
+    return "rtl"
+
+
+def configuracion(b):
+    """Build con los sufijos de MULT y del tamano, como el SIM_BUILD de make"""
+    mult = os.environ.get("MULT", "serial")
+    if mult != "serial":
+        b += f"_{mult}"
+    if (M_SIZE, VAR_WIDTH) != (2, 4):
+        b += f"_m{M_SIZE}x{VAR_WIDTH}"
+    return b
+
+
+def simulador():
+    # "Icarus Verilog" -> "icarus", "Verilator" -> "verilator"
+    return cocotb.SIM_NAME.split()[0].lower()
+
+
+def archivo_resultados(b, sim):
+    return f"bench_results_{b}_{sim}.json"
+
+
+def cargar_baseline():
+    if not os.path.exists(BASELINE):
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def guardar(nombre, datos):
+    with open(nombre, "w") as f:
+        json.dump(datos, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+async def medir(dut, carga, cuerpo):
+    """Corre ``cuerpo(drv)``, que devuelve las operaciones hechas, y compara con la referencia"""
+    drv = TensorFlowEDriver(dut, timing=MIN_TIMING, handshake=True, model=TensorFlowEModel())
+    await drv.start()
+    ciclo0 = drv.cycle
+    t0 = time.perf_counter()
+    ops = await cuerpo(drv)
+    segundos = time.perf_counter() - t0
+    ciclos = drv.cycle - ciclo0
+
+    b = configuracion(build(dut))
+    sim = simulador()
+    medida = {
+        "simulator": sim,
+        "ops": ops,
+        "cycles": ciclos,
+        "wall_seconds": segundos,
+        "cycles_per_op": ciclos / ops,
+        "wall_seconds_per_cycle": segundos / ciclos,
+        "ops_per_wall_second": ops / segundos,
+    }
+    resultados.setdefault(b, {})[carga] = medida
+    guardar(archivo_resultados(b, sim), resultados[b])
+    dut._log.info("[%s/%s] %s: %.2f ciclos/op, %.2f us/ciclo, %.1f op/s", b, sim, carga,
+                  medida["cycles_per_op"], medida["wall_seconds_per_cycle"] * 1e6, medida["ops_per_wall_second"])
+
+    baseline = cargar_baseline()
+    if UPDATE:
+        entrada = baseline.setdefault(b, {}).setdefault(carga, {})
+        entrada["cycles_per_op"] = medida["cycles_per_op"]
+        entrada.setdefault("ops_per_wall_second", {})[sim] = medida["ops_per_wall_second"]
+        guardar(BASELINE, baseline)
+        return
+    referencia = baseline.get(b, {}).get(carga)
+    if referencia is None:
+        dut._log.warning("Sin referencia para %s/%s en %s", b, carga, BASELINE)
+        return
+    limite = referencia["cycles_per_op"] * (1 + TOLERANCE)
+    assert medida["cycles_per_op"] <= limite, (
+        f"{carga}: {medida['cycles_per_op']:.2f} ciclos/op, referencia "
+        f"{referencia['cycles_per_op']:.2f} (tolerancia {TOLERANCE:.0%})"
+    )
+    velocidad = referencia.get("ops_per_wall_second", {}).get(sim)
+    if SPEED_CHECK and velocidad is not None:
+        minimo = velocidad * (1 - SPEED_TOLERANCE)
+        assert medida["ops_per_wall_second"] >= minimo, (
+            f"{carga}: {medida['ops_per_wall_second']:.1f} op/s en {sim}, referencia "
+            f"{velocidad:.1f} (tolerancia {SPEED_TOLERANCE:.0%})"
+        )
+
+
+@cocotb.test()
+async def bench_single_multiply(dut):
+    """Un producto y su lectura por operacion"""
+    async def cuerpo(drv):
+        for _ in range(OPS):
+            await drv.multiply(matriz_aleatoria(), matriz_aleatoria())
+            await drv.read_result()
+        return OPS
+
+    await medir(dut, "single_multiply", cuerpo)
+
+
+@cocotb.test()
+async def bench_accumulate_chain(dut):
+    """Cadenas de CHAIN productos acumulados, una lectura y un clear por cadena"""
+    async def cuerpo(drv):
+        cadenas = max(1, OPS // CHAIN)
+        for _ in range(cadenas):
+            await drv.accumulate()
+            for _ in range(CHAIN):
+                await drv.multiply(matriz_aleatoria(), matriz_aleatoria())
+            await drv.read_result()
+            await drv.clear()
+        return cadenas * CHAIN
+
+    await medir(dut, f"accumulate_chain_{CHAIN}", cuerpo)
+
+
+@cocotb.test()
+async def bench_clear_accumulate_interleave(dut):
+    """clear y enable_accu intercalados entre productos de a pares"""
+    async def cuerpo(drv):
+        pares = max(1, OPS // 2)
+        for _ in range(pares):
+            await drv.accumulate()
+            await drv.multiply(matriz_aleatoria(), matriz_aleatoria())
+            await drv.multiply(matriz_aleatoria(), matriz_aleatoria())
+            await drv.read_result()
+            await drv.clear()
+        return pares * 2
+
+    await medir(dut, "clear_accumulate_interleave", cuerpo)
+
+
+def comparar(b="rtl", base="icarus", otro="verilator", markdown=False):
+    """Tabla de aceleracion de ``otro`` sobre ``base``; falla si difieren los ciclos.
+
+    Con ``markdown`` imprime la tabla de la seccion Benchmarks del README.
+    """
+    archivos = [archivo_resultados(b, sim) for sim in (base, otro)]
+    faltan = [a for a in archivos if not os.path.exists(a)]
+    if faltan:
+        print(f"faltan {', '.join(faltan)}: corre make bench-compare con los dos simuladores")
+        return 1
+    with open(archivos[0]) as f:
+        lento = json.load(f)
+    with open(archivos[1]) as f:
+        rapido = json.load(f)
+    ok = True
+    if markdown:
+        print(f"| workload | cycles/op | {base} ops/s | {otro} ops/s | speedup |")
+        print("|----------|----------:|------:|------:|--------:|")
+    else:
+        print(f"{'carga':<30} {'ciclos/op':>10} {base + ' op/s':>16} {otro + ' op/s':>16} {'aceleracion':>12}")
+    for carga in sorted(set(lento) & set(rapido)):
+        x, y = lento[carga], rapido[carga]
+        if x["cycles"] != y["cycles"]:
+            ok = False
+            print(f"{carga}: {x['cycles']} ciclos en {base}, {y['cycles']} en {otro}")
+            continue
+        aceleracion = y["ops_per_wall_second"] / x["ops_per_wall_second"]
+        if markdown:
+            print(f"| {carga} | {x['cycles_per_op']:.2f} | {x['ops_per_wall_second']:.1f} "
+                  f"| {y['ops_per_wall_second']:.1f} | {aceleracion:.1f}x |")
+        else:
+            print(f"{carga:<30} {x['cycles_per_op']:>10.2f} {x['ops_per_wall_second']:>16.1f} "
+                  f"{y['ops_per_wall_second']:>16.1f} {aceleracion:>11.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara resultados de make bench entre simuladores")
+    parser.add_argument("--compare", action="store_true", required=True)
+    parser.add_argument("--build", default="rtl", choices=["rtl", "gl"])
+    parser.add_argument("--markdown", action="store_true", help="tabla para el README")
+    args = parser.parse_args()
+    # MULT, M_SIZE y VAR_WIDTH vienen del entorno, como en make bench
+    sys.exit(comparar(configuracion(args.build), markdown=args.markdown))
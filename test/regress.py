@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Regresion en paralelo: reparte tests y semillas entre procesos.
+
+Cada trabajo es una corrida de ``make sim`` con un solo test y una
+semilla. Los trabajadores tienen su propio ``SIM_BUILD``
+(``make SHARD=<n>``: ``shard_<n>`` dentro del directorio de la
+configuracion, p. ej. ``sim_build/rtl_verilator_parallel/shard_<n>``),
+que se compila una vez y se reusa, y cada
+trabajo escribe su propio log, ``results.xml`` y archivo de ondas (con
+``--make DUMP=fst``) en ``regress/``. Al final se unen todos los resultados en un solo
+``results.xml``.
+
+Uso::
+
+    python regress.py --jobs 32 --seeds 8
+    python regress.py --tests test_tensorflow_e_aleatorio --seeds 64 --make GATES=yes
+"""
+
+import argparse
+import ast
+import os
+import queue
+import random
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Job:
+    module: str
+    test: str
+    seed: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.module}.{self.test}.{self.seed}"
+
+
+@dataclass
+class JobResult:
+    job: Job
+    shard: int
+    returncode: int
+    seconds: float
+    results_file: str
+    log_file: str
+
+
+def discover_tests(module: str) -> List[str]:
+    """Nombres de las funciones decoradas con ``@cocotb.test()``"""
+    with open(os.path.join(AQUI, f"{module}.py")) as f:
+        arbol = ast.parse(f.read())
+    tests = []
+    for nodo in arbol.body:
+        if not isinstance(nodo, ast.AsyncFunctionDef):
+            continue
+        for deco in nodo.decorator_list:
+            objetivo = deco.func if isinstance(deco, ast.Call) else deco
+            if isinstance(objetivo, ast.Attribute) and objetivo.attr == "test":
+                tests.append(nodo.name)
+    return tests
+
+
+def run_job(job: Job, shard: int, outdir: str, make_args: List[str]) -> JobResult:
+    results_file = os.path.join(outdir, f"{job.name}.xml")
+    log_file = os.path.join(outdir, f"{job.name}.log")
+    # solo se usa si se pide DUMP=vcd|fst en --make
+    wave_file = os.path.join(outdir, job.name)
+    cmd = [
+        "make", "--no-print-directory", "sim",
+        # el Makefile agrega shard_<n> a su directorio por configuracion
+        # (SIM, MULT, tamanos, GATES): un cambio de --make nunca reusa el
+        # binario de otra configuracion
+        f"SHARD={shard}",
+        f"MODULE={job.module}",
+        f"TESTCASE={job.test}",
+        f"RANDOM_SEED={job.seed}",
+        f"COCOTB_RESULTS_FILE={results_file}",
+        f"DUMP_FILE={wave_file}",
+    ] + make_args
+    t0 = time.perf_counter()
+    with open(log_file, "w") as log:
+        proceso = subprocess.run(cmd, cwd=AQUI, stdout=log, stderr=subprocess.STDOUT)
+    return JobResult(job, shard, proceso.returncode, time.perf_counter() - t0,
+                     results_file, log_file)
+
+
+def merge_results(resultados: List[JobResult], salida: str) -> ET.Element:
+    """Une los results.xml de cada trabajo; la semilla queda como propiedad"""
+    raiz = ET.Element("testsuites", name="results")
+    suite = ET.SubElement(raiz, "testsuite", name="all", package="all")
+    for r in sorted(resultados, key=lambda r: r.job.name):
+        casos = []
+        if os.path.exists(r.results_file):
+            casos = ET.parse(r.results_file).getroot().iter("testcase")
+        encontrado = False
+        for caso in casos:
+            encontrado = True
+            caso.set("name", f"{caso.get('name')}[{r.job.seed}]")
+            propiedades = ET.SubElement(caso, "properties")
+            ET.SubElement(propiedades, "property", name="random_seed", value=str(r.job.seed))
+            ET.SubElement(propiedades, "property", name="shard", value=str(r.shard))
+            suite.append(caso)
+        if not encontrado:
+            # el simulador no llego a escribir resultados (error de compilacion, crash)
+            caso = ET.SubElement(suite, "testcase", name=f"{r.job.test}[{r.job.seed}]",
+                                 classname=r.job.module)
+            ET.SubElement(caso, "failure", message=f"sin resultados, ver {r.log_file}")
+    ET.ElementTree(raiz).write(salida)
+    return raiz
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count())
+    parser.add_argument("--module", default="test", help="archivo de tests (sin .py)")
+    parser.add_argument("--tests", nargs="*", help="tests a correr (todos por defecto)")
+    parser.add_argument("--seeds", type=int, default=1, help="semillas por test")
+    parser.add_argument("--seed", type=int, help="semilla base (aleatoria por defecto)")
+    parser.add_argument("--outdir", default="regress")
+    parser.add_argument("--output", default="results.xml", help="resultados unidos")
+    parser.add_argument("--make", action="append", default=[], dest="make_args",
+                        help="variable para make, p. ej. --make GATES=yes (se puede repetir)")
+    args = parser.parse_args(argv)
+
+    tests = args.tests or discover_tests(args.module)
+    base = args.seed if args.seed is not None else random.getrandbits(31)
+    jobs = [Job(args.module, t, base + s) for s in range(args.seeds) for t in tests]
+    outdir = os.path.join(AQUI, args.outdir)
+    os.makedirs(outdir, exist_ok=True)
+
+    # cada trabajador toma un shard libre, asi un SIM_BUILD nunca se usa dos veces a la vez
+    shards: "queue.Queue[int]" = queue.Queue()
+    for n in range(args.jobs):
+        shards.put(n)
+
+    def trabajo(job: Job) -> JobResult:
+        shard = shards.get()
+        try:
+            return run_job(job, shard, outdir, args.make_args)
+        finally:
+            shards.put(shard)
+
+    print(f"{len(jobs)} trabajos en {args.jobs} procesos, semilla base {base}")
+    t0 = time.perf_counter()
+    resultados = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for r in pool.map(trabajo, jobs):
+            estado = "ok" if r.returncode == 0 else f"error {r.returncode}"
+            print(f"[shard {r.shard}] {r.job.name}: {estado} ({r.seconds:.1f} s)")
+            resultados.append(r)
+    segundos = time.perf_counter() - t0
+
+    raiz = merge_results(resultados, os.path.join(AQUI, args.output))
+    casos = list(raiz.iter("testcase"))
+    fallas = [c for c in casos if c.find("failure") is not None or c.find("error") is not None]
+    print(f"{len(casos)} tests, {len(fallas)} fallas, {segundos:.1f} s en total")
+    for caso in fallas:
+        print(f"FALLA {caso.get('classname')}.{caso.get('name')}")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
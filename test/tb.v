@@ -6,13 +6,6 @@
 */
 module tb ();
 
-  // Dump the signals to a VCD file. You can view it with gtkwave or surfer.
-  initial begin
-    $dumpfile("tb.vcd");
-    $dumpvars(0, tb);
-    #1;
-  end
-
   // Wire up the inputs and outputs:
   reg clk;
   reg rst_n;
@@ -22,6 +15,59 @@ module tb ();
   wire [7:0] uo_out;
   wire [7:0] uio_out;
   wire [7:0] uio_oe;
+
+  // Waveform capture is off by default, it slows down long runs a lot.
+  // Enable it with `make DUMP=vcd` or `make DUMP=fst`, or with plusargs:
+  //   +WAVES               dump the signals, view them with gtkwave or surfer
+  //   +WAVE_FILE=<name>    output file (default tb.vcd)
+  //   +WAVE_START=<cycle>  first clock cycle to dump
+  //   +WAVE_STOP=<cycle>   last clock cycle to dump
+  //   +WAVE_TRIGGER        dump only while cocotb holds wave_trigger high
+  reg [8*256-1:0] wave_file;
+  reg waves;
+  reg wave_window;
+  reg wave_trigger;
+  integer wave_start;
+  integer wave_stop;
+  integer wave_cycle;
+  initial begin
+    waves = $test$plusargs("WAVES");
+    wave_window = waves && !$test$plusargs("WAVE_TRIGGER");
+    wave_trigger = 1'b0;
+    wave_cycle = 0;
+    if (!$value$plusargs("WAVE_START=%d", wave_start))
+      wave_start = 0;
+    if (!$value$plusargs("WAVE_STOP=%d", wave_stop))
+      wave_stop = -1;
+`ifndef VERILATOR
+    // under Verilator the cocotb harness writes the dump (see Makefile)
+    if (waves) begin
+      if (!$value$plusargs("WAVE_FILE=%s", wave_file))
+        wave_file = "tb.vcd";
+      $dumpfile(wave_file);
+      $dumpvars(0, tb);
+      if (wave_start > 0 || !wave_window)
+        $dumpoff;
+    end
+`endif
+  end
+
+  always @(posedge clk) begin
+    if (wave_window) begin
+      if (wave_cycle == wave_start && wave_start > 0)
+        $dumpon;
+      if (wave_cycle == wave_stop)
+        $dumpoff;
+    end
+    wave_cycle = wave_cycle + 1;
+  end
+
+  always @(posedge wave_trigger)
+    if (waves) $dumpon;
+
+  always @(negedge wave_trigger)
+    if (waves) $dumpoff;
+
 `ifdef GL_TEST
   wire VPWR = 1'b1;
   wire VGND = 1'b0;
@@ -0,0 +1,23 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Utilidades de verificacion para tt_um_TensorFlowE."""
+
+from .cycle import CycleDriver, LockstepChecker, TensorFlowECycleModel
+from .driver import (LEGACY_TIMING, MIN_TIMING, PARALLEL_MIN_TIMING, PIPELINED_MIN_TIMING,
+                     TensorFlowEDriver, Timing, Transaction)
+from .model import TensorFlowEModel
+
+__all__ = [
+    "CycleDriver",
+    "LEGACY_TIMING",
+    "LockstepChecker",
+    "MIN_TIMING",
+    "PARALLEL_MIN_TIMING",
+    "PIPELINED_MIN_TIMING",
+    "TensorFlowECycleModel",
+    "TensorFlowEDriver",
+    "TensorFlowEModel",
+    "Timing",
+    "Transaction",
+]
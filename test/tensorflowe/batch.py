@@ -0,0 +1,267 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Motor de referencia vectorizado con NumPy.
+
+Calcula los resultados esperados de ``matrix_multiply_unit`` para
+arreglos de operandos empaquetados (mismo formato que
+``codec.pack_matrix``), por bloques de tamano acotado. Con ``sweep`` se
+recorren los 2**32 pares (A, B) en un pool de procesos para
+caracterizar el truncamiento a 4 bits del hardware (2**(2*DATA_WIDTH)
+con otro ``M_SIZE`` o ``VAR_WIDTH``, mientras A y B quepan juntos en el
+indice de 64 bits: ``2*DATA_WIDTH <= 64``, por ejemplo 2x2 de 8 bits
+pero no 3x3 de 4 bits).
+
+Uso::
+
+    python -m tensorflowe.batch --workers 32 --chunk-bits 22
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .codec import (DATA_WIDTH, MASK_ACC, MASK_DATA, MASK_VAR, M_SIZE, VAR_WIDTH, WORD_DTYPE, pack_elements,
+                    unpack_matrices)
+
+# Todos los pares (A, B) de DATA_WIDTH bits
+TOTAL_PAIRS = 1 << (2 * DATA_WIDTH)
+# Bits del indice de un par en el barrido (uint64)
+INDEX_BITS = 64
+# Producto punto maximo: 2 * 15 * 15 en 2x2 de 4 bits
+MAX_DOT = M_SIZE * MASK_VAR * MASK_VAR
+
+
+def _dot_table() -> Optional[np.ndarray]:
+    # solo en 2x2 de 4 bits una fila de A o una columna de B cabe en un byte
+    if (M_SIZE, VAR_WIDTH) != (2, 4):
+        return None
+    # indice = fila de A (8 bits) << 8 | columna de B (8 bits); en cada
+    # byte el nibble bajo es el termino k=0 y el alto el termino k=1
+    idx = np.arange(1 << 16, dtype=np.uint32)
+    fila = idx >> 8
+    col = idx & 0xFF
+    dot = (fila & MASK_VAR) * (col & MASK_VAR) + (fila >> VAR_WIDTH) * (col >> VAR_WIDTH)
+    return dot.astype(np.uint16)
+
+
+# Producto punto sin truncar de una fila por una columna
+DOT_TABLE = _dot_table()
+
+
+def dot_products(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Productos punto sin truncar, forma ``(..., M_SIZE**2)`` en orden de ``result``"""
+    if DOT_TABLE is None:
+        ma = unpack_matrices(a).astype(np.uint32)
+        mb = unpack_matrices(b).astype(np.uint32)
+        dots = np.einsum("...ik,...kj->...ij", ma, mb)
+        return dots.reshape(dots.shape[:-2] + (M_SIZE * M_SIZE,))
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    a, b = np.broadcast_arrays(a, b)
+    dots = np.empty(a.shape + (M_SIZE * M_SIZE,), dtype=np.uint16)
+    for i in range(M_SIZE):
+        fila = (a >> (2 * VAR_WIDTH * i)) & 0xFF
+        for j in range(M_SIZE):
+            col = ((b >> (VAR_WIDTH * j)) & MASK_VAR) | (
+                ((b >> (VAR_WIDTH * (M_SIZE + j))) & MASK_VAR) << VAR_WIDTH
+            )
+            dots[..., i * M_SIZE + j] = DOT_TABLE[(fila << 8) | col]
+    return dots
+
+
+def multiply_words(a: np.ndarray, b: np.ndarray, wide: bool = False) -> np.ndarray:
+    """Version vectorizada de ``model.multiply_word`` (``multiply_word_wide`` con ``wide``)"""
+    # accumulator[VAR_WIDTH-1:0] de un acumulador de 2*VAR_WIDTH bits, o
+    # el acumulador completo
+    return pack_elements(dot_products(a, b) & MASK_ACC, wide)
+
+
+def accumulate_words(accumulator: np.ndarray, result: np.ndarray) -> np.ndarray:
+    """Version vectorizada de ``model.accumulate_word``"""
+    # la suma desborda el tipo solo cuando DATA_WIDTH ocupa todos sus bits
+    suma = np.asarray(accumulator).astype(WORD_DTYPE) + np.asarray(result).astype(WORD_DTYPE)
+    return suma & MASK_DATA
+
+
+def expected_results(a: np.ndarray, b: np.ndarray, chunk_size: int = 1 << 22,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Resultados esperados para arreglos 1D de operandos, por bloques.
+
+    ``out`` puede ser un ``np.memmap`` para guardar tablas que no caben
+    en memoria.
+    """
+    a = np.asarray(a).astype(WORD_DTYPE).ravel()
+    b = np.asarray(b).astype(WORD_DTYPE).ravel()
+    if a.shape != b.shape:
+        raise ValueError(f"a y b deben tener el mismo largo ({a.size} != {b.size})")
+    if out is None:
+        out = np.empty(a.shape, dtype=WORD_DTYPE)
+    for inicio in range(0, a.size, chunk_size):
+        fin = min(inicio + chunk_size, a.size)
+        out[inicio:fin] = multiply_words(a[inicio:fin], b[inicio:fin])
+    return out
+
+
+def _check_index():
+    if 2 * DATA_WIDTH > INDEX_BITS:
+        raise ValueError(f"el barrido necesita 2*DATA_WIDTH <= {INDEX_BITS} bits de indice "
+                         f"(M_SIZE={M_SIZE}, VAR_WIDTH={VAR_WIDTH} da {2 * DATA_WIDTH})")
+
+
+def pairs_from_index(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Indice del espacio completo -> (A, B), con A en los ``DATA_WIDTH`` bits altos"""
+    _check_index()
+    indices = np.asarray(indices, dtype=np.uint64)
+    return ((indices >> np.uint64(DATA_WIDTH)).astype(WORD_DTYPE),
+            (indices & np.uint64(MASK_DATA)).astype(WORD_DTYPE))
+
+
+# ----------------------------------------------------------------------
+# Barrido del espacio completo
+# ----------------------------------------------------------------------
+@dataclass
+class SweepStats:
+    """Caracterizacion del truncamiento sobre un rango de pares."""
+
+    pairs: int = 0
+    # elementos cuyo producto punto cabe en 4 bits (resultado exacto)
+    exact_elements: int = 0
+    # pares con los cuatro elementos exactos
+    exact_pairs: int = 0
+    # elementos que ademas desbordan el accumulator de 8 bits
+    acc_overflow_elements: int = 0
+    # histograma del producto punto sin truncar (0..450)
+    dot_hist: np.ndarray = field(default_factory=lambda: np.zeros(MAX_DOT + 1, dtype=np.int64))
+    # histograma del nibble de salida (0..15)
+    nibble_hist: np.ndarray = field(default_factory=lambda: np.zeros(MASK_VAR + 1, dtype=np.int64))
+    # suma de las palabras resultado modulo 2**64, para comparar corridas
+    checksum: int = 0
+
+    def merge(self, otro: "SweepStats") -> "SweepStats":
+        self.pairs += otro.pairs
+        self.exact_elements += otro.exact_elements
+        self.exact_pairs += otro.exact_pairs
+        self.acc_overflow_elements += otro.acc_overflow_elements
+        self.dot_hist += otro.dot_hist
+        self.nibble_hist += otro.nibble_hist
+        self.checksum = (self.checksum + otro.checksum) % (1 << 64)
+        return self
+
+    def as_dict(self) -> Dict:
+        elementos = self.pairs * M_SIZE * M_SIZE
+        return {
+            "pairs": self.pairs,
+            "exact_elements": self.exact_elements,
+            "exact_element_ratio": self.exact_elements / elementos if elementos else 0.0,
+            "exact_pairs": self.exact_pairs,
+            "exact_pair_ratio": self.exact_pairs / self.pairs if self.pairs else 0.0,
+            "acc_overflow_elements": self.acc_overflow_elements,
+            "checksum": self.checksum,
+            "nibble_hist": self.nibble_hist.tolist(),
+            "dot_hist": self.dot_hist.tolist(),
+        }
+
+
+def sweep_chunk(inicio: int, fin: int) -> SweepStats:
+    """Estadisticas de los pares con indice en ``[inicio, fin)``"""
+    a, b = pairs_from_index(np.arange(inicio, fin, dtype=np.uint64))
+    dots = dot_products(a, b)
+    exactos = dots <= MASK_VAR
+    resultados = pack_elements(dots & MASK_VAR)
+    return SweepStats(
+        pairs=fin - inicio,
+        exact_elements=int(exactos.sum()),
+        exact_pairs=int(exactos.all(axis=-1).sum()),
+        acc_overflow_elements=int((dots > MASK_ACC).sum()),
+        dot_hist=np.bincount(dots.ravel(), minlength=MAX_DOT + 1).astype(np.int64),
+        nibble_hist=np.bincount((dots & MASK_VAR).ravel(), minlength=MASK_VAR + 1).astype(np.int64),
+        checksum=int(resultados.sum(dtype=np.uint64)),
+    )
+
+
+def sweep(inicio: int = 0, fin: int = TOTAL_PAIRS, chunk_size: int = 1 << 22,
+          workers: Optional[int] = None) -> SweepStats:
+    """Barre ``[inicio, fin)`` repartiendo bloques en un pool de procesos"""
+    _check_index()
+    bloques = [(i, min(i + chunk_size, fin)) for i in range(inicio, fin, chunk_size)]
+    total = SweepStats()
+    if workers == 1:
+        for bloque in bloques:
+            total.merge(sweep_chunk(*bloque))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for parcial in pool.map(sweep_chunk, *zip(*bloques)):
+            total.merge(parcial)
+    return total
+
+
+# ----------------------------------------------------------------------
+# Muestra estratificada para comparar con el DUT
+# ----------------------------------------------------------------------
+def _palabras_aleatorias(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Palabras con una fraccion al azar de elementos en cero"""
+    # con matrices grandes o elementos anchos casi todo producto punto
+    # trunca; sin ceros los estratos bajos no aparecerian
+    elementos = rng.integers(0, MASK_VAR + 1, (n, M_SIZE * M_SIZE))
+    densidad = rng.random((n, 1))
+    return pack_elements(np.where(rng.random(elementos.shape) < densidad, elementos, 0))
+
+
+def stratified_sample(n: int, rng: Optional[np.random.Generator] = None,
+                      batch: int = 1 << 16) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Pares (A, B) repartidos por igual entre estratos.
+
+    El estrato es la cantidad de elementos (0..M_SIZE**2) cuyo producto
+    punto no cabe en ``VAR_WIDTH`` bits, de modo que la muestra cubre tanto resultados exactos
+    como truncados. Devuelve ``(a, b, esperado, estrato)``.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    estratos = M_SIZE * M_SIZE + 1
+    cuota = [n // estratos + (1 if s < n % estratos else 0) for s in range(estratos)]
+    elegidos_a = [[] for _ in range(estratos)]
+    elegidos_b = [[] for _ in range(estratos)]
+    while any(len(elegidos_a[s]) < cuota[s] for s in range(estratos)):
+        a = _palabras_aleatorias(rng, batch)
+        b = _palabras_aleatorias(rng, batch)
+        estrato = (dot_products(a, b) > MASK_VAR).sum(axis=-1)
+        for s in range(estratos):
+            falta = cuota[s] - len(elegidos_a[s])
+            if falta > 0:
+                sel = np.flatnonzero(estrato == s)[:falta]
+                elegidos_a[s].extend(a[sel].tolist())
+                elegidos_b[s].extend(b[sel].tolist())
+    a = np.array(sum(elegidos_a, []), dtype=WORD_DTYPE)
+    b = np.array(sum(elegidos_b, []), dtype=WORD_DTYPE)
+    estrato = np.repeat(np.arange(estratos), cuota)
+    return a, b, multiply_words(a, b), estrato
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido exhaustivo de matrix_multiply_unit")
+    parser.add_argument("--start", type=lambda x: int(x, 0), default=0)
+    parser.add_argument("--stop", type=lambda x: int(x, 0), default=TOTAL_PAIRS)
+    parser.add_argument("--chunk-bits", type=int, default=22)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="archivo JSON con el resultado")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    stats = sweep(args.start, args.stop, 1 << args.chunk_bits, args.workers)
+    resultado = stats.as_dict()
+    resultado["seconds"] = time.perf_counter() - t0
+    texto = json.dumps(resultado)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
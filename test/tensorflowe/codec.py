@@ -0,0 +1,164 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Codificacion de matrices de ``M_SIZE`` x ``M_SIZE`` en palabras y bytes.
+
+Formato del RTL (por defecto 2x2 de 4 bits):
+
+- ``four_palabras`` arma la palabra de ``DATA_WIDTH`` bits con el primer
+  byte abajo (``{byte1, byte0}`` en 2x2) y ``matrix_multiply_unit`` toma
+  el elemento ``[fila][col]`` de los bits
+  ``VAR_WIDTH*(fila*M_SIZE+col) +: VAR_WIDTH``.
+- Por ``ui_in`` y ``uo_out`` va primero el byte bajo; en 2x2 cada byte es
+  una fila con la columna 0 en el nibble bajo. Si ``DATA_WIDTH`` no es
+  multiplo de 8 el ultimo byte lleva relleno en cero.
+
+``M_SIZE`` y ``VAR_WIDTH`` son los de ``src/mmac_pkg.sv``; se leen del
+entorno como en el RTL (``make M_SIZE=3 VAR_WIDTH=8``).
+
+Con ``wide=True`` las funciones usan el formato del resultado ancho
+(``WIDE_RESULT``): ``ACC_WIDTH = 2*VAR_WIDTH`` bits por elemento, en la
+misma posicion ``fila*M_SIZE+col``, y ``BYTES_WIDE`` bytes por matriz.
+
+Las funciones de una matriz trabajan con enteros de Python; las de lotes
+(nombres en plural: ``pack_matrices``, ``matrices_to_bytes``, ...) con
+arreglos NumPy de cualquier forma, sin recorrer los elementos uno por uno.
+"""
+
+import os
+from typing import List, Sequence
+
+import numpy as np
+
+# Valores por defecto de MMAC_M_SIZE y MMAC_VAR_WIDTH en mmac_pkg.sv
+M_SIZE = int(os.environ.get("M_SIZE", 2))
+VAR_WIDTH = int(os.environ.get("VAR_WIDTH", 4))
+DATA_WIDTH = VAR_WIDTH * M_SIZE * M_SIZE
+BYTES_WORD = -(-DATA_WIDTH // 8)
+
+# Tipo NumPy de las palabras empaquetadas; mas de 64 bits van como enteros de Python
+WORD_DTYPE = next((t for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                   if np.iinfo(t).bits >= DATA_WIDTH), object)
+
+MASK_VAR = (1 << VAR_WIDTH) - 1
+MASK_ACC = (1 << (2 * VAR_WIDTH)) - 1
+MASK_DATA = (1 << DATA_WIDTH) - 1
+
+# Resultado ancho: el accumulator completo de cada elemento (4 bytes en 2x2)
+ACC_WIDTH = 2 * VAR_WIDTH
+WIDE_WIDTH = ACC_WIDTH * M_SIZE * M_SIZE
+BYTES_WIDE = -(-WIDE_WIDTH // 8)
+MASK_WIDE = (1 << WIDE_WIDTH) - 1
+WIDE_DTYPE = next((t for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                   if np.iinfo(t).bits >= WIDE_WIDTH), object)
+
+
+def _formato(wide: bool):
+    """Bits y mascara por elemento, bytes por matriz y tipo NumPy de la palabra"""
+    if wide:
+        return ACC_WIDTH, MASK_ACC, BYTES_WIDE, WIDE_DTYPE
+    return VAR_WIDTH, MASK_VAR, BYTES_WORD, WORD_DTYPE
+
+
+# ----------------------------------------------------------------------
+# Una matriz
+# ----------------------------------------------------------------------
+def pack_matrix(matriz: Sequence[Sequence[int]], wide: bool = False) -> int:
+    """Matriz -> palabra de ``DATA_WIDTH`` bits tal como la arma four_palabras"""
+    ancho, mascara, _, _ = _formato(wide)
+    palabra = 0
+    for fila in range(M_SIZE):
+        for col in range(M_SIZE):
+            palabra |= (matriz[fila][col] & mascara) << (ancho * (fila * M_SIZE + col))
+    return palabra
+
+
+def unpack_matrix(palabra: int, wide: bool = False) -> List[List[int]]:
+    """Palabra de ``DATA_WIDTH`` bits -> matriz"""
+    ancho, mascara, _, _ = _formato(wide)
+    return [
+        [(palabra >> (ancho * (fila * M_SIZE + col))) & mascara for col in range(M_SIZE)]
+        for fila in range(M_SIZE)
+    ]
+
+
+def word_to_bytes(palabra: int, wide: bool = False) -> List[int]:
+    """Palabra -> bytes en orden de ui_in/uo_out (byte bajo primero)"""
+    return [(palabra >> (8 * i)) & 0xFF for i in range(_formato(wide)[2])]
+
+
+def bytes_to_word(datos: Sequence[int]) -> int:
+    palabra = 0
+    for i, byte in enumerate(datos):
+        palabra |= (byte & 0xFF) << (8 * i)
+    return palabra
+
+
+def matrix_to_bytes(matriz: Sequence[Sequence[int]], wide: bool = False) -> List[int]:
+    """Bytes en el orden en que se escriben por ui_in"""
+    return word_to_bytes(pack_matrix(matriz, wide), wide)
+
+
+def bytes_to_matrix(datos: Sequence[int], wide: bool = False) -> List[List[int]]:
+    """Bytes en el orden en que salen por uo_out -> matriz"""
+    return unpack_matrix(bytes_to_word(datos), wide)
+
+
+# ----------------------------------------------------------------------
+# Lotes con NumPy
+# ----------------------------------------------------------------------
+def pack_elements(elementos: np.ndarray, wide: bool = False) -> np.ndarray:
+    """Elementos ``(..., M_SIZE**2)`` en orden ``fila*M_SIZE+col`` -> palabras"""
+    ancho, mascara, _, tipo = _formato(wide)
+    elementos = np.asarray(elementos).astype(tipo) & mascara
+    palabra = np.zeros(elementos.shape[:-1], dtype=tipo)
+    for e in range(M_SIZE * M_SIZE):
+        palabra |= elementos[..., e] << (ancho * e)
+    return palabra
+
+
+def unpack_elements(palabras: np.ndarray, wide: bool = False) -> np.ndarray:
+    """Palabras -> elementos ``(..., M_SIZE**2)``"""
+    ancho, mascara, _, tipo = _formato(wide)
+    palabras = np.asarray(palabras).astype(tipo)
+    desplazamientos = np.arange(M_SIZE * M_SIZE).astype(tipo) * ancho
+    return ((palabras[..., None] >> desplazamientos) & mascara).astype(np.uint16 if wide else np.uint8)
+
+
+def pack_matrices(matrices: np.ndarray, wide: bool = False) -> np.ndarray:
+    """Matrices ``(..., M_SIZE, M_SIZE)`` -> palabras ``(...)``"""
+    matrices = np.asarray(matrices)
+    return pack_elements(matrices.reshape(matrices.shape[:-2] + (M_SIZE * M_SIZE,)), wide)
+
+
+def unpack_matrices(palabras: np.ndarray, wide: bool = False) -> np.ndarray:
+    """Palabras ``(...)`` -> matrices ``(..., M_SIZE, M_SIZE)`` de ``uint8`` (``uint16`` con ``wide``)"""
+    elementos = unpack_elements(palabras, wide)
+    return elementos.reshape(elementos.shape[:-1] + (M_SIZE, M_SIZE))
+
+
+def words_to_bytes(palabras: np.ndarray) -> np.ndarray:
+    """Palabras ``(...)`` -> bytes ``(..., BYTES_WORD)`` en orden de ui_in/uo_out"""
+    palabras = np.asarray(palabras).astype(WORD_DTYPE)
+    return np.stack([(palabras >> (8 * i)) & 0xFF for i in range(BYTES_WORD)], axis=-1).astype(np.uint8)
+
+
+def bytes_to_words(datos: np.ndarray) -> np.ndarray:
+    """Bytes ``(..., BYTES_WORD)`` (o un flujo plano) -> palabras"""
+    datos = np.asarray(datos).astype(WORD_DTYPE)
+    if datos.ndim == 1:
+        datos = datos.reshape(-1, BYTES_WORD)
+    palabra = np.zeros(datos.shape[:-1], dtype=WORD_DTYPE)
+    for i in range(BYTES_WORD):
+        palabra |= datos[..., i] << (8 * i)
+    return palabra
+
+
+def matrices_to_bytes(matrices: np.ndarray) -> np.ndarray:
+    """Matrices ``(..., M_SIZE, M_SIZE)`` -> bytes ``(..., BYTES_WORD)``; ``.ravel()`` da el flujo de ui_in"""
+    return words_to_bytes(pack_matrices(matrices))
+
+
+def bytes_to_matrices(datos: np.ndarray) -> np.ndarray:
+    """Bytes de uo_out ``(..., BYTES_WORD)`` o flujo plano -> matrices ``(..., M_SIZE, M_SIZE)``"""
+    return unpack_matrices(bytes_to_words(datos))
@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Cobertura funcional de TensorFlowE.
+
+Hay dos tipos de grupos:
+
+- del RTL, muestreados en cada flanco de bajada por ``CoverageCollector``:
+  estados y transiciones de ``matrix_multiply_unit``, fases de
+  ``conta_palabras``, ramas de ``matrix_accumulate_unit`` y valores de
+  ``Con`` en ``uart_tx_4in4``;
+- de transacciones, que registra ``ConstrainedRandom`` despues de cada
+  operacion: clases de valores de los operandos, pares de operaciones
+  seguidas, lecturas con y sin dato nuevo y productos truncados.
+
+``Coverage.closed()`` es verdadero cuando todos los bins tienen al menos
+``goal`` muestras. Con el datapath paralelo (``MULT=parallel``) el
+multiplicador salta de ``IDLE`` a ``DONE`` y con el segmentado
+(``MULT=pipelined``) no sale de ``IDLE``; ``bins_for`` devuelve los bins
+de cada modo.
+"""
+
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from .codec import BYTES_WORD, MASK_VAR
+from .cycle import MULT_PARALLEL, MULT_PIPELINED
+
+OPS = ("multiply", "accumulate", "clear", "read")
+
+# Bins de cada grupo
+BINS: Dict[str, Tuple[Hashable, ...]] = {
+    "mult_state": ("IDLE", "LOAD", "CALC", "STORE", "DONE"),
+    "mult_transition": (
+        ("IDLE", "IDLE"), ("IDLE", "LOAD"), ("LOAD", "CALC"), ("CALC", "CALC"),
+        ("CALC", "STORE"), ("STORE", "DONE"), ("DONE", "IDLE"),
+    ),
+    "conta_palabras": ((0, 0), (0, 1), (1, 1), (1, 0)),
+    "accumulate_branch": ("clear_idle", "clear_accumulating", "sum", "hold", "copy"),
+    "uart_con": tuple(range(BYTES_WORD + 1)),
+    "operand_value": tuple((m, c) for m in ("A", "B") for c in ("zero", "one", "mid", "max")),
+    "op_pair": tuple((a, b) for a in OPS for b in OPS),
+    "read": ("fresh", "stale"),
+    "truncation": ("exact", "truncated"),
+}
+
+# Estados y transiciones que recorre el datapath paralelo
+PARALLEL_BINS: Dict[str, Tuple[Hashable, ...]] = {
+    **BINS,
+    "mult_state": ("IDLE", "DONE"),
+    "mult_transition": (("IDLE", "IDLE"), ("IDLE", "DONE"), ("DONE", "IDLE")),
+}
+
+# El datapath segmentado deja la maquina de estados en IDLE
+PIPELINED_BINS: Dict[str, Tuple[Hashable, ...]] = {
+    **BINS,
+    "mult_state": ("IDLE",),
+    "mult_transition": (("IDLE", "IDLE"),),
+}
+
+# Codificacion de state en matrix_multiply_unit
+_ESTADOS = ("IDLE", "LOAD", "CALC", "STORE", "DONE")
+
+
+def value_class(valor: int) -> str:
+    if valor == 0:
+        return "zero"
+    if valor == 1:
+        return "one"
+    if valor == MASK_VAR:
+        return "max"
+    return "mid"
+
+
+def bins_for(mult_mode: int) -> Dict[str, Tuple[Hashable, ...]]:
+    """Bins del datapath ``mult_mode`` (``MULT_SERIAL``, ``MULT_PARALLEL`` o ``MULT_PIPELINED``)"""
+    return {MULT_PARALLEL: PARALLEL_BINS, MULT_PIPELINED: PIPELINED_BINS}.get(mult_mode, BINS)
+
+
+class Coverage:
+    """Contadores por grupo y bin."""
+
+    def __init__(self, grupos: Iterable[str] = BINS, goal: int = 1,
+                 bins: Dict[str, Tuple[Hashable, ...]] = BINS):
+        self.goal = goal
+        self.bins = bins
+        self.hits: Dict[str, Counter] = {g: Counter() for g in grupos}
+
+    def sample(self, grupo: str, valor: Hashable):
+        if grupo in self.hits:
+            self.hits[grupo][valor] += 1
+
+    def missing(self) -> List[Tuple[str, Hashable]]:
+        return [(g, b) for g, h in self.hits.items() for b in self.bins[g] if h[b] < self.goal]
+
+    def closed(self) -> bool:
+        return not self.missing()
+
+    def percent(self) -> float:
+        total = sum(len(self.bins[g]) for g in self.hits)
+        return 100.0 * (total - len(self.missing())) / total if total else 100.0
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        return {g: {str(b): h[b] for b in self.bins[g]} for g, h in self.hits.items()}
+
+
+class CoverageCollector:
+    """Muestrea los grupos del RTL en cada flanco de bajada."""
+
+    def __init__(self, dut, coverage: Coverage):
+        core = dut.user_project.core
+        self.coverage = coverage
+        self._state = core.multiply_unit_u.state
+        self._conta = core.conta_palabras
+        self._clear = core.accumulate_unit_u.clear
+        self._enable = core.accumulate_unit_u.enable
+        self._listo = core.accumulate_unit_u.listo
+        self._con = core.uart_tx_u.Con
+        self.dut = dut
+        self._tarea = None
+
+    def start(self):
+        import cocotb
+
+        self._tarea = cocotb.start_soon(self._correr())
+        return self
+
+    def stop(self):
+        if self._tarea is not None:
+            self._tarea.kill()
+            self._tarea = None
+
+    async def _correr(self):
+        from cocotb.triggers import FallingEdge
+
+        cov = self.coverage
+        estado_antes = conta_antes = None
+        while True:
+            await FallingEdge(self.dut.clk)
+            estado = _ESTADOS[int(self._state.value)]
+            conta = int(self._conta.value)
+            cov.sample("mult_state", estado)
+            if estado_antes is not None:
+                cov.sample("mult_transition", (estado_antes, estado))
+                cov.sample("conta_palabras", (conta_antes, conta))
+            estado_antes, conta_antes = estado, conta
+
+            enable = int(self._enable.value)
+            if int(self._clear.value):
+                cov.sample("accumulate_branch", "clear_accumulating" if enable else "clear_idle")
+            elif enable and int(self._listo.value):
+                cov.sample("accumulate_branch", "sum")
+            elif enable:
+                cov.sample("accumulate_branch", "hold")
+            else:
+                cov.sample("accumulate_branch", "copy")
+            cov.sample("uart_con", int(self._con.value))
@@ -0,0 +1,641 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Modelo ciclo a ciclo de tt_um_TensorFlowE.
+
+``TensorFlowECycleModel`` reproduce los registros de todos los modulos
+(detectores de flanco y ``conta_palabras`` de ``TensorFlowE``,
+``four_palabras``, la maquina de estados de ``matrix_multiply_unit``,
+``matrix_accumulate_unit``, las dos colas, ``uart_tx_4in4`` y el
+contador de ``Ena_out``). Cada llamada a ``step`` es un flanco de subida de ``clk``
+con asignaciones no bloqueantes: todo se calcula con los valores de antes
+del flanco. Predice ``uo_out`` y ``uio_out`` ciclo a ciclo.
+
+``CycleDriver`` tiene la misma API que ``TensorFlowEDriver`` pero sin
+simulador, para desarrollar software de host y planes de tiles.
+``LockstepChecker`` corre el modelo junto al DUT en cocotb y compara las
+salidas en cada ciclo.
+
+El datapath de ``matrix_multiply_unit`` se elige al compilar el RTL
+(``make MULT=serial|parallel|pipelined``); el modelo toma el mismo valor de la
+variable de entorno ``MULT`` si no se le pasa ``mult_mode``; la
+profundidad de las colas, de ``FIFO_DEPTH`` y ``OPERAND_FIFO_DEPTH``; el
+tamano de las matrices, de ``M_SIZE`` y ``VAR_WIDTH`` (ver ``codec``).
+"""
+
+import functools
+import inspect
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from .driver import (BURST_READ, BURST_WRITE, BYTES_MATRIZ, CLEAR, DATO_LISTO, ENA_OUT, ENA_READ, ENA_WRITE,
+                     ENABLE_ACCU, FIFO_FULL, HANDSHAKE_TIMEOUT, LEGACY_TIMING, OPERAND_FIFO, RESULT_FIFO,
+                     WEIGHT_HOLD, WIDE_RESULT, ProtocolDriver, Timing, result_bytes)
+from .codec import ACC_WIDTH, BYTES_WIDE, MASK_ACC, MASK_DATA, MASK_VAR, MASK_WIDE, M_SIZE, VAR_WIDTH
+from .model import TensorFlowEModel, fifo_depth_from_env, narrow_word, operand_fifo_depth_from_env
+
+# Estados de matrix_multiply_unit
+S_IDLE, S_LOAD, S_CALC, S_STORE, S_DONE = range(5)
+
+# Parametro MODE de matrix_multiply_unit
+MULT_SERIAL, MULT_PARALLEL, MULT_PIPELINED = range(3)
+MULT_MODES = {"serial": MULT_SERIAL, "parallel": MULT_PARALLEL, "pipelined": MULT_PIPELINED}
+
+
+def mult_mode_from_env() -> int:
+    """``MODE`` del multiplicador segun ``MULT`` (el mismo valor que usa el Makefile)"""
+    nombre = os.environ.get("MULT", "serial")
+    if nombre not in MULT_MODES:
+        raise ValueError(f"MULT debe ser uno de {tuple(MULT_MODES)}, no {nombre!r}")
+    return MULT_MODES[nombre]
+
+
+# uio_oe fijo en project.sv
+UIO_OE = ENA_OUT | DATO_LISTO | FIFO_FULL
+
+# Registros que definen el estado completo (ver ``state``)
+_REGISTROS = (
+    "dato_disponible", "conta_palabras", "ena_tpu", "matriz_a",
+    "write_r", "write_rr", "accu_r", "accu_rr", "read_r", "read_rr", "clear_r", "clear_rr",
+    "hold_r", "hold_rr", "rafaga_write", "rafaga_read", "cola_resultados", "cola_operandos", "resultado_ancho",
+    "reservas",
+    "listo_r", "listo_rr", "datos_r",
+    "flat_accu", "estado_actual", "ena_out",
+    "con", "mem", "data_comple", "flat_comple",
+    "i", "j", "k", "acc_mult", "state_mult", "result", "listo", "res",
+    "a_q", "b_q", "valido_q", "prod_p", "valido_p",
+    "acumulador", "out",
+    "cola_mem", "cola_rd", "cola_wr", "cola_n", "op_mem", "op_rd", "op_wr", "op_n",
+    "flat", "first", "dato", "con_uart", "flat_out", "output_dato",
+)
+
+
+def _elemento(palabra: int, fila: int, col: int) -> int:
+    return (palabra >> (VAR_WIDTH * (fila * M_SIZE + col))) & MASK_VAR
+
+
+class TensorFlowECycleModel:
+    """Registros de TensorFlowE, avanzados un flanco de reloj a la vez."""
+
+    def __init__(self, mult_mode: Optional[int] = None, fifo_depth: Optional[int] = None,
+                 operand_fifo_depth: Optional[int] = None):
+        self.mult_mode = mult_mode_from_env() if mult_mode is None else mult_mode
+        self.fifo_depth = fifo_depth_from_env() if fifo_depth is None else fifo_depth
+        if operand_fifo_depth is None:
+            operand_fifo_depth = operand_fifo_depth_from_env()
+        self.operand_fifo_depth = operand_fifo_depth
+        self.cycle = 0
+        # out de matrix_accumulate_unit no tiene reset; en la simulacion
+        # arranca en 0 (Verilator) o x (Icarus)
+        self.out = 0
+        self.reset()
+
+    def reset(self):
+        """Lo que hace rst_n en bajo (todo menos ``out``)."""
+        # TensorFlowE
+        self.dato_disponible = 0
+        self.conta_palabras = 0
+        self.ena_tpu = 0
+        self.matriz_a = 0
+        self.write_r = self.write_rr = 0
+        self.accu_r = self.accu_rr = 0
+        self.read_r = self.read_rr = 0
+        self.clear_r = self.clear_rr = 0
+        self.hold_r = self.hold_rr = 0
+        self.rafaga_write = 0
+        self.rafaga_read = 0
+        self.cola_resultados = 0
+        self.cola_operandos = 0
+        self.resultado_ancho = 0
+        self.reservas = 0
+        self.listo_r = self.listo_rr = 0
+        self.datos_r = 0
+        self.flat_accu = 0
+        self.estado_actual = 0
+        self.ena_out = 0
+        # four_palabras
+        self.con = 0
+        self.mem = 0
+        self.data_comple = 0
+        self.flat_comple = 0
+        # matrix_multiply_unit
+        self.i = self.j = self.k = 0
+        self.acc_mult = 0
+        self.state_mult = S_IDLE
+        self.result = 0  # result_ancho; result son sus VAR_WIDTH bits bajos por elemento
+        self.listo = 0
+        self.res = (0,) * (M_SIZE * M_SIZE)
+        # etapas del datapath segmentado; prod_p[(fila*M+col)*M+k]
+        self.a_q = self.b_q = 0
+        self.valido_q = self.valido_p = 0
+        self.prod_p = (0,) * (M_SIZE ** 3)
+        # matrix_accumulate_unit
+        self.acumulador = 0
+        # result_fifo_u y operand_fifo_u (pares (A, B))
+        self.cola_mem = (0,) * self.fifo_depth
+        self.cola_rd = self.cola_wr = self.cola_n = 0
+        self.op_mem = ((0, 0),) * self.operand_fifo_depth
+        self.op_rd = self.op_wr = self.op_n = 0
+        # uart_tx_4in4
+        self.flat = 0
+        self.first = 0
+        self.dato = 0
+        self.con_uart = 0
+        self.flat_out = 0
+        self.output_dato = 0
+
+    @property
+    def uo_out(self) -> int:
+        return self.output_dato
+
+    @property
+    def hay_dato(self) -> int:
+        """La proxima lectura arranca la uart: dato_disponible, o la cola no vacia y la uart libre"""
+        if self.cola_resultados:
+            return int(self.cola_n > 0 and not self.flat)
+        return self.dato_disponible
+
+    @property
+    def cola_llena(self) -> int:
+        """Contrapresion: con la cola de operandos solo cuenta esa"""
+        if self.cola_operandos:
+            return int(self.op_n == self.operand_fifo_depth)
+        return int(bool(self.cola_resultados) and self.cola_n == self.fifo_depth)
+
+    @property
+    def mult_libre(self) -> bool:
+        return self.mult_mode == MULT_PIPELINED or self.state_mult == S_IDLE
+
+    @property
+    def emite(self) -> bool:
+        """Un par de la cola de operandos pasa al multiplicador en este ciclo"""
+        return bool(self.cola_operandos and self.op_n > 0 and self.mult_libre
+                    and (not self.cola_resultados or self.reservas < self.fifo_depth))
+
+    @property
+    def uio_out(self) -> int:
+        # en lectura en rafaga Ena_out es flat_out, un ciclo por byte
+        ena_out = self.flat_out if self.rafaga_read else self.ena_out
+        return ((ENA_OUT if ena_out else 0) | (DATO_LISTO if self.hay_dato else 0)
+                | (FIFO_FULL if self.cola_llena else 0))
+
+    def state(self) -> Tuple:
+        """Todos los registros; si no cambia con las mismas entradas, el modelo esta quieto"""
+        return tuple(getattr(self, r) for r in _REGISTROS)
+
+    def step(self, ui_in: int, uio_in: int, rst_n: int = 1):
+        """Un flanco de subida de clk con las entradas muestreadas en ese flanco."""
+        self.cycle += 1
+        if not rst_n:
+            self.reset()
+            return
+
+        # Pulsos de un ciclo de los detectores de flanco
+        write_ena = self.write_r and not self.write_rr
+        accu_ena = self.accu_r and not self.accu_rr
+        read_ena = self.read_r and not self.read_rr
+        clear_ena = self.clear_r and not self.clear_rr
+        hold_baja = self.hold_rr and not self.hold_r
+        # clear y enable_accu juntos son un comando de configuracion
+        config_ena = accu_ena and clear_ena
+        accu_solo = accu_ena and not clear_ena
+        clear_solo = clear_ena and not accu_ena
+        listo = self.listo
+
+        # --- TensorFlowE
+        dato_disponible = self.dato_disponible
+        if listo:
+            dato_disponible = 1
+        if self.dato_disponible and read_ena:
+            dato_disponible = 0
+
+        rafaga_write, rafaga_read = self.rafaga_write, self.rafaga_read
+        cola_resultados, cola_operandos = self.cola_resultados, self.cola_operandos
+        resultado_ancho = self.resultado_ancho
+        if config_ena:
+            rafaga_write = ui_in & BURST_WRITE
+            rafaga_read = ui_in & BURST_READ
+            cola_resultados = ui_in & RESULT_FIFO
+            cola_operandos = ui_in & OPERAND_FIFO
+            resultado_ancho = ui_in & WIDE_RESULT
+        # la lectura arranca (start de la uart y pop de la cola)
+        lectura = self.hay_dato and read_ena
+        lee_resultado = bool(self.cola_resultados and lectura)
+        emite = self.emite
+        if clear_solo:
+            reservas = 0
+        else:
+            reservas = self.reservas + (emite and bool(self.cola_resultados)) - (lee_resultado and self.reservas > 0)
+
+        flat_accu = self.flat_accu
+        if accu_solo and not listo:
+            flat_accu = 1
+        elif clear_solo:
+            flat_accu = 0
+
+        conta_palabras, ena_tpu, matriz_a = self.conta_palabras, self.ena_tpu, self.matriz_a
+        if not self.conta_palabras and self.flat_comple:
+            matriz_a = self.data_comple
+            ena_tpu = 0
+            conta_palabras = 1
+        elif self.conta_palabras and self.flat_comple:
+            # con weight_hold la palabra siguiente tambien es B
+            conta_palabras = 1 if self.hold_r else 0
+            ena_tpu = 1
+        else:
+            if hold_baja:
+                conta_palabras = 0
+            ena_tpu = 0
+
+        estado_actual, ena_out = self.estado_actual, self.ena_out
+        if self.estado_actual == 0:
+            if self.flat_out:
+                estado_actual = 1
+                ena_out = 1
+        elif self.estado_actual == 5:
+            estado_actual = 0
+            ena_out = 0
+        else:
+            estado_actual += 1
+
+        # --- four_palabras (en rafaga, Ena_write y Datos_in retrasados un ciclo)
+        if self.rafaga_write:
+            rx_flat, dato_in = self.write_r, self.datos_r
+        else:
+            rx_flat, dato_in = write_ena, ui_in
+        con, mem, data_comple = self.con, self.mem, self.data_comple
+        flat_comple = 0
+        if rx_flat:
+            # registro de desplazamiento: el byte nuevo entra arriba
+            palabra = (dato_in << (8 * (BYTES_MATRIZ - 1))) | self.mem
+            mem = palabra >> 8
+            if self.con == BYTES_MATRIZ - 1:
+                flat_comple = 1
+                data_comple = palabra & MASK_DATA
+                con = 0
+            else:
+                con = self.con + 1
+
+        # --- operand_fifo_u: el par entra con la palabra B; el datapath serie
+        # lee A y B hasta listo, asi que el par sale con listo
+        op_mem, op_rd, op_wr, op_n = self.op_mem, self.op_rd, self.op_wr, self.op_n
+        if self.cola_operandos:
+            enable, op_a, op_b = emite, *self.op_mem[self.op_rd]
+        else:
+            enable, op_a, op_b = self.ena_tpu, self.matriz_a, self.data_comple
+        if clear_solo:
+            op_rd = op_wr = op_n = 0
+        else:
+            saca = emite if self.mult_mode != MULT_SERIAL else bool(self.cola_operandos and listo)
+            saca = saca and op_n > 0
+            entra = bool(self.cola_operandos and self.conta_palabras and self.flat_comple
+                         and (op_n < self.operand_fifo_depth or saca))
+            if entra:
+                op_mem = op_mem[:op_wr] + ((self.matriz_a, self.data_comple),) + op_mem[op_wr + 1:]
+                op_wr = (op_wr + 1) % self.operand_fifo_depth
+            if saca:
+                op_rd = (op_rd + 1) % self.operand_fifo_depth
+            op_n += entra - saca
+
+        # --- matrix_multiply_unit (A1 de op_a, B1 de op_b)
+        state_mult, i, j, k = self.state_mult, self.i, self.j, self.k
+        acc_mult, result, listo_sig, res = self.acc_mult, self.result, self.listo, self.res
+        a_q, b_q, valido_q, prod_p, valido_p = self.a_q, self.b_q, self.valido_q, self.prod_p, self.valido_p
+        if self.mult_mode == MULT_PIPELINED:
+            valido_q = enable
+            valido_p = self.valido_q
+            if enable:
+                a_q, b_q = op_a, op_b
+            if self.valido_q:
+                prod_p = tuple(_elemento(self.a_q, fila, k) * _elemento(self.b_q, k, col)
+                               for fila in range(M_SIZE) for col in range(M_SIZE) for k in range(M_SIZE))
+
+        if self.state_mult == S_IDLE and self.mult_mode == MULT_PIPELINED:
+            if self.valido_p:
+                result = 0
+                for e in range(M_SIZE * M_SIZE):
+                    suma = sum(self.prod_p[e * M_SIZE:(e + 1) * M_SIZE])
+                    result |= (suma & MASK_ACC) << (ACC_WIDTH * e)
+            listo_sig = self.valido_p
+        elif self.state_mult == S_IDLE:
+            if enable and self.mult_mode == MULT_PARALLEL:
+                result = 0
+                for fila in range(M_SIZE):
+                    for col in range(M_SIZE):
+                        suma = sum(_elemento(op_a, fila, k) * _elemento(op_b, k, col)
+                                   for k in range(M_SIZE))
+                        result |= (suma & MASK_ACC) << (ACC_WIDTH * (fila * M_SIZE + col))
+                state_mult = S_DONE
+                listo_sig = 1
+            else:
+                if enable:
+                    state_mult = S_LOAD
+                listo_sig = 0
+        elif self.state_mult == S_LOAD:
+            state_mult = S_CALC
+        elif self.state_mult == S_CALC:
+            if self.k < M_SIZE:
+                acc_mult = (self.acc_mult + _elemento(op_a, self.i, self.k)
+                            * _elemento(op_b, self.k, self.j)) & MASK_ACC
+                k = self.k + 1
+            else:
+                res = list(self.res)
+                res[self.i * M_SIZE + self.j] = self.acc_mult
+                res = tuple(res)
+                acc_mult = 0
+                k = 0
+                if self.j < M_SIZE - 1:
+                    j = self.j + 1
+                else:
+                    j = 0
+                    if self.i < M_SIZE - 1:
+                        i = self.i + 1
+                    else:
+                        i = 0
+                        state_mult = S_STORE
+        elif self.state_mult == S_STORE:
+            result = 0
+            for e, valor in enumerate(self.res):
+                result |= valor << (ACC_WIDTH * e)
+            state_mult = S_DONE
+            listo_sig = 1
+        else:
+            state_mult = S_IDLE
+            listo_sig = 0
+
+        # --- matrix_accumulate_unit (sin resultado ancho, result con ceros arriba)
+        entrada = self.result if self.resultado_ancho else narrow_word(self.result)
+        acumulador, out = self.acumulador, self.out
+        if clear_solo:
+            acumulador = 0
+        elif self.flat_accu and listo:
+            acumulador = (self.acumulador + entrada) & MASK_WIDE
+        elif self.flat_accu:
+            out = self.acumulador
+        else:
+            out = self.acumulador
+            acumulador = entrada
+
+        # --- result_fifo_u (push con out dos ciclos despues de listo)
+        cola_mem, cola_rd, cola_wr, cola_n = self.cola_mem, self.cola_rd, self.cola_wr, self.cola_n
+        if clear_solo:
+            cola_rd = cola_wr = cola_n = 0
+        else:
+            lee = bool(self.cola_resultados and lectura)
+            escribe = bool(self.cola_resultados and self.listo_rr and (cola_n < self.fifo_depth or lee))
+            if escribe:
+                cola_mem = cola_mem[:cola_wr] + (self.out,) + cola_mem[cola_wr + 1:]
+                cola_wr = (cola_wr + 1) % self.fifo_depth
+            if lee:
+                cola_rd = (cola_rd + 1) % self.fifo_depth
+            cola_n += escribe - lee
+
+        # --- uart_tx_4in4 (start = lectura, rafaga = rafaga_read)
+        flat, first, dato, con_uart = self.flat, self.first, self.dato, self.con_uart
+        flat_out, output_dato = self.flat_out, self.output_dato
+        total = BYTES_WIDE if self.resultado_ancho else BYTES_MATRIZ
+        if lectura:
+            flat = 1
+            flat_out = 1
+            dato = self.cola_mem[self.cola_rd] if self.cola_resultados else self.out
+            if not self.resultado_ancho:
+                dato &= MASK_DATA
+            first = 1
+            con_uart = 0
+        if self.flat and (self.first or read_ena or self.rafaga_read):
+            first = 0
+            if self.con_uart < total:
+                dato = self.dato >> 8
+                con_uart = self.con_uart + 1
+                flat_out = 1
+                output_dato = self.dato & 0xFF
+            else:
+                flat = 0
+                con_uart = 0
+                flat_out = 0
+        elif self.con_uart == total:
+            flat = 0
+            con_uart = 0
+            flat_out = 0
+        else:
+            flat_out = 0
+
+        # Flanco: se actualizan todos los registros a la vez
+        self.dato_disponible, self.flat_accu = dato_disponible, flat_accu
+        self.rafaga_write, self.rafaga_read, self.datos_r = rafaga_write, rafaga_read, ui_in
+        self.cola_resultados, self.listo_r, self.listo_rr = cola_resultados, self.listo, self.listo_r
+        self.cola_operandos, self.resultado_ancho, self.reservas = cola_operandos, resultado_ancho, reservas
+        self.op_mem, self.op_rd, self.op_wr, self.op_n = op_mem, op_rd, op_wr, op_n
+        self.conta_palabras, self.ena_tpu, self.matriz_a = conta_palabras, ena_tpu, matriz_a
+        self.estado_actual, self.ena_out = estado_actual, ena_out
+        self.write_r, self.write_rr = uio_in & ENA_WRITE, self.write_r
+        self.read_r, self.read_rr = uio_in & ENA_READ, self.read_r
+        self.clear_r, self.clear_rr = uio_in & CLEAR, self.clear_r
+        self.accu_r, self.accu_rr = uio_in & ENABLE_ACCU, self.accu_r
+        self.hold_r, self.hold_rr = uio_in & WEIGHT_HOLD, self.hold_r
+        self.con, self.mem, self.data_comple, self.flat_comple = con, mem, data_comple, flat_comple
+        self.state_mult, self.i, self.j, self.k = state_mult, i, j, k
+        self.acc_mult, self.result, self.listo, self.res = acc_mult, result, listo_sig, res
+        self.a_q, self.b_q, self.valido_q, self.prod_p, self.valido_p = a_q, b_q, valido_q, prod_p, valido_p
+        self.acumulador, self.out = acumulador, out
+        self.cola_mem, self.cola_rd, self.cola_wr, self.cola_n = cola_mem, cola_rd, cola_wr, cola_n
+        self.flat, self.first, self.dato, self.con_uart = flat, first, dato, con_uart
+        self.flat_out, self.output_dato = flat_out, output_dato
+
+
+def _correr(corrutina):
+    """Corre hasta el final una corrutina de ``_ModelProtocol``, que nunca se suspende"""
+    try:
+        corrutina.send(None)
+    except StopIteration as fin:
+        return fin.value
+    corrutina.close()
+    raise RuntimeError("una primitiva del modelo ciclo a ciclo se suspendio")
+
+
+class _ModelProtocol(ProtocolDriver):
+    """``ProtocolDriver`` con las primitivas de ``TensorFlowECycleModel``.
+
+    Las primitivas son corrutinas que no esperan nada: cada una avanza el
+    modelo y vuelve, asi que ``_correr`` termina cualquier transaccion de
+    una vez.
+    """
+
+    def __init__(self, timing: Timing, model: Optional[TensorFlowEModel], handshake: bool,
+                 trace: bool, mult_mode: Optional[int]):
+        super().__init__(timing, model, handshake, logging.getLogger(__name__))
+        self.hw = TensorFlowECycleModel(mult_mode)
+        self.cycle = 0
+        self.trace: Optional[List[Tuple[int, int, int]]] = [] if trace else None
+        self.ui_in = 0
+        self.rst_n = 1
+        self._flat_comple = lambda: self.hw.flat_comple
+        self._listo = lambda: self.hw.listo
+        self._dato_disponible = lambda: self.hw.dato_disponible
+        # En cocotb el driver queda justo despues de un flanco de subida
+        # (ClockCycles) o de uno de bajada (FallingEdge). Justo despues del
+        # de subida los registros todavia muestran el valor anterior.
+        self._en_bajada = False
+        self._uio_out_antes = 0
+
+    def _step(self):
+        self._uio_out_antes = self.hw.uio_out
+        self.hw.step(self.ui_in, self._uio, self.rst_n)
+        self.cycle += 1
+        if self.trace is not None:
+            salida = (self.hw.uo_out, self.hw.uio_out)
+            if not self.trace or self.trace[-1][1:] != salida:
+                self.trace.append((self.cycle,) + salida)
+
+    async def idle(self, cycles: int):
+        """``cycles`` flancos de subida; si el modelo queda quieto se saltan los que faltan."""
+        if cycles <= 0:
+            return
+        self._en_bajada = False
+        for n in range(cycles):
+            antes = self.hw.state()
+            self._step()
+            if self.hw.state() == antes:
+                resto = cycles - n - 1
+                self.cycle += resto
+                self.hw.cycle += resto
+                return
+
+    async def _falling_edge(self):
+        if self._en_bajada:
+            self._step()
+        self._en_bajada = True
+
+    async def start(self, reset_cycles: int = 10):
+        await self.reset(reset_cycles)
+
+    def _set_ui_in(self, valor: int):
+        self.ui_in = valor
+
+    def _set_rst_n(self, valor: int):
+        self.rst_n = valor
+
+    def _uo_out(self, i: int) -> int:
+        return self.hw.uo_out
+
+    def _uio_out(self) -> int:
+        return self.hw.uio_out if self._en_bajada else self._uio_out_antes
+
+    async def _read_bytes_handshake(self) -> List[int]:
+        # En cocotb un monitor muestrea flat_out en cada flanco de bajada
+        # mientras se dan los pulsos de Ena_read seguidos
+        datos = []
+        n = result_bytes(self.config)
+
+        def muestrear() -> bool:
+            """True si este flanco de bajada completa la lectura"""
+            if self.hw.flat_out and len(datos) < n:
+                datos.append(self._read_uo_out(len(datos)))
+                return len(datos) == n
+            return False
+
+        if not self._en_bajada:
+            muestrear()
+        for _ in range(n):
+            for nivel in (ENA_READ, 0):
+                self._uio = (self._uio & ~ENA_READ) | nivel
+                self._step()
+                completo = muestrear()
+        # si el ultimo byte llega en la bajada del ultimo ciclo del pulso,
+        # el driver de cocotb sigue desde ese flanco de bajada
+        self._en_bajada = completo
+        espera = 0
+        while len(datos) < n:
+            if espera == HANDSHAKE_TIMEOUT:
+                raise TimeoutError(f"{HANDSHAKE_TIMEOUT} ciclos esperando flat_out")
+            self._step()
+            self._en_bajada = True
+            muestrear()
+            espera += 1
+        return datos
+
+
+class CycleDriver:
+    """``TensorFlowEDriver`` sobre ``TensorFlowECycleModel``, sin simulador.
+
+    Corre el mismo ``ProtocolDriver`` que el driver de cocotb, incluido el
+    modo handshake, asi que pone los mismos pines en los mismos ciclos y
+    los ciclos por transaccion coinciden con los del RTL. Los metodos son
+    los de ``TensorFlowEDriver`` pero devuelven el valor en lugar de una
+    corrutina. ``trace`` guarda ``(ciclo, uo_out, uio_out)`` cada vez que
+    cambia una salida.
+    """
+
+    def __init__(self, timing: Timing = LEGACY_TIMING, model: Optional[TensorFlowEModel] = None,
+                 handshake: bool = False, trace: bool = False, mult_mode: Optional[int] = None):
+        object.__setattr__(self, "_protocolo", _ModelProtocol(timing, model, handshake, trace, mult_mode))
+
+    def __getattr__(self, nombre: str):
+        valor = getattr(self._protocolo, nombre)
+        if inspect.iscoroutinefunction(valor):
+            return functools.wraps(valor)(lambda *args, **kwargs: _correr(valor(*args, **kwargs)))
+        return valor
+
+    def __setattr__(self, nombre: str, valor):
+        setattr(self._protocolo, nombre, valor)
+
+
+class LockstepChecker:
+    """Corre ``TensorFlowECycleModel`` junto al DUT y compara las salidas en cada ciclo.
+
+    Las entradas se leen en el flanco de subida (las escrituras de cocotb
+    se aplican despues) y las salidas en ``ReadOnly`` del mismo ciclo.
+    """
+
+    def __init__(self, dut, max_errores: int = 10, mult_mode: Optional[int] = None):
+        self.dut = dut
+        self.hw = TensorFlowECycleModel(mult_mode)
+        self.max_errores = max_errores
+        self.errores: List[str] = []
+        self.ciclos = 0
+        self._tarea = None
+
+    def start(self):
+        import cocotb
+
+        self._tarea = cocotb.start_soon(self._correr())
+        return self
+
+    def stop(self):
+        if self._tarea is not None:
+            self._tarea.kill()
+            self._tarea = None
+
+    @staticmethod
+    def _entero(senal) -> int:
+        valor = senal.value
+        return valor.integer if valor.is_resolvable else 0
+
+    async def _correr(self):
+        from cocotb.triggers import ReadOnly, RisingEdge
+
+        dut = self.dut
+        activo = False
+        while True:
+            await RisingEdge(dut.clk)
+            rst_n = self._entero(dut.rst_n)
+            self.hw.step(self._entero(dut.ui_in), self._entero(dut.uio_in), rst_n)
+            # antes del primer reset el DUT puede estar en x
+            activo = activo or not rst_n
+            if not activo:
+                continue
+            await ReadOnly()
+            self.ciclos += 1
+            esperado = (self.hw.uo_out, self.hw.uio_out, UIO_OE)
+            obtenido = (self._entero(dut.uo_out), self._entero(dut.uio_out), self._entero(dut.uio_oe))
+            if obtenido != esperado and len(self.errores) < self.max_errores:
+                self.errores.append(
+                    f"ciclo {self.hw.cycle}: (uo_out, uio_out, uio_oe) = "
+                    f"({obtenido[0]:#04x}, {obtenido[1]:#04x}, {obtenido[2]:#04x}), modelo "
+                    f"({esperado[0]:#04x}, {esperado[1]:#04x}, {esperado[2]:#04x})"
+                )
+
+    def check(self):
+        assert self.ciclos > 0, "el modelo nunca vio un reset del DUT"
+        assert not self.errores, "modelo ciclo a ciclo distinto del RTL:\n" + "\n".join(self.errores)
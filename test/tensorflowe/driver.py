@@ -0,0 +1,761 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Driver de transacciones para tt_um_TensorFlowE.
+
+Reune en una sola clase las funciones que antes copiaba cada test
+(``enviar_matriz``, ``leer_resultados`` y ``debug_signals``) y cuenta los
+ciclos de reloj de cada transaccion. Las matrices se codifican con
+``codec``.
+
+El protocolo y los tiempos estan en ``ProtocolDriver``, una sola vez.
+``TensorFlowEDriver`` le pone las primitivas de cocotb y ``CycleDriver``
+(``cycle``) las del modelo ciclo a ciclo.
+"""
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.utils import get_sim_steps, get_sim_time
+from cocotb.triggers import ClockCycles, FallingEdge
+
+from .codec import BYTES_WIDE, BYTES_WORD, M_SIZE, bytes_to_matrix, matrix_to_bytes
+from .model import TensorFlowEModel
+
+if TYPE_CHECKING:
+    from .trace import Tracer
+
+# Bits de uio_in / uio_out (ver info.yaml)
+ENA_WRITE = 1 << 0
+ENA_READ = 1 << 1
+CLEAR = 1 << 2
+ENABLE_ACCU = 1 << 3
+ENA_OUT = 1 << 4
+WEIGHT_HOLD = 1 << 5
+DATO_LISTO = 1 << 6  # la proxima lectura arranca la uart
+FIFO_FULL = 1 << 7  # cola de resultados llena
+
+# Bits de configuracion: se copian de ui_in con clear y enable_accu juntos
+BURST_WRITE = 1 << 0  # Ena_write por nivel, un byte por ciclo
+BURST_READ = 1 << 1  # un flanco de Ena_read saca todos los bytes, Ena_out marca cada uno
+RESULT_FIFO = 1 << 2  # cada producto entra en la cola de resultados y cada lectura saca el mas viejo
+OPERAND_FIFO = 1 << 3  # cada par A, B entra en la cola de operandos y pasa al multiplicador cuando esta libre
+WIDE_RESULT = 1 << 4  # se acumulan y leen los 2*VAR_WIDTH bits de cada elemento (BYTES_WIDE bytes)
+
+# Con BURST_READ el primer byte esta en uo_out tras el tercer flanco desde
+# que sube Ena_read (sincronizador, start y primer byte); los demas siguen
+# uno por ciclo
+BURST_READ_LATENCY = 3
+
+# Con RESULT_FIFO el producto entra en la cola dos flancos despues de
+# dato_disponible: out de matrix_accumulate_unit va dos registros detras
+# de listo
+RESULT_FIFO_DELAY = 2
+
+# Con OPERAND_FIFO el par entra en la cola dos flancos despues del que
+# muestrea el ultimo byte de B (sincronizador y four_palabras)
+OPERAND_FIFO_DELAY = 2
+
+# Bytes por matriz (2 en 2x2 de 4 bits)
+BYTES_MATRIZ = BYTES_WORD
+
+
+def result_bytes(flags: int) -> int:
+    """Bytes de cada lectura con los bits de configuracion ``flags``"""
+    return BYTES_WIDE if flags & WIDE_RESULT else BYTES_MATRIZ
+
+
+# Ciclos de S_CALC en el datapath serie: M_SIZE+1 por elemento (12 en 2x2)
+SERIAL_CALC_CYCLES = M_SIZE * M_SIZE * (M_SIZE + 1)
+
+
+@dataclass(frozen=True)
+class Timing:
+    """Ciclos de reloj que dura cada fase del protocolo."""
+
+    write_setup: int  # antes de cada byte escrito
+    write_high: int  # Ena_write en alto
+    write_low: int  # Ena_write en bajo
+    compute: int  # espera tras escribir la matriz B
+    read_wait: int  # espera antes de pedir el primer byte
+    read_setup: int  # antes de cada byte leido
+    read_high: int  # Ena_read en alto
+    read_low: int  # Ena_read en bajo, al final se muestrea uo_out
+    pulse_high: int  # clear / enable_accu en alto
+    pulse_low: int  # clear / enable_accu en bajo
+
+
+# Tiempos originales de los tests, medidos a ojo con el visor de ondas
+LEGACY_TIMING = Timing(
+    write_setup=1, write_high=3, write_low=3,
+    compute=SERIAL_CALC_CYCLES + 8, read_wait=15,
+    read_setup=5, read_high=5, read_low=1,
+    pulse_high=5, pulse_low=1,
+)
+
+# Tiempos minimos segun el RTL:
+#  - los detectores de flanco de TensorFlowE necesitan 1 ciclo alto y 1 bajo;
+#  - four_palabras captura ui_in en el flanco del pulso, 2 ciclos despues de
+#    subir Ena_write, por eso el dato se mantiene durante alto+bajo;
+#  - desde el ultimo byte de B: 2 ciclos hasta S_LOAD,
+#    SERIAL_CALC_CYCLES + 2 hasta listo (14 en 2x2), 1 para
+#    dato_disponible; Ena_read puede subir justo despues;
+#  - uart_tx_4in4 pone el byte en uo_out 3 ciclos despues de subir Ena_read;
+#  - tras clear, matrix_accumulate_unit tarda 2 ciclos en volver a poner el
+#    ultimo producto en out, que es lo que copia la uart al empezar a leer.
+MIN_TIMING = Timing(
+    write_setup=0, write_high=1, write_low=1,
+    compute=SERIAL_CALC_CYCLES + 5, read_wait=0,
+    read_setup=0, read_high=1, read_low=2,
+    pulse_high=1, pulse_low=2,
+)
+
+# Con MULT=parallel matrix_multiply_unit da listo un ciclo despues de
+# enable: desde el ultimo byte de B son 3 ciclos hasta dato_disponible
+PARALLEL_MIN_TIMING = replace(MIN_TIMING, compute=3)
+# Con MULT=pipelined el resultado sale de la tercera etapa: 5 ciclos
+PIPELINED_MIN_TIMING = replace(MIN_TIMING, compute=5)
+
+
+# Ciclos maximos que se espera una senal en modo handshake: cinco veces la
+# espera fija de LEGACY_TIMING tras escribir B (100 en 2x2). Alcanza para el
+# producto serie mas lento, con los pares de la cola de operandos delante.
+HANDSHAKE_TIMEOUT = 5 * LEGACY_TIMING.compute
+
+
+@dataclass
+class Transaction:
+    """Una operacion sobre el DUT y los ciclos que tomo."""
+
+    kind: str
+    start: int
+    end: int = 0
+    data: Any = None
+    id: int = 0
+    parent: Optional[int] = None  # transaccion que la contiene
+
+    @property
+    def cycles(self) -> int:
+        return self.end - self.start
+
+
+def check_config(flags: int):
+    """Combinaciones de bits de configuracion que los drivers saben usar"""
+    if flags & OPERAND_FIFO and not flags & RESULT_FIFO:
+        # sin la cola de resultados los productos se pisan y el driver no
+        # sabe cual queda para leer
+        raise ValueError("OPERAND_FIFO necesita RESULT_FIFO")
+
+
+class ProtocolDriver(ABC):
+    """Protocolo de pines de tt_um_TensorFlowE, comun a los dos drivers.
+
+    Las transacciones, los tiempos de ``timing`` y el modo handshake se
+    escriben una sola vez aca. Cada driver pone ``cycle`` y las primitivas
+    abstractas ``idle``, ``_falling_edge``, ``_set_ui_in``, ``_set_rst_n``,
+    ``_uo_out``, ``_uio_out`` y ``_read_bytes_handshake``, y las senales
+    internas ``_flat_comple``, ``_listo`` y ``_dato_disponible``: funciones
+    sin argumentos, o None si no se ven. ``TensorFlowEDriver`` las toma de
+    cocotb y ``CycleDriver`` de ``TensorFlowECycleModel``.
+    """
+
+    def __init__(self, timing: Timing, model: Optional[TensorFlowEModel], handshake: bool,
+                 log: logging.Logger, tracer: Optional["Tracer"] = None):
+        self.log = log
+        self.timing = timing
+        # Si hay modelo, cada lectura se compara con el resultado esperado
+        self.model = model
+        # En modo handshake se esperan eventos del RTL en lugar de ciclos
+        # fijos, si el driver ve las senales internas
+        self.handshake = handshake
+        self.transactions: List[Transaction] = []
+        # A fija mientras weight_hold esta en alto (ver load_weights)
+        self.weights = None
+        # bits de configuracion escritos con configure()
+        self.config = 0
+        # con OPERAND_FIFO: productos escritos sin leer y flanco que muestrea
+        # el ultimo byte escrito
+        self._pendientes = 0
+        self._ultimo_byte = 0
+        self._uio = 0
+        self._next_id = 0
+        self._abiertas: List[Transaction] = []
+        self._flat_comple: Optional[Callable[[], Any]] = None
+        self._listo: Optional[Callable[[], Any]] = None
+        self._dato_disponible: Optional[Callable[[], Any]] = None
+        # Traza estructurada (TRACE_FILE); None si esta apagada
+        self._trace = tracer
+        self._trace_pins = tracer is not None and tracer.pins
+
+    # ------------------------------------------------------------------
+    # Primitivas de cada driver
+    # ------------------------------------------------------------------
+    @abstractmethod
+    async def idle(self, cycles: int):
+        """``cycles`` flancos de subida."""
+
+    @abstractmethod
+    async def _falling_edge(self):
+        """Hasta el proximo flanco de bajada."""
+
+    @abstractmethod
+    def _set_ui_in(self, valor: int):
+        """Pone ``ui_in``."""
+
+    @abstractmethod
+    def _set_rst_n(self, valor: int):
+        """Pone ``rst_n``."""
+
+    @abstractmethod
+    def _uo_out(self, i: int) -> int:
+        """``uo_out`` al leer el byte ``i`` de un resultado."""
+
+    @abstractmethod
+    def _uio_out(self) -> int:
+        """``uio_out`` visto por el driver."""
+
+    @abstractmethod
+    async def _read_bytes_handshake(self) -> List[int]:
+        """Sin BURST_READ y con dato listo: todos los bytes, siguiendo al RTL"""
+
+    def _como_depurar(self, tr: Transaction) -> str:
+        """Texto que se agrega al error de una lectura distinta del modelo"""
+        return ""
+
+    # ------------------------------------------------------------------
+    # Reset, pines y transacciones abiertas
+    # ------------------------------------------------------------------
+    async def reset(self, cycles: int = 10):
+        if self.model is not None:
+            self.model.reset()
+        self._set_ui_in(0)
+        self._set_uio(0)
+        self.weights = None
+        self.config = 0
+        self._pendientes = 0
+        self._set_rst_n(0)
+        await self.idle(cycles)
+        self._set_rst_n(1)
+        await self.idle(cycles)
+
+    def _set_uio(self, value: int):
+        self._uio = value
+
+    def _begin(self, kind: str) -> Transaction:
+        tr = Transaction(kind, self.cycle, id=self._next_id,
+                         parent=self._abiertas[-1].id if self._abiertas else None)
+        self._next_id += 1
+        self._abiertas.append(tr)
+        return tr
+
+    def _end(self, tr: Transaction, data: Any = None) -> Transaction:
+        tr.end = self.cycle
+        tr.data = data
+        self.transactions.append(tr)
+        self._abiertas.pop()
+        self.log.debug("%s: %d ciclos", tr.kind, tr.cycles)
+        if self._trace is not None:
+            self._trace.transaction(tr)
+        return tr
+
+    async def _pulse(self, bit: int, high: int, low: int):
+        self._set_uio(self._uio | bit)
+        await self.idle(high)
+        self._set_uio(self._uio & ~bit)
+        await self.idle(low)
+
+    async def _wait_until(self, condicion, que: str, limite: int = HANDSHAKE_TIMEOUT):
+        """Espera, muestreando en el flanco de bajada, a que se cumpla la condicion."""
+        for _ in range(limite):
+            await self._falling_edge()
+            if condicion():
+                return
+        raise TimeoutError(f"{limite} ciclos esperando {que}")
+
+    def _hay_dato(self) -> bool:
+        """uio_out[6]: la proxima lectura arranca la uart"""
+        return bool(self._uio_out() & DATO_LISTO)
+
+    def _poner_byte(self, byte: int):
+        self._set_ui_in(byte)
+        if self._trace_pins:
+            self._trace.event("byte", dir="write", cycle=self.cycle, value=byte)
+        self._ultimo_byte = self.cycle + 1
+
+    def _read_uo_out(self, i: int) -> int:
+        byte = self._uo_out(i)
+        if self._trace_pins:
+            self._trace.event("byte", dir="read", cycle=self.cycle, value=byte)
+        return byte
+
+    # ------------------------------------------------------------------
+    # Transacciones
+    # ------------------------------------------------------------------
+    async def write_byte(self, byte: int):
+        """Un byte por ui_in con un pulso de Ena_write."""
+        t = self.timing
+        if self.config & BURST_WRITE:
+            await self._write_burst([byte])
+            return
+        await self.idle(t.write_setup)
+        self._poner_byte(byte)
+        await self._pulse(ENA_WRITE, t.write_high, t.write_low)
+
+    async def _write_burst(self, datos, final: bool = True):
+        """Con BURST_WRITE: Ena_write en alto y un byte por ciclo.
+
+        Con ``final`` en falso Ena_write queda en alto para seguir la rafaga
+        con la escritura siguiente.
+        """
+        self._set_uio(self._uio | ENA_WRITE)
+        for byte in datos:
+            self._poner_byte(byte)
+            await self.idle(1)
+        if final:
+            self._set_uio(self._uio & ~ENA_WRITE)
+            if not self.handshake:
+                # en modo handshake write_matrix espera flat_comple
+                await self.idle(self.timing.write_low)
+
+    async def read_byte(self, i: int = 0) -> int:
+        """Un pulso de Ena_read; devuelve uo_out en el flanco de bajada siguiente."""
+        t = self.timing
+        await self.idle(t.read_setup)
+        await self._pulse(ENA_READ, t.read_high, t.read_low)
+        await self._falling_edge()
+        return self._read_uo_out(i)
+
+    async def write_matrix(self, matriz, nombre: str = "matriz", final: bool = True) -> Transaction:
+        """Envia una matriz, un byte por flanco de Ena_write.
+
+        Con BURST_WRITE y ``final`` en falso la rafaga sigue con la matriz
+        siguiente (en modo handshake siempre se corta para esperar).
+        """
+        tr = self._begin("write_matrix")
+        self.log.debug("Enviando %s: %s", nombre, matriz)
+        if self.config & BURST_WRITE:
+            await self._write_burst(matrix_to_bytes(matriz), final or self.handshake)
+        else:
+            for byte in matrix_to_bytes(matriz):
+                await self.write_byte(byte)
+        if self.handshake and self._flat_comple is not None:
+            # four_palabras marca la palabra completa en el flanco del ultimo byte
+            await self._wait_until(self._flat_comple, "flat_comple")
+        return self._end(tr, matriz)
+
+    async def _wait_product(self):
+        if self.handshake and self._listo is not None and self._dato_disponible is not None:
+            # dato_disponible puede seguir en alto por un producto sin leer,
+            # asi que primero se espera el listo de este producto. Un ciclo
+            # despues la salida del acumulador ya es valida para la uart.
+            await self._wait_until(self._listo, "listo")
+            if self.config & RESULT_FIFO:
+                # con la cola no hace falta que dato_disponible este en bajo
+                for _ in range(RESULT_FIFO_DELAY + 1):
+                    await self._falling_edge()
+            else:
+                await self._wait_until(self._dato_disponible, "dato_disponible")
+        else:
+            await self.idle(self.timing.compute)
+            if self.config & RESULT_FIFO:
+                await self.idle(RESULT_FIFO_DELAY)
+
+    async def _wait_operand_fifo(self):
+        """Con OPERAND_FIFO: espera a que entre el par anterior y a que la cola tenga lugar."""
+        await self.idle(self._ultimo_byte + OPERAND_FIFO_DELAY - self.cycle)
+        await self._wait_until(lambda: not self._uio_out() & FIFO_FULL, "fifo_full")
+
+    def _sin_pendientes(self, que: str):
+        # el multiplicador puede estar calculando un par de la cola
+        if self._pendientes:
+            raise RuntimeError(f"{que} con {self._pendientes} productos de la cola de operandos sin leer")
+
+    async def _end_pair(self):
+        # con la cola de operandos el producto se lee despues, sin esperarlo
+        if self.config & OPERAND_FIFO:
+            self._pendientes += 1
+        else:
+            await self._wait_product()
+
+    async def multiply(self, matriz_a, matriz_b) -> Transaction:
+        """Escribe A y B y espera a que termine el producto (con OPERAND_FIFO no lo espera)."""
+        tr = self._begin("multiply")
+        if self.config & OPERAND_FIFO:
+            await self._wait_operand_fifo()
+        await self.write_matrix(matriz_a, "Matriz A", final=False)
+        await self.write_matrix(matriz_b, "Matriz B")
+        await self._end_pair()
+        if self.model is not None:
+            self.model.multiply(matriz_a, matriz_b)
+        return self._end(tr, (matriz_a, matriz_b))
+
+    def set_weight_hold(self, nivel: bool):
+        """Nivel de weight_hold en uio_in[5]."""
+        self._set_uio(self._uio | WEIGHT_HOLD if nivel else self._uio & ~WEIGHT_HOLD)
+
+    async def load_weights(self, matriz_a) -> Transaction:
+        """Sube weight_hold y escribe A, que queda fija para los ``multiply_held`` siguientes."""
+        tr = self._begin("load_weights")
+        self.set_weight_hold(True)
+        await self.write_matrix(matriz_a, "Pesos")
+        self.weights = matriz_a
+        return self._end(tr, matriz_a)
+
+    async def multiply_held(self, matriz_b) -> Transaction:
+        """Escribe solo B y espera el producto con los pesos de ``load_weights``."""
+        if self.weights is None:
+            raise RuntimeError("multiply_held sin load_weights")
+        tr = self._begin("multiply")
+        if self.config & OPERAND_FIFO:
+            await self._wait_operand_fifo()
+        await self.write_matrix(matriz_b, "Matriz B")
+        await self._end_pair()
+        if self.model is not None:
+            self.model.multiply(self.weights, matriz_b)
+        return self._end(tr, (self.weights, matriz_b))
+
+    async def release_weights(self) -> Transaction:
+        """Baja weight_hold; despues de la espera la palabra siguiente vuelve a ser A."""
+        tr = self._begin("release_weights")
+        self.set_weight_hold(False)
+        # el flanco de bajada pasa por dos registros antes de llegar a conta_palabras
+        await self.idle(self.timing.pulse_high + self.timing.pulse_low)
+        self.weights = None
+        return self._end(tr)
+
+    async def accumulate(self) -> Transaction:
+        """Pulso en enable_accu: los productos siguientes se suman."""
+        self._sin_pendientes("accumulate")
+        tr = self._begin("accumulate")
+        await self._pulse(ENABLE_ACCU, self.timing.pulse_high, self.timing.pulse_low)
+        if self.model is not None:
+            self.model.accumulate()
+        return self._end(tr)
+
+    async def configure(self, flags: int) -> Transaction:
+        """Escribe los bits de configuracion (``BURST_WRITE``, ``BURST_READ``, ``RESULT_FIFO``, ``OPERAND_FIFO``, ``WIDE_RESULT``): ui_in con clear y enable_accu juntos."""
+        check_config(flags)
+        self._sin_pendientes("configure")
+        tr = self._begin("configure")
+        self._set_ui_in(flags)
+        await self._pulse(CLEAR | ENABLE_ACCU, self.timing.pulse_high, self.timing.pulse_low)
+        self.config = flags
+        if self.model is not None:
+            self.model.use_result_fifo(bool(flags & RESULT_FIFO))
+            self.model.use_operand_fifo(bool(flags & OPERAND_FIFO))
+            self.model.use_wide_result(bool(flags & WIDE_RESULT))
+        return self._end(tr, flags)
+
+    async def clear(self) -> Transaction:
+        """Pulso en clear: borra el acumulador, sale del modo acumulacion y vacia la cola de resultados."""
+        self._sin_pendientes("clear")
+        tr = self._begin("clear")
+        await self._pulse(CLEAR, self.timing.pulse_high, self.timing.pulse_low)
+        if self.model is not None:
+            self.model.clear()
+        return self._end(tr)
+
+    async def read_result(self) -> List[List[int]]:
+        """Lee los bytes del resultado y devuelve la matriz (con ``WIDE_RESULT``, de ``2*VAR_WIDTH`` bits)."""
+        t = self.timing
+        tr = self._begin("read_result")
+        if self._pendientes:
+            # el producto sale de la cola de operandos cuando el multiplicador esta libre
+            await self._wait_until(self._hay_dato, "dato_listo")
+            self._pendientes -= 1
+        await self.idle(t.read_wait)
+        self.log.debug("Leyendo resultados")
+        if self.config & BURST_READ:
+            datos = await self.read_burst()
+        elif self.handshake and self._hay_dato():
+            datos = await self._read_bytes_handshake()
+        else:
+            # sin dato disponible la uart no arranca y uo_out no cambia
+            datos = [await self.read_byte(i) for i in range(result_bytes(self.config))]
+        resultados = bytes_to_matrix(datos, bool(self.config & WIDE_RESULT))
+        self.log.debug("Resultado reconstruido: %s", resultados)
+        self._end(tr, resultados)
+        if self.model is not None:
+            esperado = self.model.read_result()
+            assert resultados == esperado, (
+                f"Resultado {resultados}, esperado {esperado} en la transaccion {tr.id}{self._como_depurar(tr)}"
+            )
+        return resultados
+
+    async def read_burst(self) -> List[int]:
+        """Con BURST_READ: un pulso de Ena_read y un byte por ciclo.
+
+        En modo handshake cada byte se toma cuando Ena_out esta en alto;
+        sin handshake, en los ciclos fijos desde el pulso.
+        """
+        await self.idle(self.timing.read_setup)
+        if self.handshake and self._hay_dato():
+            await self._pulse(ENA_READ, 1, 0)
+            datos = []
+            for i in range(result_bytes(self.config)):
+                await self._wait_until(lambda: self._uio_out() & ENA_OUT, "Ena_out")
+                datos.append(self._read_uo_out(i))
+            return datos
+        # sin dato disponible la uart no arranca y uo_out no cambia
+        await self._pulse(ENA_READ, 1, BURST_READ_LATENCY - 1)
+        datos = []
+        for i in range(result_bytes(self.config)):
+            await self._falling_edge()
+            datos.append(self._read_uo_out(i))
+        return datos
+
+    async def replay(self, transacciones: List[Transaction]) -> List[Transaction]:
+        """Repite las transacciones de otro driver; devuelve las nuevas.
+
+        Las transacciones anidadas (con ``parent``) las repite la que las
+        contiene. Un ``multiply`` con pesos cargados se repite como
+        ``multiply_held``, que escribe solo B.
+        """
+        inicio = len(self.transactions)
+        for tr in transacciones:
+            if tr.parent is not None:
+                continue
+            if tr.kind == "multiply":
+                matriz_a, matriz_b = tr.data
+                if self.weights is None:
+                    await self.multiply(matriz_a, matriz_b)
+                elif matriz_a == self.weights:
+                    await self.multiply_held(matriz_b)
+                else:
+                    raise ValueError(f"transaccion {tr.id}: multiply con A {matriz_a} y pesos {self.weights} cargados")
+            elif tr.kind == "load_weights":
+                await self.load_weights(tr.data)
+            elif tr.kind == "release_weights":
+                await self.release_weights()
+            elif tr.kind == "write_matrix":
+                await self.write_matrix(tr.data)
+            elif tr.kind == "accumulate":
+                await self.accumulate()
+            elif tr.kind == "clear":
+                await self.clear()
+            elif tr.kind == "configure":
+                await self.configure(tr.data)
+            elif tr.kind == "read_result":
+                await self.read_result()
+            else:
+                raise ValueError(f"transaccion {tr.id} de tipo desconocido {tr.kind!r}")
+        return self.transactions[inicio:]
+
+    # ------------------------------------------------------------------
+    # Reporte
+    # ------------------------------------------------------------------
+    def summary(self, kind: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Ciclos por tipo de transaccion: cantidad, total, minimo, maximo y media."""
+        resumen: Dict[str, Dict[str, float]] = {}
+        for tr in self.transactions:
+            if kind is not None and tr.kind != kind:
+                continue
+            r = resumen.setdefault(tr.kind, {"count": 0, "total": 0,
+                                             "min": tr.cycles, "max": tr.cycles})
+            r["count"] += 1
+            r["total"] += tr.cycles
+            r["min"] = min(r["min"], tr.cycles)
+            r["max"] = max(r["max"], tr.cycles)
+        for r in resumen.values():
+            r["mean"] = r["total"] / r["count"]
+        return resumen
+
+    def cycles_per_matmul(self) -> float:
+        """Ciclos de escritura, calculo y lectura por producto"""
+        resumen = self.summary()
+        productos = resumen.get("multiply", {}).get("count", 0)
+        if not productos:
+            return 0.0
+        ciclos = sum(resumen.get(k, {}).get("total", 0) for k in ("multiply", "read_result"))
+        return ciclos / productos
+
+    def report(self):
+        # el resumen recorre todas las transacciones: solo si se va a ver
+        if not self.log.isEnabledFor(logging.INFO):
+            return
+        resumen = self.summary()
+        for kind, r in resumen.items():
+            self.log.info("%s: %d transacciones, %d ciclos, media %.1f (min %d, max %d)",
+                          kind, r["count"], r["total"], r["mean"], r["min"], r["max"])
+        if "multiply" in resumen:
+            self.log.info("Ciclos por producto: %.1f", self.cycles_per_matmul())
+
+
+class TensorFlowEDriver(ProtocolDriver):
+    """Maneja los pines de tt_um_TensorFlowE a nivel de transaccion."""
+
+    def __init__(self, dut, timing: Timing = LEGACY_TIMING, period_ns: int = 100,
+                 model: Optional[TensorFlowEModel] = None, handshake: bool = False,
+                 tracer: Optional["Tracer"] = None):
+        # Traza estructurada (TRACE_FILE). Se importa aca para que
+        # ``python -m tensorflowe.trace`` no la importe dos veces.
+        if tracer is None:
+            from .trace import Tracer
+
+            tracer = Tracer.from_env()
+        super().__init__(timing, model, handshake, dut._log, tracer)
+        self.dut = dut
+        self.period_ns = period_ns
+        self._clock_start: Optional[int] = None
+
+        # Las senales internas no existen en la simulacion de compuertas;
+        # en ese caso el modo handshake usa los tiempos de ``timing``.
+        core = ("user_project", "core")
+        self._flat_comple = self._nivel(*core, "four_palabras_Unit", "flat_comple")
+        self._listo = self._nivel(*core, "listo")
+        self._dato_disponible = self._nivel(*core, "dato_disponible")
+        self._flat_out = self._nivel(*core, "uart_tx_u", "flat_out")
+
+        # Con DUMP_TXN=<n> (make DUMP=fst DUMP_TXN=<n>) tb.v solo guarda
+        # ondas desde DUMP_TXN_MARGIN transacciones antes de la <n> hasta
+        # que esta termina.
+        self._wave_trigger = self._handle("wave_trigger")
+        self._dump_txn = int(os.environ["DUMP_TXN"]) if os.environ.get("DUMP_TXN") else None
+        self._dump_margin = int(os.environ.get("DUMP_TXN_MARGIN", "2"))
+
+    def _handle(self, *path):
+        obj = self.dut
+        try:
+            for nombre in path:
+                obj = getattr(obj, nombre)
+        except AttributeError:
+            return None
+        return obj
+
+    def _nivel(self, *path) -> Optional[Callable[[], bool]]:
+        """Funcion que dice si la senal interna esta en 1, o None si no existe"""
+        senal = self._handle(*path)
+        if senal is None:
+            return None
+        return lambda: senal.value == 1
+
+    # ------------------------------------------------------------------
+    # Reloj, reset y contador de ciclos
+    # ------------------------------------------------------------------
+    async def start(self, reset_cycles: int = 10):
+        """Arranca el reloj, el contador de ciclos y aplica reset."""
+        clock = Clock(self.dut.clk, self.period_ns, units="ns")
+        cocotb.start_soon(clock.start())
+        if self._clock_start is None:
+            self._clock_start = get_sim_time()
+        await self.reset(reset_cycles)
+
+    async def reset(self, cycles: int = 10):
+        self.log.info("Aplicando Reset")
+        self.dut.ena.value = 1
+        await super().reset(cycles)
+
+    @property
+    def cycle(self) -> int:
+        """Flancos de subida desde que arranco el reloj.
+
+        Se calcula con el tiempo de simulacion y no con una corrutina en
+        RisingEdge, que en el mismo flanco puede correr antes o despues
+        del driver.
+        """
+        if self._clock_start is None:
+            return 0
+        return (get_sim_time() - self._clock_start) // get_sim_steps(self.period_ns, "ns")
+
+    async def idle(self, cycles: int):
+        if cycles > 0:
+            await ClockCycles(self.dut.clk, cycles)
+
+    async def _falling_edge(self):
+        await FallingEdge(self.dut.clk)
+
+    def _set_ui_in(self, valor: int):
+        self.dut.ui_in.value = valor
+
+    def _set_rst_n(self, valor: int):
+        self.dut.rst_n.value = valor
+
+    def _set_uio(self, value: int):
+        self._uio = value
+        self.dut.uio_in.value = value
+
+    def _uo_out(self, i: int) -> int:
+        valor_actual = self.dut.uo_out.value
+        if valor_actual.is_resolvable:
+            return valor_actual.integer
+        self.log.warning("Byte leído %d: Valor indeterminado (x), usando 0", i)
+        return 0  # Default si hay 'x'
+
+    def _uio_out(self) -> int:
+        valor = self.dut.uio_out.value
+        return valor.integer if valor.is_resolvable else 0
+
+    def _begin(self, kind: str) -> Transaction:
+        tr = super()._begin(kind)
+        if self._dump_txn is not None and tr.id == max(0, self._dump_txn - self._dump_margin):
+            self._set_wave_trigger(1)
+        return tr
+
+    def _end(self, tr: Transaction, data: Any = None) -> Transaction:
+        super()._end(tr, data)
+        if self._dump_txn is not None and tr.id == self._dump_txn:
+            self._set_wave_trigger(0)
+        return tr
+
+    def _set_wave_trigger(self, valor: int):
+        if self._wave_trigger is not None:
+            self._wave_trigger.value = valor
+
+    def _como_depurar(self, tr: Transaction) -> str:
+        return f"; para ver las ondas: make DUMP=fst DUMP_TXN={tr.id} RANDOM_SEED={cocotb.RANDOM_SEED}"
+
+    # ------------------------------------------------------------------
+    # Lectura con handshake
+    # ------------------------------------------------------------------
+    async def _read_bytes_handshake(self) -> List[int]:
+        if self._flat_out is not None:
+            # flat_out de uart_tx_4in4 marca cada byte valido en uo_out, asi
+            # que los pulsos de Ena_read pueden ir seguidos (1 alto, 1 bajo)
+            monitor = cocotb.start_soon(self._collect_bytes())
+            for _ in range(result_bytes(self.config)):
+                await self._pulse(ENA_READ, 1, 1)
+            return await monitor
+        # Solo pines: Ena_out sube un ciclo despues del primer byte y no
+        # vuelve a subir para el segundo, que aparece 2 ciclos despues de
+        # su pulso.
+        datos = []
+        ena_out_antes = bool(self._uio_out() & ENA_OUT)
+
+        def ena_out_sube():
+            nonlocal ena_out_antes
+            ena_out = bool(self._uio_out() & ENA_OUT)
+            sube = ena_out and not ena_out_antes
+            ena_out_antes = ena_out
+            return sube
+
+        await self._pulse(ENA_READ, 1, 0)
+        await self._wait_until(ena_out_sube, "Ena_out")
+        datos.append(self._read_uo_out(0))
+        for i in range(1, result_bytes(self.config)):
+            await self._pulse(ENA_READ, 1, 1)
+            await self._falling_edge()
+            datos.append(self._read_uo_out(i))
+        return datos
+
+    async def _collect_bytes(self) -> List[int]:
+        datos = []
+        while len(datos) < result_bytes(self.config):
+            await self._wait_until(self._flat_out, "flat_out")
+            datos.append(self._read_uo_out(len(datos)))
+        return datos
+
+    # ------------------------------------------------------------------
+    # Depuracion
+    # ------------------------------------------------------------------
+    async def debug_signals(self, tiempo: int = 2):
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("=== DEBUG SEÑALES ===")
+            self.log.debug("uo_out: %s", self.dut.uo_out.value)
+            self.log.debug("uio_out: %s", self.dut.uio_out.value)
+            self.log.debug("uio_oe: %s", self.dut.uio_oe.value)
+        await self.idle(tiempo)
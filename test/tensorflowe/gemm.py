@@ -0,0 +1,520 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""GEMM int4 por bloques sobre el multiplicador 2x2 de TensorFlowE.
+
+``run_gemm`` parte ``A`` (MxK) y ``B`` (KxN) en bloques 2x2, completando
+con ceros si alguna dimension no es multiplo de ``M_SIZE``, y manda los productos de bloques
+en el orden de un ``Plan``. La suma sobre K se hace:
+
+- ``accumulate="device"``: en ``matrix_accumulate_unit``, con
+  ``enable_accu``. El primer producto de cada cadena ya queda en el
+  acumulador porque con ``enable`` en bajo se copia ``result`` en cada
+  ciclo, asi que no hace falta un producto por cero.
+- ``accumulate="host"``: se lee cada producto parcial y suma el host.
+
+Los numeros son los del hardware: cada producto parcial guarda solo 4
+bits por elemento y ``matrix_accumulate_unit`` suma la palabra de 16 bits
+completa, con acarreo de un elemento al siguiente. Con la suma en el host
+el resultado es exactamente ``(A @ B) % 16``; con la suma en el chip es la
+suma empaquetada que da ``reference_gemm``, que no es un producto de
+matrices. Por eso ``run_gemm``, ``gemm`` y la linea de comandos suman en
+el host salvo que se pida ``accumulate="device"`` o un plan que sume en el
+chip, y ``best_schedule`` solo elige ordenes que suman en el chip si se
+le pide ``accumulate="device"``. El acumulador solo sirve para una GEMM
+en ``k_chunked``, que lo usa en tramos de K donde ningun elemento puede
+acarrear.
+
+Con otro ``M_SIZE`` o ``VAR_WIDTH`` (``codec``) los bloques son de
+``M_SIZE`` x ``M_SIZE``, cada elemento guarda ``VAR_WIDTH`` bits y el
+resultado en el host es ``(A @ B) % 2**VAR_WIDTH``. Si el driver esta
+configurado con ``WIDE_RESULT`` cada lectura trae los ``2*VAR_WIDTH``
+bits de cada elemento: con la suma en el host el resultado es
+``(A @ B) % 256`` en 2x2 de 4 bits, sin productos extra.
+
+Como hay un solo acumulador y cada lectura son ``BYTES_WORD`` bytes por ``uo_out``,
+el orden decide cuantas lecturas, pulsos y productos hacen falta.
+``plan_gemm`` arma el orden de cada ``SCHEDULES`` y ``best_schedule``
+elige el de menos ciclos previstos. El driver puede ser
+``TensorFlowEDriver`` (simulacion con cocotb) o ``CycleDriver`` (modelo en
+Python); ``GemmStats`` tiene las transferencias previstas y medidas, los
+ciclos del dispositivo y los MAC/s al reloj del chip.
+
+Uso::
+
+    python -m tensorflowe.gemm --m 64 --k 64 --n 64
+    python -m tensorflowe.gemm --m 64 --k 64 --n 64 --accumulate device
+    python -m tensorflowe.gemm --m 64 --k 64 --n 64 --compare
+    python -m tensorflowe.gemm --m 64 --k 64 --n 64 --max 3 --wide --compare
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .batch import multiply_words
+from .codec import (BYTES_WORD, M_SIZE, MASK_ACC, MASK_DATA, MASK_VAR, MASK_WIDE, pack_matrices, pack_matrix,
+                    unpack_matrices, unpack_matrix)
+from .driver import (BURST_READ, BURST_READ_LATENCY, BURST_WRITE, MIN_TIMING, OPERAND_FIFO, RESULT_FIFO,
+                     RESULT_FIFO_DELAY, WIDE_RESULT, Timing, result_bytes)
+
+# Frecuencia de reloj de info.yaml
+CLOCK_HZ = 10_000_000
+
+MODES = ("device", "host")
+
+
+@dataclass
+class GemmStats:
+    """Trafico y ciclos de una GEMM.
+
+    ``predicted`` sale del plan y ``measured`` de las transacciones del
+    driver, con las mismas claves (``products``, ``reads``,
+    ``accumulates``, ``clears``, ``bytes_written``, ``bytes_read``);
+    ``predicted`` tiene ademas ``cycles`` si los tiempos son fijos.
+    """
+
+    m: int
+    k: int
+    n: int
+    schedule: str = ""
+    cycles: int = 0
+    clock_hz: float = CLOCK_HZ
+    predicted: Dict[str, int] = field(default_factory=dict)
+    measured: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def products(self) -> int:
+        """Productos 2x2 en el chip"""
+        return self.measured.get("products", 0)
+
+    @property
+    def reads(self) -> int:
+        return self.measured.get("reads", 0)
+
+    @property
+    def bytes_written(self) -> int:
+        return self.measured.get("bytes_written", 0)
+
+    @property
+    def bytes_read(self) -> int:
+        return self.measured.get("bytes_read", 0)
+
+    @property
+    def macs(self) -> int:
+        """MACs utiles, sin contar el relleno con ceros"""
+        return self.m * self.k * self.n
+
+    @property
+    def bytes_total(self) -> int:
+        return self.bytes_written + self.bytes_read
+
+    @property
+    def seconds(self) -> float:
+        return self.cycles / self.clock_hz
+
+    @property
+    def macs_per_second(self) -> float:
+        return self.macs / self.seconds if self.cycles else 0.0
+
+    def mismatches(self) -> Dict[str, Tuple[int, int]]:
+        """Claves en que lo medido difiere de lo previsto: ``(previsto, medido)``"""
+        medido = dict(self.measured, cycles=self.cycles)
+        return {k: (v, medido[k]) for k, v in self.predicted.items() if medido.get(k) != v}
+
+    def as_dict(self):
+        return {
+            "m": self.m, "k": self.k, "n": self.n, "schedule": self.schedule,
+            "cycles": self.cycles, "macs": self.macs, "macs_per_second": self.macs_per_second,
+            "predicted": self.predicted, "measured": self.measured,
+        }
+
+
+def tiles(x: np.ndarray) -> np.ndarray:
+    """Matriz ``(R, C)`` -> bloques ``(ceil(R/M), ceil(C/M), M, M)`` con relleno de ceros"""
+    x = np.asarray(x, dtype=np.uint8) & MASK_VAR
+    filas, cols = x.shape
+    relleno = np.zeros((-(-filas // M_SIZE) * M_SIZE, -(-cols // M_SIZE) * M_SIZE), dtype=np.uint8)
+    relleno[:filas, :cols] = x
+    rb, cb = relleno.shape[0] // M_SIZE, relleno.shape[1] // M_SIZE
+    return relleno.reshape(rb, M_SIZE, cb, M_SIZE).swapaxes(1, 2)
+
+
+def untile(bloques: np.ndarray, filas: int, cols: int) -> np.ndarray:
+    """Inversa de ``tiles``, recortando el relleno"""
+    rb, cb = bloques.shape[:2]
+    return bloques.swapaxes(1, 2).reshape(rb * M_SIZE, cb * M_SIZE)[:filas, :cols]
+
+
+def _check(a: np.ndarray, b: np.ndarray, accumulate: str):
+    if a.ndim != 2 or b.ndim != 2 or a.shape[1] != b.shape[0]:
+        raise ValueError(f"dimensiones incompatibles: {a.shape} x {b.shape}")
+    if accumulate not in MODES:
+        raise ValueError(f"accumulate debe ser uno de {MODES}, no {accumulate!r}")
+
+
+def reference_gemm(a, b, accumulate: str = "host", wide: bool = False) -> np.ndarray:
+    """Resultado que debe leer ``run_gemm`` con el mismo modo (``wide``: con ``WIDE_RESULT``)"""
+    a, b = np.asarray(a), np.asarray(b)
+    _check(a, b, accumulate)
+    ta, tb = pack_matrices(tiles(a)), pack_matrices(tiles(b))
+    # parciales[i, k, j] = producto del bloque (i, k) de A por el (k, j) de B
+    parciales = multiply_words(ta[:, :, None], tb[None, :, :], wide)
+    if accumulate == "device":
+        suma = parciales.sum(axis=1) & (MASK_WIDE if wide else MASK_DATA)
+        c = unpack_matrices(suma, wide).astype(np.int64)
+    else:
+        c = unpack_matrices(parciales, wide).astype(np.int64).sum(axis=1) & (MASK_ACC if wide else MASK_VAR)
+    return untile(c, a.shape[0], b.shape[1])
+
+
+# ----------------------------------------------------------------------
+# Planificacion
+# ----------------------------------------------------------------------
+# Orden de las operaciones con un solo acumulador:
+#  - output_stationary: K adentro; por bloque de salida, primer producto,
+#    enable_accu, resto de los productos, una lectura y clear.
+#  - persistent: K adentro, pero enable_accu queda activo toda la GEMM; cada
+#    lectura da la suma total y el host resta la lectura anterior (mod 2**DATA_WIDTH,
+#    igual que el acumulador). Sin clear entre bloques, solo uno al final.
+#  - k_outer: K afuera; se lee cada producto parcial y suma el host.
+#  - weight_stationary: como k_outer, pero cada bloque de A se carga una vez
+#    con weight_hold y solo se escriben los bloques de B de su fila de K.
+#  - k_chunked: como output_stationary, pero cada cadena se corta donde la
+#    cota de la suma (``M_SIZE * max(A) * max(B)`` por bloque) podria pasar
+#    de un elemento: ningun elemento acarrea al siguiente, cada tramo se lee
+#    una vez y suma el host. Con valores chicos lee menos que k_outer; con
+#    int4 al azar cada tramo es un solo producto.
+SCHEDULES = {"output_stationary": "device", "persistent": "device", "k_outer": "host",
+             "weight_stationary": "host", "k_chunked": "host"}
+
+
+@dataclass
+class Plan:
+    """Operaciones de una GEMM en el orden en que se mandan al chip.
+
+    ``ops`` tiene tuplas ``("multiply", i, k, j)``, ``("accumulate",)``,
+    ``("clear",)`` y ``("read", i, j)``; ``weight_stationary`` usa ademas
+    ``("load_weights", i, k)``, ``("multiply_held", i, k, j)`` y
+    ``("release",)``.
+    """
+
+    schedule: str
+    shape: Tuple[int, int, int]
+    ops: list
+    # k_chunked: tramos cortados para WIDE_RESULT
+    wide: bool = False
+
+    @property
+    def accumulate(self) -> str:
+        return SCHEDULES[self.schedule]
+
+    @property
+    def uses_accumulator(self) -> bool:
+        return any(op[0] == "accumulate" for op in self.ops)
+
+    def counts(self, timing: Optional[Timing] = None, config: int = 0) -> Dict[str, int]:
+        """Transferencias previstas; con ``timing`` tambien los ciclos (``config`` del driver)"""
+        n = Counter(op[0] for op in self.ops)
+        conteo = {
+            "products": n["multiply"] + n["multiply_held"], "reads": n["read"],
+            "accumulates": n["accumulate"], "clears": n["clear"], "weight_loads": n["load_weights"],
+            "bytes_written": BYTES_WORD * (2 * n["multiply"] + n["multiply_held"] + n["load_weights"]),
+            "bytes_read": result_bytes(config) * n["read"],
+        }
+        if timing is not None:
+            costo = op_cycles(timing, config)
+            conteo["cycles"] = sum(costo[k] * v for k, v in n.items())
+        return conteo
+
+
+def op_cycles(timing: Timing, config: int = 0) -> Dict[str, int]:
+    """Ciclos por operacion con tiempos fijos (en modo handshake dependen del RTL)"""
+    t = timing
+    if config & BURST_WRITE:
+        # un byte por ciclo; A y B van en la misma rafaga
+        palabra = BYTES_WORD + t.write_low
+        par = 2 * BYTES_WORD + t.write_low
+    else:
+        palabra = BYTES_WORD * (t.write_setup + t.write_high + t.write_low)
+        par = 2 * palabra
+    if config & BURST_READ:
+        # un pulso de Ena_read y despues un byte por ciclo
+        lectura = t.read_setup + BURST_READ_LATENCY + result_bytes(config) - 1
+    else:
+        lectura = result_bytes(config) * (t.read_setup + t.read_high + t.read_low)
+    # con la cola el producto se puede leer RESULT_FIFO_DELAY ciclos mas tarde
+    compute = t.compute + (RESULT_FIFO_DELAY if config & RESULT_FIFO else 0)
+    return {
+        "multiply": par + compute,
+        "read": t.read_wait + lectura,
+        "accumulate": t.pulse_high + t.pulse_low,
+        "clear": t.pulse_high + t.pulse_low,
+        "load_weights": palabra,
+        "multiply_held": palabra + compute,
+        "release": t.pulse_high + t.pulse_low,
+    }
+
+
+def plan_gemm(a, b, schedule: str = "persistent", skip_zero: bool = True, wide: bool = False) -> Plan:
+    """Ordena productos, lecturas y pulsos segun ``schedule``.
+
+    Con ``skip_zero`` no se mandan productos con un bloque de A o de B en
+    cero (como el relleno de dimensiones impares): suman cero en los dos
+    modos. Un bloque de salida sin productos no se lee. ``wide`` es para
+    leer con ``WIDE_RESULT``: ``k_chunked`` arma tramos mas largos.
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    if schedule not in SCHEDULES:
+        raise ValueError(f"schedule debe ser uno de {tuple(SCHEDULES)}, no {schedule!r}")
+    _check(a, b, SCHEDULES[schedule])
+    ta, tb = tiles(a), tiles(b)
+    mb, kb, nb = ta.shape[0], ta.shape[1], tb.shape[1]
+    if skip_zero:
+        usa = ta.any(axis=(2, 3))[:, :, None] & tb.any(axis=(2, 3))[None, :, :]
+    else:
+        usa = np.ones((mb, kb, nb), dtype=bool)
+    ops = []
+    if schedule == "k_outer":
+        for k in range(kb):
+            for i in range(mb):
+                for j in range(nb):
+                    if usa[i, k, j]:
+                        ops += [("multiply", i, k, j), ("read", i, j)]
+        return Plan(schedule, (a.shape[0], a.shape[1], b.shape[1]), ops)
+    if schedule == "weight_stationary":
+        for k in range(kb):
+            for i in range(mb):
+                if not usa[i, k].any():
+                    continue
+                ops.append(("load_weights", i, k))
+                for j in range(nb):
+                    if usa[i, k, j]:
+                        ops += [("multiply_held", i, k, j), ("read", i, j)]
+                ops.append(("release",))
+        return Plan(schedule, (a.shape[0], a.shape[1], b.shape[1]), ops)
+    if schedule == "k_chunked":
+        limite = MASK_ACC if wide else MASK_VAR
+        cota = M_SIZE * ta.max(axis=(2, 3)).astype(np.int64)[:, :, None] * tb.max(axis=(2, 3))[None, :, :]
+        for i in range(mb):
+            for j in range(nb):
+                tramo, suma = 0, 0
+                for k in (k for k in range(kb) if usa[i, k, j]):
+                    if tramo and suma + cota[i, k, j] > limite:
+                        ops.append(("read", i, j))
+                        if tramo > 1:
+                            ops.append(("clear",))
+                        tramo, suma = 0, 0
+                    if tramo == 1:
+                        # el primer producto ya esta en el acumulador
+                        ops.append(("accumulate",))
+                    ops.append(("multiply", i, k, j))
+                    tramo, suma = tramo + 1, suma + cota[i, k, j]
+                if tramo:
+                    ops.append(("read", i, j))
+                    if tramo > 1:
+                        ops.append(("clear",))
+        return Plan(schedule, (a.shape[0], a.shape[1], b.shape[1]), ops, wide)
+
+    acumulando = False
+    for i in range(mb):
+        for j in range(nb):
+            cadena = [k for k in range(kb) if usa[i, k, j]]
+            for n, k in enumerate(cadena):
+                ops.append(("multiply", i, k, j))
+                if not acumulando and (schedule == "persistent" or n + 1 < len(cadena)):
+                    # el primer producto ya esta en el acumulador
+                    ops.append(("accumulate",))
+                    acumulando = True
+            if cadena:
+                ops.append(("read", i, j))
+            if schedule == "output_stationary" and acumulando:
+                ops.append(("clear",))
+                acumulando = False
+    if acumulando:
+        ops.append(("clear",))
+    return Plan(schedule, (a.shape[0], a.shape[1], b.shape[1]), ops)
+
+
+def best_schedule(a, b, accumulate: str = "host", timing: Timing = MIN_TIMING,
+                  skip_zero: bool = True, config: int = 0) -> Plan:
+    """Plan con menos ciclos previstos entre los que dan los numeros de ``accumulate``"""
+    wide = bool(config & WIDE_RESULT)
+    planes = [plan_gemm(a, b, s, skip_zero, wide) for s, modo in SCHEDULES.items() if modo == accumulate]
+    if not planes:
+        raise ValueError(f"accumulate debe ser uno de {MODES}, no {accumulate!r}")
+    return min(planes, key=lambda p: p.counts(timing, config)["cycles"])
+
+
+# ----------------------------------------------------------------------
+# Ejecucion
+# ----------------------------------------------------------------------
+async def _completar(accion):
+    # los metodos de CycleDriver devuelven el valor; los de cocotb, corrutinas
+    if hasattr(accion, "__await__"):
+        return await accion
+    return accion
+
+
+def measured_counts(transacciones, config: int = 0) -> Dict[str, int]:
+    """Transferencias medidas en las transacciones de un driver (``config`` del driver)"""
+    n = Counter(tr.kind for tr in transacciones)
+    return {
+        "products": n["multiply"], "reads": n["read_result"],
+        "accumulates": n["accumulate"], "clears": n["clear"], "weight_loads": n["load_weights"],
+        "bytes_written": BYTES_WORD * n["write_matrix"], "bytes_read": result_bytes(config) * n["read_result"],
+    }
+
+
+async def run_gemm(drv, a, b, accumulate: Optional[str] = None, clock_hz: Optional[float] = None,
+                   plan: Optional[Plan] = None) -> Tuple[np.ndarray, GemmStats]:
+    """``A @ B`` en el chip a traves de ``drv``; devuelve el resultado y las estadisticas.
+
+    Sin ``accumulate`` se suma donde suma ``plan``, o en el host si
+    tampoco hay plan. Sin ``plan`` se usa ``best_schedule`` para ``accumulate`` con los
+    tiempos del driver. Supone que el chip no esta acumulando al empezar,
+    y lo deja igual.
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    if accumulate is None:
+        accumulate = plan.accumulate if plan is not None else "host"
+    _check(a, b, accumulate)
+    config = getattr(drv, "config", 0)
+    if plan is None:
+        plan = best_schedule(a, b, accumulate, drv.timing, config=config)
+    elif plan.accumulate != accumulate:
+        raise ValueError(f"el plan {plan.schedule} suma en {plan.accumulate}, no en {accumulate}")
+    if config & RESULT_FIFO and plan.uses_accumulator:
+        # cada suma parcial entraria en la cola
+        raise ValueError("con RESULT_FIFO la GEMM tiene que sumar en el host")
+    if plan.wide and not config & WIDE_RESULT:
+        # los tramos de k_chunked acarrearian en VAR_WIDTH bits
+        raise ValueError(f"el plan {plan.schedule} es para WIDE_RESULT")
+    if clock_hz is None:
+        period_ns = getattr(drv, "period_ns", None)
+        clock_hz = 1e9 / period_ns if period_ns else CLOCK_HZ
+    stats = GemmStats(a.shape[0], a.shape[1], b.shape[1], clock_hz=clock_hz, schedule=plan.schedule)
+    ta, tb = tiles(a).tolist(), tiles(b).tolist()
+    wide = bool(config & WIDE_RESULT)
+    c = np.zeros((len(ta), len(tb[0]), M_SIZE, M_SIZE), dtype=np.int64)
+    inicio, primera = drv.cycle, len(drv.transactions)
+    total_antes = 0
+
+    for op in plan.ops:
+        if op[0] == "multiply":
+            _, i, k, j = op
+            await _completar(drv.multiply(ta[i][k], tb[k][j]))
+        elif op[0] == "load_weights":
+            _, i, k = op
+            await _completar(drv.load_weights(ta[i][k]))
+        elif op[0] == "multiply_held":
+            _, i, k, j = op
+            await _completar(drv.multiply_held(tb[k][j]))
+        elif op[0] == "release":
+            await _completar(drv.release_weights())
+        elif op[0] == "accumulate":
+            await _completar(drv.accumulate())
+        elif op[0] == "clear":
+            await _completar(drv.clear())
+        else:
+            _, i, j = op
+            leido = await _completar(drv.read_result())
+            if plan.schedule == "persistent":
+                total = pack_matrix(leido, wide)
+                c[i, j] = unpack_matrix((total - total_antes) & (MASK_WIDE if wide else MASK_DATA), wide)
+                total_antes = total
+            else:
+                c[i, j] += leido
+
+    stats.cycles = drv.cycle - inicio
+    stats.measured = measured_counts(drv.transactions[primera:], config)
+    # con la cola de operandos los ciclos dependen de fifo_full, como en handshake
+    fijos = not drv.handshake and not config & OPERAND_FIFO
+    stats.predicted = plan.counts(drv.timing if fijos else None, config)
+    if accumulate == "host":
+        c &= MASK_ACC if wide else MASK_VAR
+    return untile(c, a.shape[0], b.shape[1]), stats
+
+
+def gemm(a, b, accumulate: Optional[str] = None, timing=MIN_TIMING, handshake: bool = False,
+         check: bool = True, plan: Optional[Plan] = None, config: int = 0) -> Tuple[np.ndarray, GemmStats]:
+    """``run_gemm`` sobre ``CycleDriver``, sin simulador"""
+    from .cycle import CycleDriver
+    from .model import TensorFlowEModel
+
+    drv = CycleDriver(timing=timing, model=TensorFlowEModel() if check else None,
+                      handshake=handshake)
+    drv.start()
+    if config:
+        drv.configure(config)
+    return asyncio.run(run_gemm(drv, a, b, accumulate, plan=plan))
+
+
+def _imprimir(a, b, c, stats: GemmStats, accumulate: str, modulo: int):
+    exactos = (c == (a @ b) % modulo).mean()
+    print(f"{stats.m}x{stats.k} @ {stats.k}x{stats.n} ({accumulate}, {stats.schedule}): "
+          f"{stats.products} productos, {stats.reads} lecturas, "
+          f"{stats.measured['accumulates']} enable_accu, {stats.measured['clears']} clear")
+    print(f"  bytes: {stats.bytes_written} escritos, {stats.bytes_read} leidos")
+    print(f"  ciclos: {stats.cycles} ({stats.seconds * 1e3:.3f} ms a {stats.clock_hz / 1e6:g} MHz), "
+          f"previstos {stats.predicted.get('cycles', '-')}")
+    print(f"  {stats.macs_per_second / 1e6:.3f} MMAC/s efectivos; "
+          f"{100 * exactos:.1f}% de elementos iguales a (A @ B) % {modulo}")
+    if accumulate == "device":
+        print("  aviso: la suma en el chip acarrea de un elemento al siguiente; "
+              "para el producto de matrices use --accumulate host")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GEMM int4 por bloques sobre el modelo ciclo a ciclo")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--k", type=int, default=16)
+    parser.add_argument("--n", type=int, default=16)
+    parser.add_argument("--accumulate", choices=MODES, default="host",
+                        help="donde se suma K; device da la suma empaquetada, no (A @ B) %% 2**VAR_WIDTH")
+    parser.add_argument("--schedule", choices=tuple(SCHEDULES),
+                        help="orden de las operaciones (por defecto el de menos ciclos previstos)")
+    parser.add_argument("--compare", action="store_true",
+                        help="corre todos los ordenes y compara lo previsto con lo medido")
+    parser.add_argument("--no-skip-zero", dest="skip_zero", action="store_false")
+    parser.add_argument("--handshake", action="store_true")
+    parser.add_argument("--burst", action="store_true", help="escritura en rafaga (BURST_WRITE)")
+    parser.add_argument("--burst-read", action="store_true", help="lectura en rafaga (BURST_READ)")
+    parser.add_argument("--wide", action="store_true", help="resultado de 2*VAR_WIDTH bits (WIDE_RESULT)")
+    parser.add_argument("--max", type=int, default=MASK_VAR, help="valor maximo de los elementos al azar")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    a = rng.integers(0, args.max + 1, (args.m, args.k))
+    b = rng.integers(0, args.max + 1, (args.k, args.n))
+    config = ((BURST_WRITE if args.burst else 0) | (BURST_READ if args.burst_read else 0)
+              | (WIDE_RESULT if args.wide else 0))
+    modulo = (MASK_ACC if args.wide else MASK_VAR) + 1
+    if args.compare:
+        for schedule, accumulate in SCHEDULES.items():
+            plan = plan_gemm(a, b, schedule, args.skip_zero, args.wide)
+            c, stats = gemm(a, b, accumulate, handshake=args.handshake, plan=plan, config=config)
+            assert (c == reference_gemm(a, b, accumulate, args.wide)).all()
+            _imprimir(a, b, c, stats, accumulate, modulo)
+            for k, (previsto, medido) in stats.mismatches().items():
+                print(f"  {k}: previsto {previsto}, medido {medido}")
+        return
+
+    if args.schedule is not None:
+        accumulate = SCHEDULES[args.schedule]
+        plan = plan_gemm(a, b, args.schedule, args.skip_zero, args.wide)
+    else:
+        accumulate = args.accumulate
+        plan = best_schedule(a, b, accumulate, skip_zero=args.skip_zero, config=config)
+    c, stats = gemm(a, b, accumulate, handshake=args.handshake, plan=plan, config=config)
+    assert (c == reference_gemm(a, b, accumulate, args.wide)).all()
+    _imprimir(a, b, c, stats, accumulate, modulo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Modelo de referencia bit-exacto del datapath de TensorFlowE.
+
+Reproduce a nivel de transaccion lo que calcula el RTL:
+
+- El empaquetado de matrices en palabras y bytes esta en ``codec``.
+- ``matrix_multiply_unit`` suma en un ``accumulator`` de ``2*VAR_WIDTH``
+  bits (8 en 2x2 de 4 bits) y guarda solo ``accumulator[VAR_WIDTH-1:0]``.
+- ``matrix_accumulate_unit`` suma las palabras de ``DATA_WIDTH`` bits
+  completas, con acarreo entre elementos. Con ``enable`` en bajo copia ``result`` al
+  acumulador en cada ciclo, por lo que el primer producto acumulado se
+  suma al ultimo resultado y un ``clear`` deja el ultimo producto.
+- Con el resultado ancho (``WIDE_RESULT``) el acumulador recibe los
+  ``2*VAR_WIDTH`` bits de cada elemento y cada lectura los devuelve. No es
+  precision completa: el producto escalar de 2x2 de 4 bits llega a 450 y
+  cada elemento es exacto solo modulo 256. Al acumular, la suma de
+  ``WIDE_WIDTH`` bits acarrea de un elemento al siguiente cuando uno pasa
+  de 255, igual que sin resultado ancho. El
+  acumulador del RTL siempre tiene ``WIDE_WIDTH`` bits; sin resultado
+  ancho recibe ``result`` con ceros arriba y se leen sus ``DATA_WIDTH``
+  bits bajos, que son la suma de siempre.
+- Con la cola de resultados cada producto entra en la cola, cada lectura
+  saca el mas viejo y ``clear`` la vacia. Con la cola de operandos los
+  productos salen en el mismo orden y ninguno se pierde: un par solo pasa
+  al multiplicador si hay lugar para su resultado.
+"""
+
+import os
+from collections import deque
+from typing import List, Optional
+
+# El formato se define en codec; se reexporta para quien importa de model
+from .codec import (ACC_WIDTH, BYTES_WIDE, BYTES_WORD, DATA_WIDTH, M_SIZE, MASK_ACC, MASK_DATA, MASK_VAR,
+                    MASK_WIDE, VAR_WIDTH, bytes_to_matrix, matrix_to_bytes, pack_matrix, unpack_matrix,
+                    word_to_bytes)
+
+
+# Valores por defecto de RESULT_FIFO_DEPTH y OPERAND_FIFO_DEPTH en TensorFlowE.sv
+RESULT_FIFO_DEPTH = 4
+OPERAND_FIFO_DEPTH = 2
+
+
+def fifo_depth_from_env() -> int:
+    """Profundidad de la cola de resultados con que se compilo el RTL (``make FIFO_DEPTH=n``)"""
+    return int(os.environ.get("FIFO_DEPTH", RESULT_FIFO_DEPTH))
+
+
+def operand_fifo_depth_from_env() -> int:
+    """Pares de la cola de operandos con que se compilo el RTL (``make OPERAND_FIFO_DEPTH=n``)"""
+    return int(os.environ.get("OPERAND_FIFO_DEPTH", OPERAND_FIFO_DEPTH))
+
+
+def multiply_word_wide(palabra_a: int, palabra_b: int) -> int:
+    """``result_ancho`` de matrix_multiply_unit: el accumulator de cada elemento.
+
+    Cada producto escalar se guarda modulo ``2**(2*VAR_WIDTH)``; el valor
+    exacto necesita ``2*VAR_WIDTH + ceil(log2(M_SIZE))`` bits.
+    """
+    a = unpack_matrix(palabra_a)
+    b = unpack_matrix(palabra_b)
+    resultado = 0
+    for i in range(M_SIZE):
+        for j in range(M_SIZE):
+            accumulator = 0
+            for k in range(M_SIZE):
+                accumulator = (accumulator + a[i][k] * b[k][j]) & MASK_ACC
+            resultado |= accumulator << (ACC_WIDTH * (i * M_SIZE + j))
+    return resultado
+
+
+def narrow_word(palabra_ancha: int) -> int:
+    """``result``: los ``VAR_WIDTH`` bits bajos de cada elemento de ``result_ancho``"""
+    resultado = 0
+    for e in range(M_SIZE * M_SIZE):
+        resultado |= ((palabra_ancha >> (ACC_WIDTH * e)) & MASK_VAR) << (VAR_WIDTH * e)
+    return resultado
+
+
+def multiply_word(palabra_a: int, palabra_b: int) -> int:
+    """Producto de matrix_multiply_unit sobre palabras empaquetadas"""
+    return narrow_word(multiply_word_wide(palabra_a, palabra_b))
+
+
+def accumulate_word(accumulator: int, result: int, wide: bool = False) -> int:
+    """Suma empaquetada de matrix_accumulate_unit (acarreo entre elementos).
+
+    Con ``wide`` tambien: un elemento que pasa de ``MASK_ACC`` acarrea al
+    siguiente, asi que la suma por elemento es exacta solo mientras
+    ninguno pase.
+    """
+    return (accumulator + result) & (MASK_WIDE if wide else MASK_DATA)
+
+
+class TensorFlowEModel:
+    """Estado de TensorFlowE entre transacciones.
+
+    Supone que cada operacion termina antes de empezar la siguiente, es
+    decir, que ``enable_accu`` o ``clear`` no coinciden con ``listo``.
+    """
+
+    def __init__(self, fifo_depth: Optional[int] = None):
+        self.fifo_depth = fifo_depth_from_env() if fifo_depth is None else fifo_depth
+        self.reset()
+
+    def reset(self):
+        self.result = 0  # registro result_ancho de matrix_multiply_unit
+        self.accumulator = 0  # matrix_accumulate_unit, WIDE_WIDTH bits
+        self.out = 0
+        self.accumulating = False  # flat_Ena_accu_Ena
+        self.dato_disponible = False
+        self.output_byte = 0  # ultimo byte presentado en uo_out
+        self.result_fifo = False  # bit de configuracion RESULT_FIFO
+        self.operand_fifo = False  # bit de configuracion OPERAND_FIFO
+        self.wide_result = False  # bit de configuracion WIDE_RESULT
+        self.fifo: deque = deque()
+
+    def _entrada(self) -> int:
+        """Lo que entra a matrix_accumulate_unit: result_ancho o result con ceros arriba"""
+        return self.result if self.wide_result else narrow_word(self.result)
+
+    def multiply(self, matriz_a, matriz_b) -> int:
+        self.result = multiply_word_wide(pack_matrix(matriz_a), pack_matrix(matriz_b))
+        if self.accumulating:
+            self.accumulator = accumulate_word(self.accumulator, self._entrada(), wide=True)
+        else:
+            self.accumulator = self._entrada()
+        self.out = self.accumulator
+        self.dato_disponible = True
+        if self.result_fifo and (self.operand_fifo or len(self.fifo) < self.fifo_depth):
+            # con la cola llena el producto se pierde, salvo que espere en
+            # la cola de operandos
+            self.fifo.append(self.out)
+        return self.out
+
+    def use_result_fifo(self, activa: bool):
+        self.result_fifo = activa
+
+    def use_operand_fifo(self, activa: bool):
+        self.operand_fifo = activa
+
+    def use_wide_result(self, activo: bool):
+        self.wide_result = activo
+        if not self.accumulating:
+            # con enable en bajo el acumulador vuelve a copiar result, ahora con el otro ancho
+            self.accumulator = self.out = self._entrada()
+
+    def accumulate(self):
+        self.accumulating = True
+
+    def clear(self):
+        # clear pone el acumulador en cero, pero al ciclo siguiente enable
+        # esta en bajo y vuelve a copiar el ultimo producto
+        self.accumulating = False
+        self.accumulator = self._entrada()
+        self.out = self.accumulator
+        self.fifo.clear()
+
+    def read_bytes(self) -> List[int]:
+        """Bytes que entrega uart_tx_4in4 con un pulso de Ena_read por byte"""
+        n = BYTES_WIDE if self.wide_result else BYTES_WORD
+        if self.result_fifo:
+            # cualquier lectura baja dato_disponible
+            self.dato_disponible = False
+            if not self.fifo:
+                return [self.output_byte] * n
+            palabra = self.fifo.popleft()
+        elif not self.dato_disponible:
+            # sin listo nuevo la uart no arranca y uo_out no cambia
+            return [self.output_byte] * n
+        else:
+            self.dato_disponible = False
+            palabra = self.out
+        if not self.wide_result:
+            palabra &= MASK_DATA
+        datos = word_to_bytes(palabra, self.wide_result)
+        self.output_byte = datos[-1]
+        return datos
+
+    def read_result(self) -> List[List[int]]:
+        return bytes_to_matrix(self.read_bytes(), self.wide_result)
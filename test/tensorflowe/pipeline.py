@@ -0,0 +1,175 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Escritura y lectura solapadas sobre ``TensorFlowEDriver``.
+
+``PipelinedDriver`` tiene dos corrutinas unidas por colas:
+
+- el productor saca ``(seq, A, B)`` de la cola de pedidos y escribe los
+  bytes por ``ui_in``;
+- el consumidor espera a que el producto de ``seq`` este listo, lo lee
+  por ``uo_out`` y deja ``(seq, resultado)`` en la cola de resultados.
+
+Lo que permite el RTL:
+
+- ``Ena_write`` y ``Ena_read`` son pines distintos y ``uart_tx_4in4``
+  copia ``out`` al empezar la lectura, asi que el resultado ``n`` se lee
+  mientras entran los operandos del par ``n+1``;
+- en serie ``matrix_multiply_unit`` no copia sus entradas: lee
+  ``matrixA`` y ``matrixB`` (la salida de ``four_palabras``) durante todo
+  ``S_CALC``. El primer byte de A solo queda en ``mem``, por lo que se
+  puede escribir mientras se calcula el producto anterior; el segundo
+  completa la palabra y tiene que esperar a que ese producto este listo;
+- en paralelo (``MULT=parallel``) la unidad no pasa por ``S_CALC``: lee
+  ``matrixA`` y ``matrixB`` solo en el ciclo de ``enable`` y guarda
+  ``result`` en ese mismo flanco. El segmentado (``MULT=pipelined``)
+  captura los operandos con ``enable``. En los dos el par ``n+1`` se
+  escribe entero mientras se calcula el ``n``; solo el ultimo byte, que
+  dispara el producto, espera a que el ``n`` este listo para no pisar
+  ``result`` antes de leerlo.
+
+Los tiempos son los de ``drv.timing`` (el modo handshake no se usa) y el
+chip no debe estar acumulando. Con ``MIN_TIMING`` cada par pasa de 31 a
+23 ciclos; con ``PARALLEL_MIN_TIMING`` y ``PIPELINED_MIN_TIMING`` queda en
+los 8 de escribir los cuatro bytes.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cocotb
+from cocotb.queue import Queue
+
+from .codec import matrix_to_bytes
+from .cycle import MULT_SERIAL, mult_mode_from_env
+from .driver import BYTES_MATRIZ
+
+# Bytes de A y B por par
+BYTES_PAR = 2 * BYTES_MATRIZ
+
+
+@dataclass
+class PipelineRecord:
+    """Ciclos de un par: primer byte escrito, producto listo, resultado leido."""
+
+    seq: int
+    start: int
+    ready: int
+    end: int = 0
+
+    @property
+    def latency(self) -> int:
+        return self.end - self.start
+
+
+class PipelinedDriver:
+    """Productor y consumidor sobre un ``TensorFlowEDriver`` ya iniciado."""
+
+    def __init__(self, drv, depth: int = 4, mult_mode: Optional[int] = None):
+        if drv.handshake:
+            raise ValueError("PipelinedDriver usa los tiempos fijos de drv.timing, sin handshake")
+        self.drv = drv
+        if mult_mode is None:
+            mult_mode = mult_mode_from_env()
+        # bytes de cada par que se pueden escribir antes de que el producto
+        # anterior este listo: solo el serie lee los operandos despues de enable
+        self.overlap = 1 if mult_mode == MULT_SERIAL else BYTES_PAR - 1
+        self.requests: Queue = Queue(maxsize=depth)
+        self.results: Queue = Queue()
+        self.records: Dict[int, PipelineRecord] = {}
+        # productos escritos que el consumidor todavia no leyo
+        self._en_vuelo: Queue = Queue()
+        self._next_seq = 0
+        self._tareas = []
+
+    def start(self):
+        self._tareas = [cocotb.start_soon(self._productor()), cocotb.start_soon(self._consumidor())]
+        return self
+
+    def stop(self):
+        for tarea in self._tareas:
+            tarea.kill()
+        self._tareas = []
+
+    async def submit(self, matriz_a, matriz_b) -> int:
+        """Encola un par y devuelve su numero de secuencia"""
+        seq = self._next_seq
+        self._next_seq += 1
+        await self.requests.put((seq, matriz_a, matriz_b))
+        return seq
+
+    async def _hasta(self, ciclo: int):
+        await self.drv.idle(ciclo - self.drv.cycle)
+
+    async def _productor(self):
+        drv = self.drv
+        listo_anterior: Optional[int] = None
+        while True:
+            seq, matriz_a, matriz_b = await self.requests.get()
+            datos = matrix_to_bytes(matriz_a) + matrix_to_bytes(matriz_b)
+            inicio = drv.cycle
+            for byte in datos[:self.overlap]:
+                await drv.write_byte(byte)
+            if listo_anterior is not None:
+                await self._hasta(listo_anterior)
+            for byte in datos[self.overlap:]:
+                await drv.write_byte(byte)
+            listo_anterior = drv.cycle + drv.timing.compute
+            self.records[seq] = PipelineRecord(seq, inicio, listo_anterior)
+            await self._en_vuelo.put((seq, matriz_a, matriz_b))
+
+    async def _consumidor(self):
+        drv = self.drv
+        while True:
+            seq, matriz_a, matriz_b = await self._en_vuelo.get()
+            registro = self.records[seq]
+            await self._hasta(registro.ready)
+            if drv.model is not None:
+                drv.model.multiply(matriz_a, matriz_b)
+            resultado = await drv.read_result()
+            registro.end = drv.cycle
+            await self.results.put((seq, resultado))
+
+    async def run(self, pares: Sequence[Tuple]) -> List[List[List[int]]]:
+        """Manda todos los pares y devuelve los resultados en orden de secuencia"""
+        async def mandar():
+            for matriz_a, matriz_b in pares:
+                await self.submit(matriz_a, matriz_b)
+
+        enviar = cocotb.start_soon(mandar())
+        resultados = {}
+        while len(resultados) < len(pares):
+            seq, resultado = await self.results.get()
+            assert seq not in resultados, f"secuencia {seq} repetida"
+            resultados[seq] = resultado
+        await enviar
+        return [resultados[seq] for seq in sorted(resultados)]
+
+
+async def serial(drv, pares: Sequence[Tuple]) -> List[List[List[int]]]:
+    """Referencia sin solapar: escribir A y B, esperar, leer"""
+    resultados = []
+    for matriz_a, matriz_b in pares:
+        await drv.multiply(matriz_a, matriz_b)
+        resultados.append(await drv.read_result())
+    return resultados
+
+
+async def compare_throughput(drv, pares: Sequence[Tuple]) -> Dict[str, float]:
+    """Ciclos por par en serie y con ``PipelinedDriver`` sobre los mismos pares"""
+    inicio = drv.cycle
+    en_serie = await serial(drv, pares)
+    ciclos_serie = drv.cycle - inicio
+
+    pipe = PipelinedDriver(drv).start()
+    inicio = drv.cycle
+    solapado = await pipe.run(pares)
+    ciclos_pipe = drv.cycle - inicio
+    pipe.stop()
+    assert solapado == en_serie, "los resultados solapados difieren de los seriales"
+    return {
+        "pairs": len(pares),
+        "serial_cycles_per_pair": ciclos_serie / len(pares),
+        "pipelined_cycles_per_pair": ciclos_pipe / len(pares),
+        "speedup": ciclos_serie / ciclos_pipe,
+    }
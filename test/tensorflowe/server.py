@@ -0,0 +1,509 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Servidor local que hace de placa para desarrollar el software del host.
+
+Habla por un socket Unix o por una pty, con tramas de operaciones sobre
+los pines. Cada operacion empieza con el bit de ``uio_in`` que mueve:
+
+=========  ==========  ==============================================
+codigo     argumento   accion
+=========  ==========  ==============================================
+``0x01``   byte        byte en ``ui_in`` y pulso de ``Ena_write``
+``0x02``               pulso de ``Ena_read``; responde con ``uo_out``
+                       (con ``BURST_READ``, con los bytes de la rafaga)
+``0x04``               pulso de ``clear``
+``0x08``               pulso de ``enable_accu``
+``0x0c``   bits        ``clear`` y ``enable_accu`` juntos: configuracion
+``0x20``   0 o 1       nivel de ``weight_hold``
+``0x80``   n           ``n`` ciclos sin tocar los pines
+=========  ==========  ==============================================
+
+Trama de pedido: largo (2 bytes, big endian) y las operaciones. Trama de
+respuesta: cantidad de bytes leidos (2 bytes), ciclos que tomo la trama
+(4 bytes) y los bytes leidos. Un pedido de largo cero cierra la conexion.
+Los pulsos y las esperas usan los tiempos del driver del backend.
+
+Si la trama esta mal formada o el backend la rechaza, la respuesta lleva
+``ERROR_FRAME`` (0xFFFF) en la cantidad de bytes, el largo del mensaje en
+lugar de los ciclos y el mensaje en UTF-8, y el servidor sigue atendiendo.
+Una trama mal formada no se ejecuta; si la rechaza el backend, las
+operaciones anteriores al error ya se hicieron. ``RemoteDriver`` levanta
+``RemoteError`` con el mensaje.
+
+Backends:
+
+- ``ModelBackend``: ``CycleDriver`` (modelo ciclo a ciclo, sin simulador);
+- ``CocotbBackend``: ``TensorFlowEDriver`` en una simulacion en curso. El
+  servidor corre en un hilo lanzado con ``cocotb.external`` y cada trama
+  se ejecuta en el simulador con ``cocotb.function``.
+
+``RemoteDriver`` es el lado del host: tiene los metodos de
+``TensorFlowEDriver`` y junta las operaciones en una trama hasta que hace
+falta una respuesta (una lectura o el contador de ciclos). Uso::
+
+    python -m tensorflowe.server --socket /tmp/tt.sock
+    python -m tensorflowe.server --pty
+"""
+
+import argparse
+import os
+import socket
+import struct
+import time
+import tty
+from typing import List, Optional, Tuple
+
+from .codec import bytes_to_matrix, matrix_to_bytes
+from .driver import (BURST_READ, CLEAR, ENA_READ, ENA_WRITE, ENABLE_ACCU, MIN_TIMING, OPERAND_FIFO, WEIGHT_HOLD,
+                     WIDE_RESULT, Timing, Transaction, result_bytes)
+
+OP_WRITE = ENA_WRITE
+OP_READ = ENA_READ
+OP_CLEAR = CLEAR
+OP_ACCUMULATE = ENABLE_ACCU
+OP_CONFIGURE = CLEAR | ENABLE_ACCU
+OP_HOLD = WEIGHT_HOLD
+OP_IDLE = 0x80
+
+# Operaciones que llevan un byte de argumento
+_CON_ARGUMENTO = (OP_WRITE, OP_CONFIGURE, OP_HOLD, OP_IDLE)
+
+# Largo maximo de una trama de pedido
+MAX_FRAME = 0xFFFF
+
+_RESPUESTA = struct.Struct(">HI")
+
+# Cantidad de bytes reservada para las respuestas de error
+ERROR_FRAME = 0xFFFF
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class RemoteError(Exception):
+    """El servidor rechazo una trama"""
+
+
+def parse_ops(trama: bytes) -> List[Tuple[int, int]]:
+    """Trama -> lista de ``(codigo, argumento)``"""
+    ops = []
+    i = 0
+    while i < len(trama):
+        codigo = trama[i]
+        if codigo in _CON_ARGUMENTO:
+            if i + 1 >= len(trama):
+                raise ProtocolError(f"falta el argumento de 0x{codigo:02x} en el byte {i}")
+            ops.append((codigo, trama[i + 1]))
+            i += 2
+        elif codigo in (OP_READ, OP_CLEAR, OP_ACCUMULATE):
+            ops.append((codigo, 0))
+            i += 1
+        else:
+            raise ProtocolError(f"codigo 0x{codigo:02x} desconocido en el byte {i}")
+    return ops
+
+
+# ----------------------------------------------------------------------
+# Canales
+# ----------------------------------------------------------------------
+class _Canal:
+    """Lectura exacta y escritura sobre un socket o un descriptor."""
+
+    def __init__(self, leer, escribir, cerrar):
+        self._leer = leer
+        self._escribir = escribir
+        self._cerrar = cerrar
+
+    @classmethod
+    def socket(cls, conn: socket.socket) -> "_Canal":
+        return cls(conn.recv, conn.sendall, conn.close)
+
+    @classmethod
+    def fd(cls, fd: int) -> "_Canal":
+        def escribir(datos):
+            while datos:
+                datos = datos[os.write(fd, datos):]
+
+        return cls(lambda n: os.read(fd, n), escribir, lambda: os.close(fd))
+
+    def read_exact(self, n: int) -> Optional[bytes]:
+        """``n`` bytes, o None si el otro lado cerro"""
+        datos = b""
+        while len(datos) < n:
+            try:
+                parte = self._leer(n - len(datos))
+            except OSError:
+                # en una pty, cerrar el esclavo da EIO en el maestro
+                return None
+            if not parte:
+                return None
+            datos += parte
+        return datos
+
+    def write(self, datos: bytes):
+        self._escribir(datos)
+
+    def close(self):
+        self._cerrar()
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+class ModelBackend:
+    """Ejecuta las tramas sobre ``CycleDriver``."""
+
+    def __init__(self, timing: Timing = MIN_TIMING, drv=None):
+        if drv is None:
+            from .cycle import CycleDriver
+
+            drv = CycleDriver(timing=timing)
+            drv.start()
+        self.drv = drv
+
+    def execute(self, ops: List[Tuple[int, int]]) -> Tuple[bytes, int]:
+        drv = self.drv
+        inicio = drv.cycle
+        leidos = bytearray()
+        for codigo, arg in ops:
+            if codigo == OP_WRITE:
+                drv.write_byte(arg)
+            elif codigo == OP_READ:
+                if drv.config & BURST_READ:
+                    leidos.extend(drv.read_burst())
+                else:
+                    leidos.append(drv.read_byte())
+            elif codigo == OP_CLEAR:
+                drv.clear()
+            elif codigo == OP_ACCUMULATE:
+                drv.accumulate()
+            elif codigo == OP_HOLD:
+                drv.set_weight_hold(bool(arg))
+            elif codigo == OP_CONFIGURE:
+                drv.configure(arg)
+            else:
+                drv.idle(arg)
+        return bytes(leidos), drv.cycle - inicio
+
+
+class CocotbBackend:
+    """Ejecuta las tramas en la simulacion de ``TensorFlowEDriver``.
+
+    ``execute`` se llama desde el hilo del servidor, que tiene que haber
+    sido lanzado con ``cocotb.external``.
+    """
+
+    def __init__(self, drv):
+        self.drv = drv
+
+    async def _ejecutar(self, ops: List[Tuple[int, int]]) -> Tuple[bytes, int]:
+        drv = self.drv
+        inicio = drv.cycle
+        leidos = bytearray()
+        for codigo, arg in ops:
+            if codigo == OP_WRITE:
+                await drv.write_byte(arg)
+            elif codigo == OP_READ:
+                if drv.config & BURST_READ:
+                    leidos.extend(await drv.read_burst())
+                else:
+                    leidos.append(await drv.read_byte(len(leidos)))
+            elif codigo == OP_CLEAR:
+                await drv.clear()
+            elif codigo == OP_ACCUMULATE:
+                await drv.accumulate()
+            elif codigo == OP_HOLD:
+                drv.set_weight_hold(bool(arg))
+            elif codigo == OP_CONFIGURE:
+                await drv.configure(arg)
+            else:
+                await drv.idle(arg)
+        return bytes(leidos), drv.cycle - inicio
+
+    def execute(self, ops: List[Tuple[int, int]]) -> Tuple[bytes, int]:
+        import cocotb
+
+        return cocotb.function(self._ejecutar)(ops)
+
+
+# ----------------------------------------------------------------------
+# Servidor
+# ----------------------------------------------------------------------
+class Server:
+    """Atiende tramas de un canal por vez contra un backend."""
+
+    def __init__(self, backend, latency: float = 0.0):
+        self.backend = backend
+        # demora agregada a cada respuesta, en segundos, para simular el enlace
+        self.latency = latency
+        self.frames = 0
+        self.ops = 0
+        self.errors = 0
+
+    def _atender(self, trama: bytes) -> bytes:
+        """Respuesta a una trama; los errores de la trama van en la respuesta"""
+        try:
+            ops = parse_ops(trama)
+            leidos, ciclos = self.backend.execute(ops)
+            if len(leidos) >= ERROR_FRAME:
+                raise ProtocolError(f"{len(leidos)} bytes leidos no entran en una respuesta")
+        except (ProtocolError, ValueError, RuntimeError, TimeoutError) as e:
+            self.errors += 1
+            mensaje = f"{type(e).__name__}: {e}".encode()
+            return _RESPUESTA.pack(ERROR_FRAME, len(mensaje)) + mensaje
+        self.frames += 1
+        self.ops += len(ops)
+        return _RESPUESTA.pack(len(leidos), ciclos) + leidos
+
+    def serve_channel(self, canal: _Canal):
+        """Atiende hasta que el otro lado cierra o manda una trama vacia"""
+        try:
+            while True:
+                cabecera = canal.read_exact(2)
+                if cabecera is None:
+                    return
+                largo = int.from_bytes(cabecera, "big")
+                if largo == 0:
+                    return
+                trama = canal.read_exact(largo)
+                if trama is None:
+                    return
+                respuesta = self._atender(trama)
+                if self.latency:
+                    time.sleep(self.latency)
+                canal.write(respuesta)
+        finally:
+            canal.close()
+
+    def serve_unix(self, path: str, conexiones: Optional[int] = None):
+        """Escucha en un socket Unix; ``conexiones`` limita cuantas se atienden"""
+        if os.path.exists(path):
+            os.unlink(path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as srv:
+            srv.bind(path)
+            srv.listen(1)
+            atendidas = 0
+            try:
+                while conexiones is None or atendidas < conexiones:
+                    conn, _ = srv.accept()
+                    self.serve_channel(_Canal.socket(conn))
+                    atendidas += 1
+            finally:
+                os.unlink(path)
+
+    def open_pty(self) -> Tuple[_Canal, str]:
+        """Pty en modo crudo; devuelve el canal del maestro y el nombre del esclavo"""
+        maestro, esclavo = os.openpty()
+        tty.setraw(esclavo)
+        nombre = os.ttyname(esclavo)
+        return _Canal.fd(maestro), nombre
+
+
+# ----------------------------------------------------------------------
+# Cliente
+# ----------------------------------------------------------------------
+class RemoteDriver:
+    """Driver del host sobre el servidor, con los metodos de ``TensorFlowEDriver``.
+
+    Las escrituras, pulsos y esperas se acumulan en una trama que se manda
+    con la siguiente lectura, al consultar ``cycle`` o con ``flush()``.
+    ``timing`` tiene que coincidir con el del backend: de ahi salen las
+    esperas de calculo y de lectura que agrega el host.
+    """
+
+    def __init__(self, path: Optional[str] = None, fd: Optional[int] = None,
+                 timing: Timing = MIN_TIMING, max_frame: int = 4096, connect_timeout: float = 10.0):
+        if path is not None and fd is None and not _es_tty(path):
+            self._sock = _conectar(path, connect_timeout)
+            self._canal = _Canal.socket(self._sock)
+        else:
+            if fd is None:
+                fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+                tty.setraw(fd)
+            self._canal = _Canal.fd(fd)
+        self.timing = timing
+        self.handshake = False
+        self.model = None
+        self.max_frame = max_frame
+        self.transactions: List[Transaction] = []
+        self.weights = None
+        self.config = 0
+        self.frames = 0
+        self.round_trip_s = 0.0
+        self._trama = bytearray()
+        self._pendientes: List[Transaction] = []
+        self._ciclos = 0
+        self._next_id = 0
+
+    # ------------------------------------------------------------------
+    # Tramas
+    # ------------------------------------------------------------------
+    def _op(self, codigo: int, arg: Optional[int] = None):
+        self._trama.append(codigo)
+        if arg is not None:
+            self._trama.append(arg)
+        if len(self._trama) >= self.max_frame:
+            self.flush()
+
+    def _idle(self, ciclos: int):
+        while ciclos > 0:
+            self._op(OP_IDLE, min(ciclos, 0xFF))
+            ciclos -= 0xFF
+
+    def flush(self) -> bytes:
+        """Manda la trama pendiente; devuelve los bytes leidos"""
+        if not self._trama:
+            return b""
+        trama, self._trama = bytes(self._trama), bytearray()
+        inicio = time.perf_counter()
+        self._canal.write(len(trama).to_bytes(2, "big") + trama)
+        cabecera = self._canal.read_exact(_RESPUESTA.size)
+        if cabecera is None:
+            raise ConnectionError("el servidor cerro la conexion")
+        n, ciclos = _RESPUESTA.unpack(cabecera)
+        if n == ERROR_FRAME:
+            # las transacciones de la trama rechazada no cuentan
+            mensaje = self._canal.read_exact(ciclos) if ciclos else b""
+            self._pendientes = []
+            raise RemoteError((mensaje or b"").decode(errors="replace"))
+        leidos = self._canal.read_exact(n) if n else b""
+        self.round_trip_s += time.perf_counter() - inicio
+        self.frames += 1
+        # las transacciones de la trama terminan cuando termina la trama
+        self._ciclos += ciclos
+        for tr in self._pendientes:
+            tr.end = self._ciclos
+            self.transactions.append(tr)
+        self._pendientes = []
+        return leidos
+
+    def close(self):
+        self.flush()
+        self._canal.write(b"\x00\x00")
+        self._canal.close()
+
+    @property
+    def cycle(self) -> int:
+        self.flush()
+        return self._ciclos
+
+    def _begin(self, kind: str, data=None) -> Transaction:
+        tr = Transaction(kind, self._ciclos, id=self._next_id, data=data)
+        self._next_id += 1
+        self._pendientes.append(tr)
+        return tr
+
+    # ------------------------------------------------------------------
+    # Transacciones
+    # ------------------------------------------------------------------
+    def write_matrix(self, matriz, nombre: str = "matriz") -> Transaction:
+        tr = self._begin("write_matrix", matriz)
+        for byte in matrix_to_bytes(matriz):
+            self._op(OP_WRITE, byte)
+        return tr
+
+    def multiply(self, matriz_a, matriz_b) -> Transaction:
+        tr = self._begin("multiply", (matriz_a, matriz_b))
+        self.write_matrix(matriz_a)
+        self.write_matrix(matriz_b)
+        self._idle(self.timing.compute)
+        return tr
+
+    def load_weights(self, matriz_a) -> Transaction:
+        tr = self._begin("load_weights", matriz_a)
+        self._op(OP_HOLD, 1)
+        self.write_matrix(matriz_a)
+        self.weights = matriz_a
+        return tr
+
+    def multiply_held(self, matriz_b) -> Transaction:
+        if self.weights is None:
+            raise RuntimeError("multiply_held sin load_weights")
+        tr = self._begin("multiply", (self.weights, matriz_b))
+        self.write_matrix(matriz_b)
+        self._idle(self.timing.compute)
+        return tr
+
+    def release_weights(self) -> Transaction:
+        tr = self._begin("release_weights")
+        self._op(OP_HOLD, 0)
+        self._idle(self.timing.pulse_high + self.timing.pulse_low)
+        self.weights = None
+        return tr
+
+    def accumulate(self) -> Transaction:
+        tr = self._begin("accumulate")
+        self._op(OP_ACCUMULATE)
+        return tr
+
+    def configure(self, flags: int) -> Transaction:
+        if flags & OPERAND_FIFO:
+            # las tramas no pueden esperar a que baje fifo_full
+            raise ValueError("RemoteDriver no usa OPERAND_FIFO")
+        tr = self._begin("configure", flags)
+        self._op(OP_CONFIGURE, flags)
+        self.config = flags
+        return tr
+
+    def clear(self) -> Transaction:
+        tr = self._begin("clear")
+        self._op(OP_CLEAR)
+        return tr
+
+    def read_result(self) -> List[List[int]]:
+        tr = self._begin("read_result")
+        self._idle(self.timing.read_wait)
+        n = result_bytes(self.config)
+        for _ in range(1 if self.config & BURST_READ else n):
+            self._op(OP_READ)
+        leidos = self.flush()
+        resultado = bytes_to_matrix(leidos[-n:], bool(self.config & WIDE_RESULT))
+        tr.data = resultado
+        return resultado
+
+
+def _es_tty(path: str) -> bool:
+    return path.startswith("/dev/")
+
+
+def _conectar(path: str, timeout: float) -> socket.socket:
+    limite = time.monotonic() + timeout
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.01)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de TensorFlowE sobre el modelo ciclo a ciclo")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--socket", help="ruta del socket Unix")
+    grupo.add_argument("--pty", action="store_true", help="abre una pty e imprime su nombre")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="demora agregada a cada respuesta")
+    args = parser.parse_args(argv)
+
+    servidor = Server(ModelBackend(), latency=args.latency_ms / 1e3)
+    try:
+        if args.socket:
+            print(f"escuchando en {args.socket}", flush=True)
+            servidor.serve_unix(args.socket)
+        else:
+            canal, nombre = servidor.open_pty()
+            print(nombre, flush=True)
+            servidor.serve_channel(canal)
+    except KeyboardInterrupt:
+        pass
+    print(f"{servidor.frames} tramas, {servidor.ops} operaciones, {servidor.errors} rechazadas")
+
+
+if __name__ == "__main__":
+    main()
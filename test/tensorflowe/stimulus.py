@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Estimulo aleatorio con restricciones, guiado por cobertura.
+
+``ConstrainedRandom`` elige la siguiente operacion y sus operandos:
+
+- los elementos salen de las clases 0, 1, 2..14 y 15, con preferencia por
+  las que todavia no tienen cobertura;
+- si falta un producto sin truncar, con probabilidad ``guidance`` A es
+  una seleccion de filas de B (un 1 por fila), que con matrices grandes
+  casi nunca sale al azar;
+- la operacion siguiente se elige, con probabilidad ``guidance``, entre
+  las que completan un par ``(anterior, siguiente)`` sin cubrir, y si no
+  segun ``weights``.
+
+``run`` ejecuta operaciones sobre un driver (cocotb o ``CycleDriver``)
+hasta que la cobertura cierra o se llega a ``max_ops``.
+"""
+
+import random
+from typing import Dict, List, Optional
+
+from .batch import dot_products
+from .codec import M_SIZE, MASK_VAR, pack_matrix
+from .coverage import OPS, Coverage, value_class
+
+_CLASES = {
+    "zero": (0, 0),
+    "one": (1, 1),
+    "mid": (2, MASK_VAR - 1),
+    "max": (MASK_VAR, MASK_VAR),
+}
+
+# Mezcla por defecto de operaciones
+WEIGHTS = {"multiply": 6, "accumulate": 1, "clear": 1, "read": 2}
+
+
+class ConstrainedRandom:
+    """Genera operaciones y registra la cobertura de transacciones."""
+
+    def __init__(self, coverage: Coverage, rng: Optional[random.Random] = None,
+                 weights: Optional[Dict[str, int]] = None, guidance: float = 0.5):
+        self.coverage = coverage
+        self.rng = rng if rng is not None else random.Random()
+        self.weights = dict(WEIGHTS if weights is None else weights)
+        self.guidance = guidance
+        self.last: Optional[str] = None
+        self.ops = 0
+
+    def _elemento(self, operando: str) -> int:
+        faltan = [b[1] for g, b in self.coverage.missing() if g == "operand_value" and b[0] == operando]
+        if faltan and self.rng.random() < self.guidance:
+            clase = self.rng.choice(faltan)
+        else:
+            clase = self.rng.choices(list(_CLASES), [1, 1, 6, 1])[0]
+        lo, hi = _CLASES[clase]
+        return self.rng.randint(lo, hi)
+
+    def matrix(self, operando: str = "A") -> List[List[int]]:
+        return [[self._elemento(operando) for _ in range(M_SIZE)] for _ in range(M_SIZE)]
+
+    def seleccion(self) -> List[List[int]]:
+        """Un 1 por fila: el producto copia filas de B y nunca trunca"""
+        columnas = [self.rng.randrange(M_SIZE) for _ in range(M_SIZE)]
+        return [[int(j == c) for j in range(M_SIZE)] for c in columnas]
+
+    def next_op(self) -> str:
+        if self.last is not None and self.rng.random() < self.guidance:
+            faltan = [b[1] for g, b in self.coverage.missing() if g == "op_pair" and b[0] == self.last]
+            if faltan:
+                return self.rng.choice(faltan)
+        return self.rng.choices(OPS, [self.weights[op] for op in OPS])[0]
+
+    async def step(self, drv) -> str:
+        """Una operacion sobre ``drv``; sirve para drivers de cocotb y de software"""
+        op = self.next_op()
+        resultado = self._ejecutar(drv, op)
+        if hasattr(resultado, "__await__"):
+            await resultado
+        return op
+
+    def _ejecutar(self, drv, op: str):
+        cov = self.coverage
+        if op == "multiply":
+            if ("truncation", "exact") in cov.missing() and self.rng.random() < self.guidance:
+                a = self.seleccion()
+            else:
+                a = self.matrix("A")
+            b = self.matrix("B")
+            for nombre, m in (("A", a), ("B", b)):
+                for fila in m:
+                    for valor in fila:
+                        cov.sample("operand_value", (nombre, value_class(valor)))
+            truncado = bool((dot_products(pack_matrix(a), pack_matrix(b)) > MASK_VAR).any())
+            cov.sample("truncation", "truncated" if truncado else "exact")
+            accion = drv.multiply(a, b)
+        elif op == "accumulate":
+            accion = drv.accumulate()
+        elif op == "clear":
+            accion = drv.clear()
+        else:
+            # lectura con producto nuevo o repetida (uo_out no cambia)
+            if drv.model is not None:
+                cov.sample("read", "fresh" if drv.model.dato_disponible else "stale")
+            accion = drv.read_result()
+        if self.last is not None:
+            cov.sample("op_pair", (self.last, op))
+        self.last = op
+        self.ops += 1
+        return accion
+
+    async def run(self, drv, max_ops: int) -> bool:
+        """Ejecuta hasta cerrar la cobertura o ``max_ops``; devuelve si cerro"""
+        while self.ops < max_ops:
+            await self.step(drv)
+            if self.coverage.closed():
+                return True
+        return self.coverage.closed()
@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+"""Traza estructurada de transacciones en JSONL.
+
+Cada linea es un evento: ``{"event": "transaction", "id", "parent",
+"kind", "start", "end", "cycles", "data"}`` por transaccion y, con nivel
+``TRACE_PINS``, ``{"event": "byte", "dir", "cycle", "value"}`` por byte
+escrito o leido. El archivo solo se abre para agregar, asi que varias
+corridas pueden escribir al mismo.
+
+Se activa con variables de entorno::
+
+    make TRACE_FILE=trace.jsonl [TRACE_LEVEL=2]
+
+Sin ``TRACE_FILE`` el driver no crea el ``Tracer`` y el costo por
+transaccion es una comparacion con ``None``. Los histogramas de latencia
+salen de la traza::
+
+    python -m tensorflowe.trace trace.jsonl --kind multiply read_result
+"""
+
+import argparse
+import atexit
+import json
+import os
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+TRACE_OFF = 0
+TRACE_TRANSACTIONS = 1
+TRACE_PINS = 2
+
+
+class Tracer:
+    """Escribe eventos a un archivo JSONL."""
+
+    def __init__(self, path: str, level: int = TRACE_TRANSACTIONS):
+        self.path = path
+        self.level = level
+        self._f = open(path, "a")
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> Optional["Tracer"]:
+        """``Tracer`` segun ``TRACE_FILE``/``TRACE_LEVEL``, o None si no se pidio"""
+        path = os.environ.get("TRACE_FILE")
+        level = int(os.environ.get("TRACE_LEVEL", str(TRACE_TRANSACTIONS)))
+        if not path or level <= TRACE_OFF:
+            return None
+        return cls(path, level)
+
+    @property
+    def pins(self) -> bool:
+        return self.level >= TRACE_PINS
+
+    def event(self, event: str, **campos):
+        campos["event"] = event
+        self._f.write(json.dumps(campos, separators=(",", ":")))
+        self._f.write("\n")
+
+    def transaction(self, tr):
+        self.event("transaction", id=tr.id, parent=tr.parent, kind=tr.kind,
+                   start=tr.start, end=tr.end, cycles=tr.cycles, data=tr.data)
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def latency_histograms(eventos: Iterable[Dict], kinds: Optional[List[str]] = None) -> Dict[str, Counter]:
+    """Ciclos por tipo de transaccion -> ``Counter`` de latencias"""
+    histogramas: Dict[str, Counter] = {}
+    for e in eventos:
+        if e.get("event") != "transaction" or (kinds and e["kind"] not in kinds):
+            continue
+        histogramas.setdefault(e["kind"], Counter())[e["cycles"]] += 1
+    return histogramas
+
+
+def percentile(histograma: Counter, p: float) -> int:
+    total = sum(histograma.values())
+    objetivo = p * total
+    acumulado = 0
+    for ciclos in sorted(histograma):
+        acumulado += histograma[ciclos]
+        if acumulado >= objetivo:
+            return ciclos
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Histogramas de latencia de una traza JSONL")
+    parser.add_argument("trace")
+    parser.add_argument("--kind", nargs="*", help="tipos de transaccion (todos por defecto)")
+    args = parser.parse_args(argv)
+
+    for kind, h in sorted(latency_histograms(read_trace(args.trace), args.kind).items()):
+        total = sum(h.values())
+        print(f"{kind}: {total} transacciones, min {min(h)}, p50 {percentile(h, 0.5)}, "
+              f"p90 {percentile(h, 0.9)}, p99 {percentile(h, 0.99)}, max {max(h)}")
+        for ciclos in sorted(h):
+            print(f"  {ciclos:6d} {h[ciclos]:8d} {'#' * max(1, 40 * h[ciclos] // total)}")
+
+
+if __name__ == "__main__":
+    main()